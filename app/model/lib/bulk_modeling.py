@@ -0,0 +1,164 @@
+"""
+Fitting models on all measurements of a study at once.
+"""
+
+import math
+from collections import Counter
+
+import sqlalchemy as sql
+
+from app.model.lib.errors import ClientError
+from app.model.orm import (
+    Bioreplicate,
+    MeasurementContext,
+    ModelingResult,
+)
+
+BUILT_IN_MODEL_TYPES = ('easy_linear', 'logistic', 'baranyi_roberts')
+"Model types that can be fitted automatically, as opposed to custom models"
+
+MAX_CONCURRENT_BATCHES = 4
+"""
+The batch jobs of a bulk request are run in at most this many sequences, so a
+single study can't occupy more than this many workers at a time.
+"""
+
+MAX_BATCH_SIZE = 50
+"""
+The maximum number of fits in a single batch job. A batch that runs longer
+than ``R_WORKER_TIMEOUT`` loses all of its fits, so a slow one shouldn't take
+too many others with it.
+"""
+
+
+def build_modeling_inputs(modeling_type, args):
+    "The inputs of a model with the given type, as stored in its params"
+    if modeling_type == 'easy_linear':
+        point_count = args.get('pointCount', '5')
+
+        try:
+            return {'pointCount': int(point_count)}
+        except ValueError:
+            raise ClientError(f"Expected an integer for the \"pointCount\" parameter, got: {point_count}")
+    elif modeling_type in ('logistic', 'baranyi_roberts'):
+        return {'endTime': args.get('endTime', '')}
+    else:
+        return {}
+
+
+def prepare_bulk_modeling(
+    db_session,
+    study,
+    modeling_types,
+    args,
+    technique_ids=None,
+    experiment_ids=None,
+):
+    """
+    Mark the modeling results of the study's measurement contexts as pending,
+    creating them if necessary.
+
+    Contexts can be limited to the given techniques and experiments. Results
+    that are already ``ready`` and have been calculated with the same inputs
+    and backend are skipped.
+
+    Returns a list of ``(modeling_result_id, measurement_context_id, args)``
+    requests for ``process_modeling_batch`` and the number of skipped results.
+    """
+    query = (
+        sql.select(MeasurementContext)
+        .where(MeasurementContext.studyId == study.publicId)
+        .options(sql.orm.selectinload(MeasurementContext.modelingResults))
+        .order_by(MeasurementContext.id)
+    )
+    if technique_ids:
+        query = query.where(MeasurementContext.techniqueId.in_(technique_ids))
+    if experiment_ids:
+        query = (
+            query
+            .join(Bioreplicate, MeasurementContext.bioreplicateId == Bioreplicate.id)
+            .where(Bioreplicate.experimentId.in_(experiment_ids))
+        )
+
+    pending_results = []
+    skipped_count   = 0
+
+    for measurement_context in db_session.scalars(query):
+        existing_results = {mr.type: mr for mr in measurement_context.modelingResults}
+
+        for modeling_type in modeling_types:
+            inputs          = build_modeling_inputs(modeling_type, args)
+            modeling_result = existing_results.get(modeling_type)
+
+            if modeling_result is None:
+                modeling_result = ModelingResult(
+                    type=modeling_type,
+                    measurementContextId=measurement_context.id,
+                )
+            elif _is_up_to_date(modeling_result, inputs, args):
+                skipped_count += 1
+                continue
+
+            modeling_result.state = 'pending'
+            db_session.add(modeling_result)
+
+            pending_results.append((modeling_result, measurement_context.id))
+
+    db_session.flush()
+
+    requests = [
+        (modeling_result.id, measurement_context_id, args)
+        for (modeling_result, measurement_context_id) in pending_results
+    ]
+
+    return requests, skipped_count
+
+
+def _is_up_to_date(modeling_result, inputs, args):
+    # Results calculated before the Python backend existed were fitted in R:
+    params = modeling_result.params or {}
+
+    return (
+        modeling_result.state == 'ready' and
+        params.get('inputs') == inputs and
+        params.get('backend', 'r') == args.get('backend', 'r')
+    )
+
+
+def split_into_batches(requests, max_batches=MAX_CONCURRENT_BATCHES, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Splits the requests into lists of similar size, one for each of
+    ``max_batches`` workers, or more if they would exceed ``max_batch_size``
+    """
+    if not requests:
+        return []
+
+    batch_count = max(min(len(requests), max_batches), math.ceil(len(requests) / max_batch_size))
+    batch_size  = math.ceil(len(requests) / batch_count)
+
+    return [requests[i:i + batch_size] for i in range(0, len(requests), batch_size)]
+
+
+def group_into_sequences(batches, max_sequences=MAX_CONCURRENT_BATCHES):
+    """
+    Distributes the batches into at most ``max_sequences`` lists, whose
+    batches are processed one after the other
+    """
+    sequences = [[] for _ in range(min(len(batches), max_sequences))]
+
+    for (index, batch) in enumerate(batches):
+        sequences[index % len(sequences)].append(batch)
+
+    return sequences
+
+
+def summarize_modeling_states(modeling_results):
+    "Counts the given modeling results by state"
+    counts = Counter(mr.state for mr in modeling_results)
+
+    return {
+        'pending': counts['pending'],
+        'ready':   counts['ready'],
+        'error':   counts['error'],
+        'total':   sum(counts.values()),
+    }
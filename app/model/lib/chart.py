@@ -1,12 +1,16 @@
 import math
+import functools
 
 import numpy as np
+import simplejson as json
+import plotly.io as pio
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
+from app.model.lib.downsampling import lttb_indices
 from app.model.lib.conversion import (
-    convert_df_units,
+    convert_measurement_units_by_row,
     CELL_COUNT_UNITS,
     CFU_COUNT_UNITS,
     METABOLITE_UNITS,
@@ -15,6 +19,38 @@ from app.model.lib.conversion import (
 PLOTLY_TEMPLATE = 'plotly_white'
 "List of templates can be found at plotly.com/python/templates"
 
+PLOTLY_CONFIG = {
+    'toImageButtonOptions': {
+        'format': 'svg',
+        'filename': 'mgrowth_chart',
+        # Force width and height to be the same as the visible dimensions on screen
+        # Reference: https://github.com/plotly/plotly.js/pull/3746
+        'height': None,
+        'width': None,
+    },
+}
+"Configuration of the plotly.js chart, independent of its data"
+
+DOWNSAMPLING_POINTS_PER_PIXEL = 2
+"""
+Measurement series with more points than this multiple of the chart's width
+are downsampled, since the rest can't be distinguished on screen anyway.
+"""
+
+DOWNSAMPLING_DEFAULT_WIDTH = 1200
+"The width in pixels used for the point budget of charts without a width"
+
+TEMPLATE_LAYOUT_KEYS = (
+    'colorway',
+    'font',
+    'hoverlabel',
+    'paper_bgcolor',
+    'plot_bgcolor',
+    'xaxis',
+    'yaxis',
+)
+"The parts of the template's layout that charts rendered in JSON use"
+
 
 class Chart:
     """
@@ -33,6 +69,7 @@ class Chart:
         width=None,
         clamp_x_data=False,
         show_std=True,
+        points_per_pixel=DOWNSAMPLING_POINTS_PER_PIXEL,
     ):
         # TODO (2025-06-25) Unused, should consider conversion, but handle
         # units during modeling:
@@ -44,6 +81,7 @@ class Chart:
         self.width            = width
         self.clamp_x_data     = clamp_x_data
         self.show_std         = show_std
+        self.points_per_pixel = points_per_pixel
 
         self.log_left  = log_left
         self.log_right = log_right
@@ -63,6 +101,11 @@ class Chart:
         if 'std' not in df:
             df['std'] = [float('nan') for _ in range(df['value'].size)]
 
+        point_budget = self.point_budget
+        if point_budget is not None and len(df) > point_budget:
+            indices = lttb_indices(df['time'], df['value'], point_budget)
+            df      = df.iloc[indices]
+
         entry = (df, units, label, metabolite_mass)
 
         if axis == 'left':
@@ -72,6 +115,21 @@ class Chart:
         else:
             raise ValueError(f"Unexpected axis: {axis}")
 
+    @property
+    def point_budget(self):
+        """
+        The maximum number of points of a measurement series, depending on
+        the width of the chart. Longer series are downsampled with the
+        Largest-Triangle-Three-Buckets algorithm. If ``points_per_pixel`` is
+        ``None``, series are never downsampled.
+        """
+        if self.points_per_pixel is None:
+            return None
+
+        width = float(self.width) if self.width is not None else DOWNSAMPLING_DEFAULT_WIDTH
+
+        return max(int(width * self.points_per_pixel), 3)
+
     def add_model_df(self, df, *, units, label=None, axis='left'):
         entry = (df, units, label, None)
 
@@ -90,6 +148,81 @@ class Chart:
     def to_html(self):
         fig = make_subplots(specs=[[{"secondary_y": True}]])
 
+        traces, layout = self._build_figure()
+
+        for (scatter_params, secondary_y) in traces:
+            fig.add_trace(go.Scatter(**scatter_params), secondary_y=secondary_y)
+
+        fig.update_layout(template=PLOTLY_TEMPLATE, **layout)
+
+        return fig.to_html(
+            full_html=False,
+            include_plotlyjs=False,
+            default_width=(f"{self.width}px" if self.width is not None else '100%'),
+            config=PLOTLY_CONFIG,
+        )
+
+    def to_json(self, float32=False, max_points=None):
+        """
+        Serializes the chart into a compact JSON object with "data", "layout"
+        and "config" keys that can be given to ``Plotly.newPlot`` directly.
+
+        Only the arrays of the traces and the layout that differs from
+        plotly.js' defaults are included. If ``float32`` is set, numbers are
+        rounded to single precision, which is enough for drawing and makes
+        their text representation shorter. Series with more than
+        ``max_points`` points are downsampled further.
+        """
+        traces, layout = self._build_figure()
+
+        data = []
+        for (scatter_params, secondary_y) in traces:
+            trace = {'type': 'scatter'}
+
+            for (key, value) in scatter_params.items():
+                if key in ('x', 'y'):
+                    trace[key] = _compact_array(value, float32)
+                elif key == 'error_y' and value is not None:
+                    trace[key] = {k: _compact_array(v, float32) for (k, v) in value.items()}
+                elif value is not None:
+                    trace[key] = value
+
+            if secondary_y:
+                trace['yaxis'] = 'y2'
+
+            if max_points is not None:
+                _downsample_trace(trace, max_points)
+
+            data.append(trace)
+
+        # Axis placement, as set up by `make_subplots` in `to_html`:
+        layout['xaxis'] = {'anchor': 'y', 'domain': [0.0, 0.94], **layout['xaxis']}
+        layout['yaxis'] = {'anchor': 'x', **layout['yaxis']}
+        layout['yaxis2'] = {'anchor': 'x', 'overlaying': 'y', **layout['yaxis2']}
+
+        layout['template'] = {'layout': _get_template_layout()}
+
+        if self.width is not None:
+            layout['width'] = self.width
+            config = PLOTLY_CONFIG
+        else:
+            config = {**PLOTLY_CONFIG, 'responsive': True}
+
+        return json.dumps(
+            {'data': data, 'layout': layout, 'config': config},
+            ignore_nan=True,
+            separators=(',', ':'),
+        )
+
+    def _build_figure(self):
+        """
+        Collects the parameters of all traces and the layout of the chart.
+
+        Returns a list of ``(scatter_params, secondary_y)`` tuples and a
+        layout dict, which ``to_html`` and ``to_json`` serialize differently.
+        """
+        traces = []
+
         converted_data_left,  left_units_label  = self._convert_units(self.data_left)
         converted_data_right, right_units_label = self._convert_units(self.data_right)
 
@@ -98,15 +231,15 @@ class Chart:
         if right_units_label == '[mixed units]':
             self.mixed_units_right = True
 
-        for (df, label) in converted_data_left:
-            scatter_params = self._get_scatter_params(df, label, log=self.log_left)
-            fig.add_trace(go.Scatter(**scatter_params), secondary_y=False)
+        for (series, label) in converted_data_left:
+            scatter_params = self._get_scatter_params(series, label, log=self.log_left)
+            traces.append((scatter_params, False))
 
-        for (df, label) in converted_data_right:
-            scatter_params = self._get_scatter_params(df, label, log=self.log_right)
+        for (series, label) in converted_data_right:
+            scatter_params = self._get_scatter_params(series, label, log=self.log_right)
             scatter_params = dict(**scatter_params, line={'dash': 'dot'})
 
-            fig.add_trace(go.Scatter(**scatter_params), secondary_y=True)
+            traces.append((scatter_params, True))
 
         if self.clamp_x_data:
             # Fit the x-axis of the shortest chart:
@@ -130,22 +263,21 @@ class Chart:
             y0, y1 = self._calculate_y_range(converted_data_left, self.model_df_left_indices)
 
             for index, (x0, x1, label, text) in enumerate(self.regions):
-                fig.add_trace(
-                    go.Scatter(
-                        name=label,
-                        x=[x0, x0, x1, x1, x0],
-                        y=[y0, y0, y0, y1, y1],
-                        opacity=0.15,
-                        line_width=0,
-                        fill="toself",
-                        hovertemplate=text,
-                        mode="text",
-                    ),
+                scatter_params = dict(
+                    name=label,
+                    x=[x0, x0, x1, x1, x0],
+                    y=[y0, y0, y0, y1, y1],
+                    opacity=0.15,
+                    line=dict(width=0),
+                    fill="toself",
+                    hovertemplate=text,
+                    mode="text",
                 )
+                traces.append((scatter_params, None))
 
         left_yaxis = dict(
             side="left",
-            title_text=left_units_label,
+            title=dict(text=left_units_label),
             exponentformat="power",
             range=left_yaxis_range,
         )
@@ -154,16 +286,15 @@ class Chart:
 
         right_yaxis = dict(
             side="right",
-            title_text=right_units_label,
+            title=dict(text=right_units_label),
             exponentformat="power",
             range=right_yaxis_range,
         )
         if self.log_right:
             right_yaxis['type'] = 'log'
 
-        fig.update_layout(
+        layout = dict(
             showlegend=True,
-            template=PLOTLY_TEMPLATE,
             margin=dict(l=0, r=0, t=60, b=40),
             title=dict(x=0),
             hovermode='x unified',
@@ -178,7 +309,7 @@ class Chart:
                 entrywidth=0.9,
             ),
             modebar=dict(orientation='v'),
-            font_family="Public Sans",
+            font=dict(family="Public Sans"),
             yaxis=left_yaxis,
             yaxis2=right_yaxis,
             xaxis=dict(
@@ -187,68 +318,103 @@ class Chart:
             )
         )
 
-        return fig.to_html(
-            full_html=False,
-            include_plotlyjs=False,
-            default_width=(f"{self.width}px" if self.width is not None else '100%'),
-            config={
-                'toImageButtonOptions': {
-                    'format': 'svg',
-                    'filename': 'mgrowth_chart',
-                    # Force width and height to be the same as the visible dimensions on screen
-                    # Reference: https://github.com/plotly/plotly.js/pull/3746
-                    'height': None,
-                    'width': None,
-                },
-            },
-        )
+        return traces, layout
 
     def _convert_units(self, data):
+        """
+        Converts the values of all dataframes to the chart's units.
+
+        The values and stds of all series are concatenated and converted at
+        once, with the units of their series. Returns a list of ``(series,
+        label)`` tuples, where the series are dicts of numpy arrays with
+        "time", "value" and "std" keys, and a label for the units of the axis.
+        The input dataframes are not modified.
+        """
         if len(data) == 0:
             return [], None
 
-        converted_units = set()
-        converted_data = [(df, label) for (df, _, label, _) in data]
+        source_units      = []
+        target_units      = []
+        metabolite_masses = []
 
-        for (df, units, label, metabolite_mass) in data:
+        for (_, units, _, metabolite_mass) in data:
             if units in CELL_COUNT_UNITS:
-                result_units = convert_df_units(df, units, self.cell_count_units)
-                converted_units.add(result_units)
+                target_units.append(self.cell_count_units)
             elif units in CFU_COUNT_UNITS:
-                result_units = convert_df_units(df, units, self.cfu_count_units)
-                converted_units.add(result_units)
+                target_units.append(self.cfu_count_units)
             elif units in METABOLITE_UNITS:
-                result_units = convert_df_units(df, units, self.metabolite_units, metabolite_mass)
-                converted_units.add(result_units)
+                target_units.append(self.metabolite_units)
             else:
-                converted_units.add(units)
+                target_units.append(units)
+
+            source_units.append(units)
+            metabolite_masses.append(metabolite_mass)
+
+        source_units      = np.array(source_units, dtype=object)
+        target_units      = np.array(target_units, dtype=object)
+        metabolite_masses = np.array(metabolite_masses, dtype=object)
 
-        if len(converted_units) > 1 or len(converted_data) == 0:
+        # Series with incompatible units keep their original values and units:
+        _, series_converted = convert_measurement_units_by_row(
+            np.zeros(len(data)),
+            source_units,
+            target_units,
+            metabolite_masses,
+        )
+        series_units = np.where(series_converted, target_units, source_units)
+
+        arrays = [
+            _to_float_array(df, column)
+            for column in ('value', 'std')
+            for (df, _, _, _) in data
+        ]
+        lengths      = [len(array) for array in arrays]
+        series_index = np.repeat(np.tile(np.arange(len(data)), 2), lengths)
+
+        converted_array, _ = convert_measurement_units_by_row(
+            np.concatenate(arrays),
+            source_units[series_index],
+            target_units[series_index],
+            metabolite_masses[series_index],
+        )
+        split_arrays = np.split(converted_array, np.cumsum(lengths)[:-1])
+
+        converted_data = []
+        for (index, (df, _, label, _)) in enumerate(data):
+            value = split_arrays[index]
+            std   = split_arrays[len(data) + index]
+            series = {'time': _to_float_array(df, 'time'), 'value': value, 'std': std}
+
+            converted_data.append((series, label))
+
+        converted_units = set(series_units)
+        if len(converted_units) > 1:
             return converted_data, '[mixed units]'
 
         return converted_data, tuple(converted_units)[0]
 
-    def _get_scatter_params(self, df, label, log=False):
-        value = df['value']
+    def _get_scatter_params(self, series, label, log=False):
+        value = series['value']
+        std   = series['std']
 
-        if self.show_std and 'std' in df:
-            if df['std'].isnull().all():
+        if self.show_std:
+            if np.isnan(std).all():
                 # STD values were blank, don't draw error bars
                 error_y = None
             else:
                 # We want to clip negative error bars to 0
-                positive_err = df['std']
-                negative_err = np.clip(df['std'], max=df['value'])
+                positive_err = std
+                negative_err = np.minimum(std, value)
 
-                if (positive_err == negative_err).all():
-                    error_y = go.scatter.ErrorY(array=positive_err)
+                if np.array_equal(positive_err, negative_err):
+                    error_y = dict(array=positive_err)
                 else:
-                    error_y = go.scatter.ErrorY(array=positive_err, arrayminus=negative_err)
+                    error_y = dict(array=positive_err, arrayminus=negative_err)
         else:
             error_y = None
 
         return dict(
-            x=df['time'],
+            x=series['time'],
             y=value,
             name=label,
             error_y=error_y,
@@ -256,17 +422,9 @@ class Chart:
 
     def _calculate_x_range(self, data):
         # With multiple charts, fit the x-axis of the shortest one:
-        global_max_x = math.inf
-        global_min_x = 0
-
-        for (i, (df, _)) in enumerate(data):
-            max_x = df['time'].max()
-            min_x = df['time'].min()
-
-            if max_x < global_max_x:
-                global_max_x = max_x
-            if min_x > global_min_x:
-                global_min_x = min_x
+        global_max_x = min((series['time'].max() for (series, _) in data), default=math.inf)
+        global_min_x = max((series['time'].min() for (series, _) in data), default=0)
+        global_min_x = max(global_min_x, 0)
 
         # The range of the chart is given a padding depending on the data range
         # to make sure the content is visible:
@@ -277,52 +435,33 @@ class Chart:
         """
         Find the limit for the y axis, ignoring model dataframes, since they
         might have exponentials that shoot up.
+
+        All measurements are concatenated, so the limits are found with a
+        single pass over the arrays, regardless of the number of series.
         """
+        measurement_data = [
+            series for (i, (series, _)) in enumerate(data)
+            if i not in model_df_indices
+        ]
+
         global_max_y          = 0
         global_min_y          = math.inf
         global_positive_min_y = math.inf
 
-        for (i, (df, _)) in enumerate(data):
-            if i in model_df_indices:
-                # A model's data might shoot up exponentially, so we don't
-                # consider it for the chart range
-                continue
-
-            # We look for the min and max values + std in the dataframe:
-            lowers = []
-            uppers = []
-
-            entries = zip(df['value'], df['std'], df['std'])
-
-            for value, upper_std, lower_std in entries:
-                # For some reason, pandas might give us a None here, or it might
-                # give us a NaN
-                if upper_std is None or math.isnan(upper_std):
-                    upper_std = 0
-                if lower_std is None or math.isnan(lower_std):
-                    lower_std = 0
-
-                uppers.append(value + upper_std)
-                if log:
-                    lowers.append(value - lower_std)
-                else:
-                    lowers.append(np.clip(value - lower_std, min=0))
-
-            max_y = max(uppers)
-            min_y = min(lowers)
+        if measurement_data:
+            values = np.concatenate([series['value'] for series in measurement_data])
+            stds   = np.concatenate([series['std'] for series in measurement_data])
+            stds   = np.nan_to_num(stds, nan=0.0)
 
-            positive_ys = [y for y in lowers if y > 0]
-            if positive_ys:
-                positive_min_y = min(positive_ys)
-            else:
-                positive_min_y = None
+            uppers = values + stds
+            lowers = values - stds
+            if not log:
+                lowers = np.clip(lowers, min=0)
 
-            if max_y > global_max_y:
-                global_max_y = max_y
-            if min_y < global_min_y:
-                global_min_y = min_y
-            if positive_min_y is not None and positive_min_y < global_positive_min_y:
-                global_positive_min_y = positive_min_y
+            if len(values) > 0:
+                global_max_y = max(global_max_y, np.nanmax(uppers))
+                global_min_y = np.nanmin(lowers)
+                global_positive_min_y = np.min(lowers, where=(lowers > 0), initial=math.inf)
 
         # The range of the chart is given a padding depending on the data range
         # to make sure the content is visible:
@@ -342,3 +481,41 @@ class Chart:
         upper = global_max_y + padding
 
         return [lower, upper]
+
+
+def _to_float_array(df, column):
+    if column not in df:
+        return np.full(len(df), np.nan)
+
+    return df[column].to_numpy(dtype=float, na_value=np.nan)
+
+
+def _compact_array(values, float32=False):
+    values = np.asarray(values, dtype=float)
+
+    if float32:
+        # The shortest representation of the single-precision value:
+        values = values.astype(np.float32).astype(str).astype(float)
+
+    return values.tolist()
+
+
+def _downsample_trace(trace, max_points):
+    point_count = len(trace['x'])
+    if point_count <= max_points or trace.get('fill') is not None:
+        return
+
+    indices = lttb_indices(trace['x'], np.nan_to_num(trace['y']), max_points)
+
+    trace['x'] = [trace['x'][i] for i in indices]
+    trace['y'] = [trace['y'][i] for i in indices]
+
+    for (key, values) in trace.get('error_y', {}).items():
+        trace['error_y'][key] = [values[i] for i in indices]
+
+
+@functools.cache
+def _get_template_layout():
+    template_layout = pio.templates[PLOTLY_TEMPLATE].layout.to_plotly_json()
+
+    return {key: template_layout[key] for key in TEMPLATE_LAYOUT_KEYS if key in template_layout}
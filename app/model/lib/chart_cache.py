@@ -0,0 +1,203 @@
+"""
+A cache of rendered chart fragments, stored in the redis server that celery
+uses.
+
+Building a chart and serializing it with plotly is expensive, while the data
+of a study only changes when a new submission is processed. Fragments are
+cached under a hash of everything that determines their contents: the request
+parameters, the last update times of the studies and models they display and
+a per-study "generation" counter that is incremented when a submission
+updates the study.
+
+Entries expire after ``CHART_CACHE_TTL`` seconds. To also evict entries when
+redis runs out of memory, it should be configured with the ``volatile-lru``
+policy, which only evicts keys with an expiration time and leaves celery's
+queues alone.
+"""
+
+import os
+import hashlib
+import logging
+
+import redis
+import simplejson as json
+import sqlalchemy as sql
+
+from app.model.orm import (
+    MeasurementContext,
+    ModelingResult,
+    Study,
+)
+
+_LOGGER = logging.getLogger()
+
+CHART_CACHE_TTL = 24 * 60 * 60
+"Default number of seconds after which a cached fragment expires"
+
+CHART_CACHE_REDIS_DB = 1
+"The redis database for cached fragments, separate from celery's"
+
+_CACHE     = None
+_CACHE_PID = None
+
+
+def get_chart_cache():
+    """
+    Returns the chart cache shared by the current process. It uses the same
+    ``REDIS_HOST`` and ``REDIS_PORT`` environment variables as celery, and
+    ``CHART_CACHE_TTL`` sets the expiration time, ``0`` disables the cache.
+
+    The cache is always disabled in the test environment, returning ``None``.
+    """
+    global _CACHE, _CACHE_PID
+
+    if _CACHE is not None and _CACHE_PID == os.getpid():
+        return _CACHE
+
+    ttl = int(os.getenv('CHART_CACHE_TTL', str(CHART_CACHE_TTL)))
+
+    if ttl <= 0 or os.getenv('APP_ENV') == 'test':
+        return None
+
+    client = redis.Redis(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', '6379')),
+        db=CHART_CACHE_REDIS_DB,
+        socket_timeout=0.5,
+        socket_connect_timeout=0.5,
+    )
+
+    _CACHE     = ChartCache(client, ttl=ttl)
+    _CACHE_PID = os.getpid()
+
+    return _CACHE
+
+
+def cached_chart_fragment(db_session, key, render, context_ids=(), model_ids=()):
+    """
+    Returns the cached result of the ``render`` function, calling it if
+    needed.
+
+    The ``key`` describes the request and needs to be JSON-serializable. The
+    given measurement context and modeling result ids are used to find the
+    studies and models the fragment depends on.
+    """
+    cache = get_chart_cache()
+    if cache is None:
+        return render()
+
+    versions = _fetch_data_versions(db_session, context_ids, model_ids)
+
+    return cache.fetch(
+        {'key': key, **versions},
+        study_ids=[study_id for (study_id, _) in versions['studies']],
+        render=render,
+    )
+
+
+def invalidate_study_charts(study_id):
+    "Marks all cached fragments that show the study's data as outdated"
+    cache = get_chart_cache()
+    if cache is not None:
+        cache.invalidate_study(study_id)
+
+
+def chart_record_ids(args):
+    """
+    Extracts measurement context ids and modeling result ids from the
+    parameters of a chart form.
+    """
+    context_ids = []
+    model_ids   = []
+
+    for arg in args:
+        if arg.startswith('measurementContext|'):
+            context_ids.append(int(arg.removeprefix('measurementContext|')))
+        elif arg.startswith('modelingResult|'):
+            model_ids.append(int(arg.removeprefix('modelingResult|')))
+
+    return sorted(context_ids), sorted(model_ids)
+
+
+class ChartCache:
+    def __init__(self, client, ttl=CHART_CACHE_TTL, prefix='charts'):
+        self.client = client
+        self.ttl    = ttl
+        self.prefix = prefix
+
+    def fetch(self, key_data, study_ids, render):
+        try:
+            generations = self._get_generations(study_ids)
+            key         = self._build_key(key_data, generations)
+
+            cached_html = self.client.get(key)
+        except redis.RedisError as e:
+            _LOGGER.warning(f"Chart cache is not available: {e}")
+            return render()
+
+        if cached_html is not None:
+            return cached_html.decode('utf-8')
+
+        html = render()
+
+        try:
+            self.client.set(key, html.encode('utf-8'), ex=self.ttl)
+        except redis.RedisError as e:
+            _LOGGER.warning(f"Chart cache is not available: {e}")
+
+        return html
+
+    def invalidate_study(self, study_id):
+        try:
+            self.client.incr(self._generation_key(study_id))
+        except redis.RedisError as e:
+            _LOGGER.warning(f"Chart cache for study {study_id} could not be invalidated: {e}")
+
+    def _get_generations(self, study_ids):
+        if not study_ids:
+            return []
+
+        keys = [self._generation_key(study_id) for study_id in study_ids]
+
+        return [int(g or 0) for g in self.client.mget(keys)]
+
+    def _build_key(self, key_data, generations):
+        serialized_key = json.dumps([key_data, generations], sort_keys=True, default=str)
+        digest         = hashlib.sha256(serialized_key.encode('utf-8')).hexdigest()
+
+        return f"{self.prefix}:fragment:{digest}"
+
+    def _generation_key(self, study_id):
+        return f"{self.prefix}:generation:{study_id}"
+
+
+def _fetch_data_versions(db_session, context_ids, model_ids):
+    context_study_ids = (
+        sql.select(MeasurementContext.studyId)
+        .where(MeasurementContext.id.in_(context_ids))
+    )
+    model_study_ids = (
+        sql.select(MeasurementContext.studyId)
+        .join(ModelingResult)
+        .where(ModelingResult.id.in_(model_ids))
+    )
+
+    studies = db_session.execute(
+        sql.select(Study.publicId, Study.updatedAt)
+        .where(sql.or_(
+            Study.publicId.in_(context_study_ids),
+            Study.publicId.in_(model_study_ids),
+        ))
+        .order_by(Study.publicId)
+    ).all()
+
+    models = db_session.execute(
+        sql.select(ModelingResult.id, ModelingResult.updatedAt)
+        .where(ModelingResult.id.in_(model_ids))
+        .order_by(ModelingResult.id)
+    ).all()
+
+    return {
+        'studies': [(study_id, str(updated_at)) for (study_id, updated_at) in studies],
+        'models':  [(model_id, str(updated_at)) for (model_id, updated_at) in models],
+    }
@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 MEASUREMENT_RATIOS = {
     # (Source,   Target):     source * ratio = target
     ('Cells/μL', 'Cells/mL'): 1_000,
@@ -20,6 +23,8 @@ CFU_COUNT_UNITS  = ('CFUs/mL', 'CFUs/μL')
 METABOLITE_UNITS = ('mM', 'μM', 'nM', 'pM', 'g/L', 'mg/L')
 "Units for metabolites, both molar and mass concentration"
 
+_IDENTITY_STEPS = (0, 1.0, 0, 1.0, 1.0, 1.0)
+
 
 def convert_df_units(df, source_units, target_units, metabolite_mass=None):
     """
@@ -51,6 +56,111 @@ def convert_df_units(df, source_units, target_units, metabolite_mass=None):
         return source_units
 
 
+def convert_df_units_by_row(df, source_units, target_units, metabolite_masses=None):
+    """
+    Converts the "value" and "std" columns of a dataframe like
+    ``convert_df_units``, but with source units, target units and metabolite
+    masses that can be different for each row. Each of them can be a single
+    value or a sequence with one entry per row.
+
+    Rows with incompatible units are left unchanged. Returns a boolean array
+    that marks the rows that were converted.
+    """
+    new_value, converted = convert_measurement_units_by_row(
+        df['value'],
+        source_units,
+        target_units,
+        masses=metabolite_masses,
+    )
+    df['value'] = new_value
+
+    if 'std' in df:
+        df['std'], _ = convert_measurement_units_by_row(
+            df['std'],
+            source_units,
+            target_units,
+            masses=metabolite_masses,
+        )
+
+    return converted
+
+
+def convert_measurement_units_by_row(
+    values,
+    source_units,
+    target_units,
+    masses=None,
+):
+    """
+    Converts an array of values at once, with per-row source units, target
+    units and masses. The conversion steps of each unique pair of units are
+    looked up once and applied to all of its rows together, in the same order
+    as ``convert_measurement_units``, so the results are identical.
+
+    Returns a new float array and a boolean array that marks the converted
+    rows. Rows with incompatible units, or that need a missing mass, keep their
+    original values.
+    """
+    values = np.array(values, dtype=float)
+    size   = len(values)
+
+    source_units = _broadcast_objects(source_units, size)
+    target_units = _broadcast_objects(target_units, size)
+    masses       = pd.to_numeric(pd.Series(_broadcast_objects(masses, size)), errors='coerce')
+    masses       = masses.to_numpy(dtype=float)
+
+    source_codes, unique_sources = pd.factorize(source_units, use_na_sentinel=False)
+    target_codes, unique_targets = pd.factorize(target_units, use_na_sentinel=False)
+
+    pair_codes, unique_pairs = pd.factorize(source_codes * len(unique_targets) + target_codes)
+
+    # Missing units are factorized as NaN, restore them for comparisons:
+    unique_sources = [None if pd.isna(units) else units for units in unique_sources]
+    unique_targets = [None if pd.isna(units) else units for units in unique_targets]
+
+    steps = [
+        _conversion_steps(
+            unique_sources[pair // len(unique_targets)],
+            unique_targets[pair % len(unique_targets)],
+        )
+        for pair in unique_pairs
+    ]
+
+    # Lookup table with one row of conversion steps per unique pair of units:
+    step_table = np.array(
+        [_IDENTITY_STEPS if s is None else s for s in steps],
+        dtype=float,
+    ).reshape(-1, len(_IDENTITY_STEPS))
+    compatible_pairs = np.array([s is not None for s in steps], dtype=bool)
+
+    (
+        divide_by_mass,
+        source_factor,
+        multiply_by_mass,
+        target_divisor,
+        ratio_factor,
+        ratio_divisor,
+    ) = step_table[pair_codes].T
+
+    divide_by_mass   = divide_by_mass.astype(bool)
+    multiply_by_mass = multiply_by_mass.astype(bool)
+    needs_mass       = divide_by_mass | multiply_by_mass
+
+    converted = compatible_pairs[pair_codes] & ~(needs_mass & np.isnan(masses))
+
+    divide_by_mass   &= converted
+    multiply_by_mass &= converted
+
+    values[divide_by_mass]   /= masses[divide_by_mass]
+    values[converted]        *= source_factor[converted]
+    values[multiply_by_mass] *= masses[multiply_by_mass]
+    values[converted]        /= target_divisor[converted]
+    values[converted]        *= ratio_factor[converted]
+    values[converted]        /= ratio_divisor[converted]
+
+    return values, converted
+
+
 def convert_measurement_units(
     value,
     source_units,
@@ -99,6 +209,53 @@ def convert_measurement_units(
         return None
 
 
+def _conversion_steps(source_units, target_units):
+    """
+    The steps that ``convert_measurement_units`` takes for the given pair of
+    units, as a tuple of ``(divide_by_mass, source_factor, multiply_by_mass,
+    target_divisor, ratio_factor, ratio_divisor)``. Returns None if the units
+    are incompatible.
+    """
+    if source_units == target_units:
+        return _IDENTITY_STEPS
+
+    divide_by_mass   = 0
+    source_factor    = 1.0
+    multiply_by_mass = 0
+    target_divisor   = 1.0
+
+    if source_units in ('g/L', 'mg/L'):
+        divide_by_mass = 1
+        if source_units == 'g/L':
+            source_factor = 1000.0
+        source_units = 'mM'
+
+    if target_units in ('g/L', 'mg/L'):
+        multiply_by_mass = 1
+        if target_units == 'g/L':
+            target_divisor = 1_000.0
+        target_units = 'mM'
+
+    steps = (divide_by_mass, source_factor, multiply_by_mass, target_divisor)
+
+    if source_units == target_units:
+        return (*steps, 1.0, 1.0)
+
+    if (source_units, target_units) in MEASUREMENT_RATIOS:
+        return (*steps, float(MEASUREMENT_RATIOS[(source_units, target_units)]), 1.0)
+    elif (target_units, source_units) in MEASUREMENT_RATIOS:
+        return (*steps, 1.0, float(MEASUREMENT_RATIOS[(target_units, source_units)]))
+    else:
+        return None
+
+
+def _broadcast_objects(values, size):
+    if values is None or isinstance(values, str) or not np.iterable(values):
+        return np.full(size, values, dtype=object)
+
+    return np.asarray(values, dtype=object)
+
+
 def convert_time(time, source, target):
     """
     Converts the given time value from the source units to the target units by
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 import sqlalchemy as sql
 import sqlalchemy.dialects.mysql as mysql
 import pandas as pd
@@ -13,3 +15,46 @@ def execute_into_df(db_conn, query):
 
     statement = query.compile(dialect=mysql.dialect())
     return pd.read_sql(statement, db_conn)
+
+
+def stream_into_dfs(db_conn, query, chunk_size):
+    """
+    Executes the query with a server-side cursor and yields its results as
+    dataframes of at most ``chunk_size`` rows, so the full result is never
+    held in memory.
+
+    The connection can't be used for other queries until all chunks have been
+    consumed. A query without results yields a single empty dataframe with the
+    expected columns.
+    """
+    result = db_conn.execute(
+        query,
+        execution_options={'stream_results': True, 'yield_per': chunk_size},
+    )
+    columns = list(result.keys())
+    empty   = True
+
+    for rows in result.partitions():
+        empty = False
+        yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    if empty:
+        yield pd.DataFrame(columns=columns)
+
+
+@contextmanager
+def named_lock(db_conn, name, timeout):
+    """
+    Holds the MySQL lock with the given name while the block runs, waiting at
+    most ``timeout`` seconds for it. Yields whether the lock was acquired.
+
+    The lock belongs to the connection, so it's also released if the process
+    dies before the end of the block.
+    """
+    acquired = execute_text(db_conn, 'SELECT GET_LOCK(:name, :timeout)', name=name, timeout=timeout).scalar() == 1
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            execute_text(db_conn, 'SELECT RELEASE_LOCK(:name)', name=name)
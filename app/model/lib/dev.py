@@ -12,6 +12,7 @@ from app.model.orm import (
 )
 from app.view.forms.submission_form import SubmissionForm
 from app.model.lib.submission_process import persist_submission_to_database
+from app.model.lib.search_facets import refresh_study_facets
 
 
 def bootstrap_study(db_session, study_key, user_uuid):
@@ -69,6 +70,7 @@ def bootstrap_study(db_session, study_key, user_uuid):
 
     study.publishedAt = datetime.now(UTC)
     db_session.add(study)
+    refresh_study_facets(db_session, study.publicId)
     db_session.commit()
 
     return study
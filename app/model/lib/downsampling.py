@@ -0,0 +1,65 @@
+"""
+Reducing the number of points of long time series for charts, while keeping
+their visual shape.
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Picks ``threshold`` points of the series with the
+    Largest-Triangle-Three-Buckets algorithm and returns their indices.
+
+    The first and last points are always kept. The rest are split into equal
+    buckets and the point of each bucket that forms the largest triangle with
+    the previously picked point and the average of the next bucket is kept,
+    which preserves peaks and drops that a regular sampling would miss.
+
+    The x values are expected to be sorted, the y values to be finite.
+
+    Reference: https://skemman.is/handle/1946/15343 (Steinarsson, 2013)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    point_count = len(x)
+
+    if threshold >= point_count or threshold < 3:
+        return np.arange(point_count)
+
+    bucket_size  = (point_count - 2) / (threshold - 2)
+    bucket_edges = np.floor(np.arange(threshold - 1) * bucket_size).astype(int) + 1
+
+    # Average of each bucket, the one after the last bucket is the last point:
+    bucket_lengths = np.diff(bucket_edges)
+    average_x = np.add.reduceat(x[:-1], bucket_edges[:-1]) / bucket_lengths
+    average_y = np.add.reduceat(y[:-1], bucket_edges[:-1]) / bucket_lengths
+
+    next_x = np.append(average_x[1:], x[-1])
+    next_y = np.append(average_y[1:], y[-1])
+
+    indices     = np.empty(threshold, dtype=int)
+    indices[0]  = 0
+    indices[-1] = point_count - 1
+
+    previous_index = 0
+
+    for bucket in range(threshold - 2):
+        start = bucket_edges[bucket]
+        end   = bucket_edges[bucket + 1]
+
+        ax = x[previous_index]
+        ay = y[previous_index]
+
+        # Double the area of the triangles between the previous point, the
+        # candidates and the next bucket's average:
+        areas = np.abs(
+            (ax - next_x[bucket]) * (y[start:end] - ay) -
+            (ax - x[start:end]) * (next_y[bucket] - ay)
+        )
+
+        previous_index      = start + np.argmax(areas)
+        indices[bucket + 1] = previous_index
+
+    return indices
@@ -1,6 +1,15 @@
+import hashlib
+from io import BytesIO
+from collections import OrderedDict
 from tempfile import NamedTemporaryFile
 
 import openpyxl
+import pandas as pd
+
+SHEET_CACHE_SIZE = 8
+"The maximum number of parsed workbooks to keep in memory per process"
+
+_SHEET_CACHE = OrderedDict()
 
 
 def export_to_xlsx(workbook: openpyxl.Workbook) -> bytes:
@@ -12,3 +21,31 @@ def export_to_xlsx(workbook: openpyxl.Workbook) -> bytes:
         data = f.read()
 
     return data
+
+
+def content_hash(content: bytes) -> str:
+    "A digest of the given file contents, used as a cache key"
+    return hashlib.sha256(content).hexdigest()
+
+
+def read_sheets(content: bytes) -> dict[str, pd.DataFrame]:
+    """
+    Parse all sheets of the given excel file contents into dataframes, indexed
+    by sheet name.
+
+    A single upload is validated, saved to the database, previewed and
+    exported, so the parsed sheets are cached by the hash of the file's
+    contents. The dataframes are shared between callers and should not be
+    modified in-place.
+    """
+    key = content_hash(content)
+
+    if key in _SHEET_CACHE:
+        _SHEET_CACHE.move_to_end(key)
+    else:
+        _SHEET_CACHE[key] = pd.read_excel(BytesIO(content), sheet_name=None)
+
+        while len(_SHEET_CACHE) > SHEET_CACHE_SIZE:
+            _SHEET_CACHE.popitem(last=False)
+
+    return dict(_SHEET_CACHE[key])
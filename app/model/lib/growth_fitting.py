@@ -0,0 +1,325 @@
+"""
+Fitting growth models without R.
+
+The functions in this module reproduce the R scripts in ``scripts/modeling/``
+using NumPy: the "easy linear" method follows ``growthrates::fit_easylinear``
+and the logistic and Baranyi-Roberts models are fitted on log-transformed
+values with the same starting values, lower bounds and BFGS optimizer that
+``growthrates::fit_growthmodel`` uses.
+
+The results have the same ``coefficients`` and ``fit`` structure as the output
+of the R scripts, so they can be stored in a ``ModelingResult`` as-is. The fit
+of the logistic and Baranyi-Roberts models has no ``r2``, only an ``rss``.
+"""
+
+import numpy as np
+
+FITTING_BACKENDS = ('r', 'python')
+"The available implementations of the built-in models, R is the default"
+
+RESULT_DECIMALS = 4
+"""
+Coefficients and fit parameters are rounded to this many decimal places, which
+is what ``jsonlite`` does when the R scripts write their results.
+"""
+
+
+def fit_model(modeling_type, time, values, inputs={}):
+    """
+    Fit the given model type onto the measurements.
+
+    The ``inputs`` are the same as the ones given to the R scripts, only the
+    ``pointCount`` of the "easy linear" method is used here, since the data is
+    expected to already be limited by ``endTime``.
+
+    Returns a dict with the ``coefficients`` and ``fit`` of the model. Raises a
+    ``ValueError`` if there's not enough data for the model.
+    """
+    time   = np.asarray(time, dtype=float)
+    values = np.asarray(values, dtype=float)
+
+    if len(time) < 2:
+        raise ValueError("At least two data points are needed for fitting a model")
+    if np.any(values <= 0):
+        raise ValueError("Values need to be positive for fitting on a log scale")
+
+    if modeling_type == 'easy_linear':
+        coefficients, fit = fit_easy_linear(time, values, int(inputs.get('pointCount', 5)))
+    elif modeling_type == 'logistic':
+        coefficients, fit = _fit_growth_model(
+            predict_log_logistic,
+            time,
+            values,
+            start=_estimate_start(time, values, ['y0', 'mumax', 'K']),
+            lower={'y0': 1, 'mumax': 1e-6, 'K': 1e+2},
+        )
+    elif modeling_type == 'baranyi_roberts':
+        coefficients, fit = _fit_growth_model(
+            predict_log_baranyi_roberts,
+            time,
+            values,
+            start=_estimate_start(time, values, ['y0', 'mumax', 'K', 'h0']),
+            lower={'y0': 1, 'mumax': 1e-6, 'K': 1e+2, 'h0': 1e-9},
+        )
+    else:
+        raise ValueError(f"Don't know how to fit model type: {repr(modeling_type)}")
+
+    return {
+        'coefficients': _round_values(coefficients),
+        'fit':          _round_values(fit),
+    }
+
+
+def fit_easy_linear(time, values, point_count, quota=0.95):
+    """
+    Find the steepest part of the log-transformed growth curve.
+
+    A regression line is fitted through every window of ``point_count``
+    consecutive points. All windows with a slope of at least ``quota`` of the
+    maximum are merged, and the final regression is performed on the merged
+    range.
+
+    Returns a tuple with the coefficients and the fit of that regression.
+    """
+    log_values = np.log(values)
+    count      = len(time)
+
+    # Like growthrates, at least three points are needed for a regression:
+    if point_count < 3 or point_count >= count:
+        raise ValueError(f"The number of points needs to be between 3 and {count - 1}")
+
+    # Windows start at every point but the last `point_count`, like in growthrates:
+    window_count = count - point_count
+    time_windows = np.lib.stride_tricks.sliding_window_view(time, point_count)[:window_count]
+    log_windows  = np.lib.stride_tricks.sliding_window_view(log_values, point_count)[:window_count]
+
+    time_deltas = time_windows - time_windows.mean(axis=1, keepdims=True)
+    log_deltas  = log_windows - log_windows.mean(axis=1, keepdims=True)
+    slopes      = (time_deltas * log_deltas).sum(axis=1) / (time_deltas ** 2).sum(axis=1)
+
+    candidates = np.flatnonzero(slopes >= quota * np.nanmax(slopes))
+    start      = candidates.min()
+    end        = candidates.max() + point_count
+
+    intercept, slope, r2, rss = _linear_regression(time[start:end], log_values[start:end])
+
+    coefficients = {
+        'y0':    values[0],
+        'y0_lm': np.exp(intercept),
+        'mumax': slope,
+        'lag':   (log_values[0] - intercept) / slope,
+    }
+    fit = {'r2': r2, 'rss': rss}
+
+    return coefficients, fit
+
+
+def predict_logistic(time, y0, mumax, K):
+    return (K * y0)/(y0 + (K - y0) * np.exp(-mumax * time))
+
+
+def predict_log_logistic(time, y0, mumax, K):
+    return np.log(K) + np.log(y0) - np.log(y0 + (K - y0) * np.exp(-mumax * time))
+
+
+def predict_baranyi_roberts(time, y0, mumax, K, h0):
+    return np.exp(predict_log_baranyi_roberts(time, y0, mumax, K, h0))
+
+
+def predict_log_baranyi_roberts(time, y0, mumax, K, h0):
+    # Formula taken from the "growthrates" documentation under `grow_baranyi`:
+    # https://cran.r-project.org/web/packages/growthrates/growthrates.pdf
+    #
+    A = time + 1/mumax * np.log(np.exp(-mumax * time) + np.exp(-h0) - np.exp(-mumax * time - h0))
+    return np.log(y0) + mumax * A - np.log(1 + (np.exp(mumax * A) - 1)/np.exp(np.log(K) - np.log(y0)))
+
+
+def _estimate_start(time, values, names):
+    # Starting values come from an easy linear fit, like in the R scripts:
+    el_coefficients, _ = fit_easy_linear(time, values, min(5, len(time) - 1))
+
+    estimates = {
+        'y0':    max(el_coefficients['y0'], 10),
+        'mumax': max(el_coefficients['mumax'], 1e-5),
+        'K':     max(values.max(), 1e+3),
+        'h0':    max(el_coefficients['mumax'] * el_coefficients['lag'], 1e-4),
+    }
+
+    return {name: estimates[name] for name in names}
+
+
+def _fit_growth_model(predict_log, time, values, start, lower):
+    """
+    Minimize the squared residuals of the log-transformed values.
+
+    Like ``FME::modFit`` does for optimizers that don't support bounds, the
+    parameters are transformed to ``log(p - lower)`` so that the search can
+    happen in an unbounded space.
+    """
+    names       = list(start.keys())
+    lower_array = np.array([lower[name] for name in names])
+    log_values  = np.log(values)
+
+    def to_params(x):
+        return lower_array + np.exp(x)
+
+    def residuals(x):
+        with np.errstate(all='ignore'):
+            return log_values - predict_log(time, *to_params(x))
+
+    def cost(x):
+        return np.sum(residuals(x) ** 2)
+
+    start_array   = np.array([start[name] for name in names])
+    x             = _minimize_bfgs(cost, np.log(start_array - lower_array))
+    params        = to_params(x)
+    fit_residuals = residuals(x)
+
+    # The R² of growthrates is not reproduced yet, so only the RSS is given:
+    coefficients = dict(zip(names, params))
+    fit = {'rss': np.sum(fit_residuals ** 2)}
+
+    return coefficients, fit
+
+
+def _minimize_bfgs(fn, x0, max_iterations=100, reltol=1.490116e-08, step=1e-3):
+    """
+    A port of the variable metric minimizer behind R's ``optim(method='BFGS')``
+    with its default settings, including the central-difference gradient.
+    Using the same algorithm as R makes it likely that we end up in the same
+    local minimum.
+    """
+    size = len(x0)
+    x    = np.array(x0, dtype=float)
+
+    f_min = fn(x)
+    if not np.isfinite(f_min):
+        raise ValueError("Initial value of the cost function is not finite")
+
+    g = _central_gradient(fn, x, step)
+    iteration_count = 1
+    gradient_count  = 1
+    last_reset      = gradient_count
+    B = np.eye(size)
+
+    while True:
+        if last_reset == gradient_count:
+            B = np.eye(size)
+
+        x, f_min, new_g, B = _bfgs_step(fn, x, g, B, f_min, step, reltol)
+
+        if new_g is not None:
+            g = new_g
+            gradient_count  += 1
+            iteration_count += 1
+
+            if B is None:
+                last_reset = gradient_count
+        elif last_reset == gradient_count:
+            # No progress even in the direction of the gradient:
+            break
+        else:
+            # No progress, try again from a reset direction:
+            last_reset = gradient_count
+
+        if iteration_count >= max_iterations:
+            break
+        if gradient_count - last_reset > 2 * size:
+            # Periodic restart:
+            last_reset = gradient_count
+
+    return x
+
+
+def _bfgs_step(fn, x, g, B, f_min, step, reltol):
+    """
+    Moves along the search direction given by ``B``. Returns the new point,
+    its cost and gradient and the updated ``B``. The gradient is ``None`` if
+    no progress was made, ``B`` is ``None`` if it needs to be reset.
+    """
+    direction     = -B @ g
+    gradient_proj = direction @ g
+
+    if gradient_proj >= 0:
+        # Search direction is uphill:
+        return x, f_min, None, B
+
+    step_length, new_x, f = _line_search(fn, x, f_min, direction, gradient_proj)
+
+    if f is None:
+        return new_x, f_min, None, B
+    if _is_small_change(f, f_min, reltol):
+        return new_x, f, None, B
+
+    new_g = _central_gradient(fn, new_x, step)
+    new_B = _update_inverse_hessian(B, step_length * direction, new_g - g)
+
+    return new_x, f, new_g, new_B
+
+
+def _central_gradient(fn, x, step):
+    result = np.empty_like(x)
+
+    for i in range(len(x)):
+        delta     = np.zeros_like(x)
+        delta[i]  = step
+        result[i] = (fn(x + delta) - fn(x - delta)) / (2 * step)
+
+    return result
+
+
+def _line_search(fn, x, f_min, direction, gradient_proj, step_reduction=0.2, acceptance_ratio=1e-4):
+    """
+    Backtracks along the direction until the cost decreases enough. Returns
+    the step length, the new point and its cost, which is ``None`` if the
+    steps became too small to change the point.
+    """
+    step_length = 1.0
+
+    while True:
+        new_x = x + step_length * direction
+
+        if _is_same_point(x, new_x):
+            return step_length, new_x, None
+
+        f = fn(new_x)
+        if np.isfinite(f) and f <= f_min + gradient_proj * step_length * acceptance_ratio:
+            return step_length, new_x, f
+
+        step_length *= step_reduction
+
+
+def _update_inverse_hessian(B, t, c):
+    "Returns the BFGS update of ``B``, or ``None`` if it would not stay positive definite"
+    D1 = t @ c
+    if D1 <= 0:
+        return None
+
+    Bc = B @ c
+    D2 = 1 + (Bc @ c) / D1
+
+    return B + (D2 * np.outer(t, t) - np.outer(Bc, t) - np.outer(t, Bc)) / D1
+
+
+def _is_same_point(x, new_x, relative_test=10.0):
+    return np.all(relative_test + x == relative_test + new_x)
+
+
+def _is_small_change(f, f_min, reltol):
+    return abs(f - f_min) <= reltol * (abs(f_min) + reltol)
+
+
+def _linear_regression(x, y):
+    x_deltas = x - x.mean()
+    y_deltas = y - y.mean()
+
+    slope     = (x_deltas * y_deltas).sum() / (x_deltas ** 2).sum()
+    intercept = y.mean() - slope * x.mean()
+    rss       = np.sum((y - intercept - slope * x) ** 2)
+    r2        = 1 - rss / np.sum(y_deltas ** 2)
+
+    return intercept, slope, r2, rss
+
+
+def _round_values(values):
+    return {key: round(float(value), RESULT_DECIMALS) for key, value in values.items()}
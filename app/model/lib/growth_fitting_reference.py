@@ -0,0 +1,61 @@
+"""
+Reference growth curves for checking that the models fitted by
+``app.model.lib.growth_fitting`` match the ones of the R scripts in
+``scripts/modeling/``.
+"""
+
+from pathlib import Path
+
+GROWTH_CURVES = {
+    'with_death_phase': [
+        (0.0,   2146.0),
+        (4.0,   23640.0),
+        (8.0,   400810.0),
+        (12.0,  1139840.0),
+        (16.0,  1418960.0),
+        (20.0,  1122060.0),
+        (24.0,  979120.0),
+        (28.0,  874350.0),
+        (32.0,  860460.0),
+        (36.0,  898770.0),
+        (40.0,  840550.0),
+        (48.0,  964230.0),
+        (60.0,  952260.0),
+        (72.0,  1253140.0),
+        (86.0,  1095660.0),
+        (96.0,  1001220.0),
+        (120.0, 967930.0),
+    ],
+    'short': [
+        (0.0,  2146.0),
+        (4.0,  23640.0),
+        (8.0,  400810.0),
+        (12.0, 1139840.0),
+        (16.0, 1418960.0),
+        (20.0, 1422060.0),
+    ],
+    'with_lag': [
+        (0.0,  1.2e5),
+        (2.0,  1.3e5),
+        (4.0,  1.5e5),
+        (6.0,  3.1e5),
+        (8.0,  9.8e5),
+        (10.0, 3.2e6),
+        (12.0, 8.9e6),
+        (14.0, 1.6e7),
+        (16.0, 1.9e7),
+        (18.0, 2.0e7),
+        (20.0, 2.0e7),
+    ],
+}
+"Growth curves of different shapes as ``(hours, value)`` pairs, by name"
+
+R_RESULTS_PATH = Path('tests/fixtures/growth_fitting_r_results.json')
+"""
+The results of the R scripts for ``GROWTH_CURVES``, exported with
+``scripts/modeling/export_r_results.py`` and compared with the ones of
+``app.model.lib.growth_fitting`` in its tests
+"""
+
+PARITY_POINT_COUNT = 5
+"The ``pointCount`` input of the easy_linear fits compared with R"
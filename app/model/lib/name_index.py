@@ -0,0 +1,180 @@
+"""
+An in-memory trigram index over the names of taxa and metabolites, used for
+autocompletion.
+
+Both tables are only modified by the import scripts in ``scripts/external``,
+which rebuild the index files at the end of an import. Web workers load an
+index lazily on the first completion request and reload it when its file is
+replaced. Without an index file, completion falls back to querying the
+database.
+"""
+
+import os
+import re
+import pickle
+import bisect
+import itertools
+from pathlib import Path
+
+import numpy as np
+
+NAME_INDEX_DIR = Path('var/external_data')
+"The directory of the index files, next to the data of the import scripts"
+
+_EMPTY_POSTINGS = np.array([], dtype=np.int32)
+
+_INDEXES = {}
+
+
+def get_name_index(name):
+    """
+    Returns the index with the given name, loading it from disk if necessary,
+    or ``None`` if it hasn't been built.
+
+    Indexes are never used in the test environment, so tests go through the
+    database.
+    """
+    if os.getenv('APP_ENV') == 'test':
+        return None
+
+    path = _get_index_path(name)
+
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    if name in _INDEXES and _INDEXES[name][0] == mtime:
+        return _INDEXES[name][1]
+
+    with open(path, 'rb') as f:
+        index = pickle.load(f)
+
+    _INDEXES[name] = (mtime, index)
+
+    return index
+
+
+def save_name_index(name, index):
+    """
+    Writes the index to disk. The file is replaced atomically, so a worker
+    never reads a partially written index.
+    """
+    path      = _get_index_path(name)
+    temp_path = path.with_suffix('.tmp')
+
+    with open(temp_path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(temp_path, path)
+
+
+class NameIndex:
+    """
+    Finds the records whose lowercase name contains all words of a query, in
+    order, like a ``LIKE '%word1%word2%'`` pattern.
+
+    If the index is ``anchored``, the first word needs to be at the start of
+    the name and results are ordered by name. Otherwise, results are ordered
+    by the position of the first word in the name, then by name.
+    """
+
+    def __init__(self, records, anchored=False):
+        records = sorted(set(records), key=lambda r: (r[1].lower(), r[0]))
+
+        self.anchored    = anchored
+        self.ids         = [record_id for (record_id, _) in records]
+        self.names       = [name for (_, name) in records]
+        self.lower_names = [name.lower() for name in self.names]
+
+        postings = {}
+        for (index, lower_name) in enumerate(self.lower_names):
+            for trigram in _name_trigrams(lower_name):
+                postings.setdefault(trigram, []).append(index)
+
+        # Records are indexed in order, so the postings are sorted:
+        self.postings = {
+            trigram: np.array(indexes, dtype=np.int32)
+            for (trigram, indexes) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, term, page=1, per_page=10):
+        """
+        Returns a list of ``(id, name)`` pairs for the given page of results
+        and whether there are more pages.
+        """
+        words = term.lower().split()
+        if not words:
+            return [], False
+
+        pattern    = re.compile('.*'.join(re.escape(word) for word in words), re.DOTALL)
+        candidates = self._find_candidates(words)
+        end        = (page - 1) * per_page + per_page
+
+        if self.anchored:
+            # Candidates are already in the order of the results, so we can
+            # stop one after the end of the page:
+            matches = list(itertools.islice(
+                (i for i in candidates if pattern.match(self.lower_names[i])),
+                end + 1,
+            ))
+        else:
+            first_word = words[0]
+            matches    = [i for i in candidates if pattern.search(self.lower_names[i])]
+            matches.sort(key=lambda i: (self.lower_names[i].find(first_word), self.lower_names[i]))
+
+        page_matches = matches[end - per_page:end]
+        has_more     = len(matches) > end
+
+        return [(self.ids[i], self.names[i]) for i in page_matches], has_more
+
+    def _find_candidates(self, words):
+        if self.anchored:
+            start = bisect.bisect_left(self.lower_names, words[0])
+            end   = bisect.bisect_left(self.lower_names, words[0] + chr(0x10ffff))
+        else:
+            start = 0
+            end   = len(self.lower_names)
+
+        trigrams = {trigram for word in words for trigram in _word_trigrams(word)}
+        if not trigrams:
+            return range(start, end)
+
+        # Only the part of each list in the range of the first word is needed,
+        # and the shortest lists are intersected first:
+        bounds   = np.array([start, end], dtype=np.int32)
+        postings = []
+
+        for trigram in trigrams:
+            trigram_postings = self.postings.get(trigram, _EMPTY_POSTINGS)
+            (start_index, end_index) = np.searchsorted(trigram_postings, bounds)
+
+            postings.append(trigram_postings[start_index:end_index])
+
+        postings.sort(key=len)
+
+        candidates = postings[0]
+
+        for other_postings in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates = np.intersect1d(candidates, other_postings, assume_unique=True)
+
+        return candidates.tolist()
+
+
+def _name_trigrams(lower_name):
+    # Query words contain no whitespace, so only trigrams within words of the
+    # name can match them:
+    return {trigram for word in lower_name.split() for trigram in _word_trigrams(word)}
+
+
+def _word_trigrams(word):
+    return [word[i:i + 3] for i in range(len(word) - 2)]
+
+
+def _get_index_path(name):
+    return NAME_INDEX_DIR / f"{name}_name_index.pickle"
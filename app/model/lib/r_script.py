@@ -8,6 +8,12 @@ from pathlib import Path
 
 _LOGGER = logging.getLogger()
 
+_VERSION_CACHE = {}
+"""
+Versions of R and growthrates per ``Rscript`` executable. They don't change
+while a worker is running, so they're only fetched once per process.
+"""
+
 
 class RScript:
     """
@@ -16,11 +22,15 @@ class RScript:
     It uses the ``Rscript`` executable found in the PATH. It expects to be
     given a root directory (likely a temporary one) where it'll look for its
     input files and produce its outputs.
+
+    If given an ``RWorkerPool``, scripts without arguments are executed by one
+    of its long-running R processes instead of a new one.
     """
 
-    def __init__(self, root_path):
+    def __init__(self, root_path, pool=None):
         self.root_path   = Path(root_path)
         self.rscript_exe = shutil.which('Rscript')
+        self.pool        = pool
 
         if self.rscript_exe is None:
             raise ValueError("Could not find `Rscript` executable in PATH")
@@ -28,6 +38,9 @@ class RScript:
     def run(self, script_path, *args):
         script_path = Path(script_path).absolute()
 
+        if self.pool is not None and len(args) == 0:
+            return self._run_in_pool(script_path)
+
         result = subprocess.run(
             [self.rscript_exe, script_path, *args],
             cwd=self.root_path,
@@ -69,6 +82,26 @@ class RScript:
             return {k: v for k, v in raw_data[0].items() if k not in discard_keys}
 
     def get_r_version(self):
+        return self._cached_version('r', self._fetch_r_version)
+
+    def get_growthrates_version(self):
+        return self._cached_version('growthrates', self._fetch_growthrates_version)
+
+    def _cached_version(self, name, fetch):
+        key = (self.rscript_exe, name)
+
+        if key not in _VERSION_CACHE:
+            version = fetch()
+
+            # Don't cache failures, they might be temporary:
+            if version is None:
+                return None
+
+            _VERSION_CACHE[key] = version
+
+        return _VERSION_CACHE[key]
+
+    def _fetch_r_version(self):
         result = subprocess.run(
             [self.rscript_exe, '--version'],
             cwd=self.root_path,
@@ -82,7 +115,7 @@ class RScript:
             self._log_failure(result)
             return None
 
-    def get_growthrates_version(self):
+    def _fetch_growthrates_version(self):
         result = subprocess.run(
             [self.rscript_exe, '-e', 'library(growthrates); getNamespaceVersion("growthrates")'],
             cwd=self.root_path,
@@ -96,6 +129,19 @@ class RScript:
             self._log_failure(result)
             return None
 
+    def _run_in_pool(self, script_path):
+        response = self.pool.run(script_path, cwd=self.root_path.absolute())
+
+        for message in response.get('messages') or []:
+            _LOGGER.warning(message)
+
+        if not response['ok']:
+            _LOGGER.error(response.get('output'))
+            _LOGGER.error(response.get('error'))
+            raise ValueError(f"Failed RScript call: {script_path}")
+
+        return response['output']
+
     def _read_raw_json(self, filename):
         path = self.root_path / filename
 
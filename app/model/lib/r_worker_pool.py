@@ -0,0 +1,243 @@
+import os
+import time
+import atexit
+import select
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+import simplejson as json
+
+_LOGGER = logging.getLogger()
+
+WORKER_SCRIPT = Path('scripts/modeling/worker.R')
+"The R script that runs in each worker process and executes requests"
+
+HEALTH_CHECK_TIMEOUT = 60
+"""
+Seconds to wait for a response to a health check. The first one also waits
+for R to start up and load its libraries.
+"""
+
+_POOL = None
+_POOL_PID = None
+
+
+def get_pool():
+    """
+    Returns a pool of R workers shared by the current process, creating it if
+    necessary. It can be configured with environment variables:
+
+    * ``R_WORKER_POOL_SIZE``: number of R processes, ``0`` disables the pool
+    * ``R_WORKER_MAX_JOBS``: number of jobs after which a process is restarted
+    * ``R_WORKER_TIMEOUT``: seconds after which a running job is killed
+
+    If the pool is disabled or ``Rscript`` is not available, returns ``None``.
+    """
+    global _POOL, _POOL_PID
+
+    # Processes forked from the one that created the pool (e.g. celery
+    # workers) need their own R processes:
+    if _POOL is not None and _POOL_PID == os.getpid():
+        return _POOL
+
+    size        = int(os.getenv('R_WORKER_POOL_SIZE', '1'))
+    max_jobs    = int(os.getenv('R_WORKER_MAX_JOBS', '100'))
+    timeout     = int(os.getenv('R_WORKER_TIMEOUT', '600'))
+    rscript_exe = shutil.which('Rscript')
+
+    if size <= 0 or rscript_exe is None:
+        return None
+
+    _POOL     = RWorkerPool(rscript_exe, size=size, max_jobs=max_jobs, timeout=timeout)
+    _POOL_PID = os.getpid()
+
+    atexit.register(_POOL.shutdown)
+
+    return _POOL
+
+
+class RWorkerPool:
+    """
+    A set of long-running R processes that execute scripts.
+
+    Starting R and loading the growthrates library takes seconds, while a
+    single fit is usually much faster. Keeping the processes alive lets us pay
+    the start-up cost once per worker rather than once per script.
+
+    Workers are checked for health before every job and restarted if they
+    don't respond. A worker that crashes or times out during a job is
+    discarded, and workers are recycled after ``max_jobs`` jobs to limit the
+    impact of any state that leaks between scripts.
+    """
+
+    def __init__(self, rscript_exe, size=1, max_jobs=100, timeout=600, worker_script=WORKER_SCRIPT):
+        self.rscript_exe   = rscript_exe
+        self.worker_script = Path(worker_script).absolute()
+        self.max_jobs      = max_jobs
+        self.timeout       = timeout
+
+        self.idle_workers = []
+        self.lock         = threading.Lock()
+        self.slots        = threading.BoundedSemaphore(size)
+
+    def run(self, script_path, cwd):
+        """
+        Run the given R script with ``cwd`` as its working directory.
+
+        Returns a dict with an ``ok`` flag, the printed ``output`` of the
+        script, a list of ``messages`` and an ``error``, if any.
+        """
+        with self.slots:
+            worker = self._checkout()
+
+            try:
+                response = worker.run(script_path, cwd, timeout=self.timeout)
+            except Exception:
+                # The worker is in an unknown state, it'll be replaced:
+                worker.stop()
+                raise
+
+            self._checkin(worker)
+
+        return response
+
+    def shutdown(self):
+        with self.lock:
+            workers, self.idle_workers = self.idle_workers, []
+
+        for worker in workers:
+            worker.stop()
+
+    def _checkout(self):
+        with self.lock:
+            worker = self.idle_workers.pop() if self.idle_workers else None
+
+        if worker is not None and not worker.ping(timeout=HEALTH_CHECK_TIMEOUT):
+            _LOGGER.warning("R worker failed a health check, restarting it")
+            worker.stop()
+            worker = None
+
+        if worker is None:
+            worker = RWorker(self.rscript_exe, self.worker_script)
+
+        return worker
+
+    def _checkin(self, worker):
+        if worker.job_count >= self.max_jobs:
+            worker.stop()
+            return
+
+        with self.lock:
+            self.idle_workers.append(worker)
+
+
+class RWorker:
+    """
+    A single R process that receives line-delimited JSON requests.
+
+    Its standard error, which includes errors while starting R and loading
+    libraries, is written to a temporary file and the end of it is included
+    in the errors raised for the worker.
+    """
+
+    STDERR_TAIL_SIZE = 2000
+    "The number of bytes of standard error that are included in errors"
+
+    def __init__(self, rscript_exe, worker_script):
+        # Appending, so reading the file doesn't move the position R writes at:
+        self.stderr    = tempfile.TemporaryFile(mode='a+b')
+        self.job_count = 0
+        self.process   = subprocess.Popen(
+            [rscript_exe, str(worker_script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self.stderr,
+        )
+
+        # Responses are read as they arrive and split into lines here, so a
+        # partially written line can't block past the timeout:
+        self.output_buffer = b''
+        os.set_blocking(self.process.stdout.fileno(), False)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def ping(self, timeout):
+        if not self.is_alive():
+            return False
+
+        try:
+            return self._request({'type': 'ping'}, timeout)['ok']
+        except ValueError:
+            return False
+
+    def run(self, script_path, cwd, timeout):
+        self.job_count += 1
+
+        return self._request(
+            {'type': 'run', 'script': str(script_path), 'cwd': str(cwd)},
+            timeout,
+        )
+
+    def stop(self):
+        if self.is_alive():
+            try:
+                # The worker exits when its input is closed:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+        self.stderr.close()
+
+    def _request(self, payload, timeout):
+        try:
+            self.process.stdin.write(json.dumps(payload).encode('utf-8') + b"\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            self.process.wait()
+            raise self._error(f"R worker is not running: {e}")
+
+        return json.loads(self._read_line(timeout))
+
+    def _read_line(self, timeout):
+        deadline = time.monotonic() + timeout
+        stdout   = self.process.stdout.fileno()
+
+        while b"\n" not in self.output_buffer:
+            remaining = deadline - time.monotonic()
+            ready     = remaining > 0 and select.select([stdout], [], [], remaining)[0]
+
+            if not ready:
+                self.process.kill()
+                self.process.wait()
+                raise self._error(f"R worker did not respond in {timeout} seconds")
+
+            try:
+                chunk = os.read(stdout, 65536)
+            except BlockingIOError:
+                continue
+
+            if not chunk:
+                raise self._error(f"R worker exited unexpectedly with code {self.process.wait()}")
+
+            self.output_buffer += chunk
+
+        line, self.output_buffer = self.output_buffer.split(b"\n", 1)
+
+        return line
+
+    def _error(self, message):
+        size   = os.fstat(self.stderr.fileno()).st_size
+        offset = max(size - self.STDERR_TAIL_SIZE, 0)
+        stderr = os.pread(self.stderr.fileno(), size - offset, offset).decode('utf-8', errors='replace').strip()
+
+        if stderr:
+            message = f"{message}, standard error:\n{stderr}"
+
+        return ValueError(message)
@@ -0,0 +1,188 @@
+"""
+Precomputed numbers of studies per strain and per metabolite, stored in the
+``SearchFacets`` table.
+
+Only the counts of the strains and metabolites of a study are recalculated
+when it changes: when a submission updates it, both the ones it used to
+include and the ones it includes now, and when it's published, its current
+ones.
+"""
+
+import sqlalchemy as sql
+import sqlalchemy.dialects.mysql as mysql
+
+from app.model.orm import (
+    SearchFacet,
+    Study,
+    StudyMetabolite,
+    StudyStrain,
+)
+
+FACET_TYPES = ('strain', 'metabolite')
+"The ``subjectType`` values of facets"
+
+
+def fetch_study_facet_ids(db_conn, study_id):
+    """
+    Returns the NCBI ids and ChEBI ids of the study, as a dict of sets with
+    the facet types as keys.
+    """
+    facet_ids = {}
+
+    for facet_type in FACET_TYPES:
+        id_column = _get_id_column(facet_type)
+
+        facet_ids[facet_type] = set(db_conn.execute(
+            sql.select(id_column)
+            .where(_get_study_id_column(facet_type) == study_id)
+            .where(_get_valid_id_clause(facet_type))
+        ).scalars())
+
+    return facet_ids
+
+
+def refresh_study_facets(db_conn, study_id, previous_facet_ids=None):
+    """
+    Recalculates the counts of the strains and metabolites of the study. The
+    ``previous_facet_ids`` are the result of ``fetch_study_facet_ids`` before
+    the study was modified, so removed strains and metabolites are updated as
+    well.
+    """
+    facet_ids = fetch_study_facet_ids(db_conn, study_id)
+
+    for facet_type in FACET_TYPES:
+        subject_ids = facet_ids[facet_type] | (previous_facet_ids or {}).get(facet_type, set())
+        _refresh_facet_counts(db_conn, facet_type, subject_ids)
+
+
+def rebuild_search_facets(db_conn):
+    "Recalculates all counts, for example to fill in an existing database"
+    db_conn.execute(sql.delete(SearchFacet))
+
+    for facet_type in FACET_TYPES:
+        rows = db_conn.execute(_build_count_query(facet_type)).all()
+        _save_facet_counts(db_conn, facet_type, rows)
+
+
+def fetch_facet_counts(db_conn, facet_ids, include_unpublished=False):
+    """
+    Returns the number of studies for each of the given NCBI ids and ChEBI
+    ids, as a dict with the facet types as keys. Ids without studies are not
+    included.
+
+    Unpublished studies are only counted with ``include_unpublished``.
+    """
+    study_count = SearchFacet.publishedStudyCount
+    if include_unpublished:
+        study_count = study_count + SearchFacet.unpublishedStudyCount
+
+    facet_counts = {}
+
+    for facet_type in FACET_TYPES:
+        subject_ids = [str(subject_id) for subject_id in facet_ids.get(facet_type, [])]
+        if not subject_ids:
+            facet_counts[facet_type] = {}
+            continue
+
+        rows = db_conn.execute(
+            sql.select(SearchFacet.subjectId, study_count)
+            .where(
+                SearchFacet.subjectType == facet_type,
+                SearchFacet.subjectId.in_(subject_ids),
+                study_count > 0,
+            )
+        ).all()
+
+        facet_counts[facet_type] = {
+            _parse_subject_id(facet_type, subject_id): count
+            for (subject_id, count) in rows
+        }
+
+    return facet_counts
+
+
+def _refresh_facet_counts(db_conn, facet_type, subject_ids):
+    if not subject_ids:
+        return
+
+    count_query = _build_count_query(facet_type).where(_get_id_column(facet_type).in_(subject_ids))
+    counts      = {
+        str(subject_id): (published_count, unpublished_count)
+        for (subject_id, published_count, unpublished_count) in db_conn.execute(count_query)
+    }
+
+    # Ids that no longer have studies keep their rows with zero counts, so
+    # concurrent submissions only update rows in place, in the same order:
+    rows = [
+        (subject_id, *counts.get(str(subject_id), (0, 0)))
+        for subject_id in sorted(subject_ids, key=str)
+    ]
+    _save_facet_counts(db_conn, facet_type, rows)
+
+
+def _save_facet_counts(db_conn, facet_type, rows):
+    if not rows:
+        return
+
+    insert = mysql.insert(SearchFacet).values([
+        {
+            'subjectType':           facet_type,
+            'subjectId':             str(subject_id),
+            'publishedStudyCount':   published_count,
+            'unpublishedStudyCount': unpublished_count,
+        }
+        for (subject_id, published_count, unpublished_count) in rows
+    ])
+
+    db_conn.execute(insert.on_duplicate_key_update(
+        publishedStudyCount=insert.inserted.publishedStudyCount,
+        unpublishedStudyCount=insert.inserted.unpublishedStudyCount,
+    ))
+
+
+def _build_count_query(facet_type):
+    id_column = _get_id_column(facet_type)
+
+    # Counting distinct ids only counts the rows where the case matches:
+    published_study_id   = sql.case((Study.publishedAt.is_not(None), Study.publicId))
+    unpublished_study_id = sql.case((Study.publishedAt.is_(None), Study.publicId))
+
+    return (
+        sql.select(
+            id_column,
+            sql.func.count(published_study_id.distinct()),
+            sql.func.count(unpublished_study_id.distinct()),
+        )
+        .join(Study, Study.publicId == _get_study_id_column(facet_type))
+        .where(_get_valid_id_clause(facet_type))
+        .group_by(id_column)
+    )
+
+
+def _get_id_column(facet_type):
+    if facet_type == 'strain':
+        return StudyStrain.ncbiId
+    else:
+        return StudyMetabolite.chebiId
+
+
+def _get_study_id_column(facet_type):
+    if facet_type == 'strain':
+        return StudyStrain.studyId
+    else:
+        return StudyMetabolite.studyId
+
+
+def _get_valid_id_clause(facet_type):
+    # Custom strains have no NCBI id or the placeholder 0:
+    if facet_type == 'strain':
+        return sql.and_(StudyStrain.ncbiId.is_not(None), StudyStrain.ncbiId != 0)
+    else:
+        return StudyMetabolite.chebiId.is_not(None)
+
+
+def _parse_subject_id(facet_type, subject_id):
+    if facet_type == 'strain':
+        return int(subject_id)
+    else:
+        return subject_id
@@ -1,132 +1,183 @@
 """
-This module contains the main function that performs the search query. In the
-long run, it should be replaced by something that uses a full-text search and
-is less complicated.
+Builds the query of the advanced search from the clauses of a ``SearchForm``.
+
+Each clause is turned into a select of the ids of the studies it matches, and
+the clauses are combined with set operations, following the precedence of
+boolean logic: ``AND`` and ``NOT`` bind tighter than ``OR``, so
+
+    A AND B OR C NOT D
+
+is planned as ``(A ∩ B) ∪ (C ∖ D)``. Within each group, the clauses are
+ordered by their estimated cost, so that lookups by id narrow down the set of
+studies before clauses that need to scan names.
+
+The result is a single statement that can be used as a subquery and
+inspected with ``EXPLAIN``.
+"""
+
+import sqlalchemy as sql
+
+from app.model.orm import (
+    Metabolite,
+    Project,
+    Study,
+    StudyMetabolite,
+    StudySearchTerm,
+    StudyStrain,
+)
+from app.model.lib.study_search_index import SEARCH_FIELD_WEIGHTS, tokenize
+
+CLAUSE_COSTS = {
+    'Study ID':         0,
+    'Project ID':       0,
+    'NCBI ID':          1,
+    'chEBI ID':         1,
+    'Study Name':       2,
+    'Project Name':     3,
+    'Microbial Strain': 3,
+    'Metabolites':      3,
+}
+"""
+A rough ranking of the cost of each clause: primary key lookups, indexed
+foreign keys, the name tokens of the search index, and substring matches that
+scan a whole table.
 """
 
 
-def dynamical_query(all_advance_query):
-    base_query = "SELECT DISTINCT publicId"
-    search_final_query = ""
-    values = []
-
-    for query_dict in all_advance_query:
-        where_clause = ""
-
-        if not query_dict['option']:
-            query_dict['option'] = 'Study Name'
-
-        if query_dict['option'] == 'Project Name':
-            project_name = query_dict['value'].strip().lower()
-            if project_name != '':
-                where_clause = f"""
-                    FROM Studies
-                    WHERE projectUuid IN (
-                        SELECT uuid
-                        FROM Projects
-                        WHERE LOWER(name) LIKE :value_{len(values)}
-                    )
-                """
-                values.append(f'%{project_name}%')
-        elif query_dict['option'] == 'Project ID':
-            project_id = query_dict['value'].strip()
-            where_clause = f"""
-                FROM Studies
-                WHERE projectUuid IN (
-                    SELECT uuid
-                    FROM Projects
-                    WHERE publicId = :value_{len(values)}
-                )
-            """
-            values.append(project_id)
-        elif query_dict['option'] == 'Study Name':
-            study_name = query_dict['value'].strip().lower()
-            if study_name != '':
-                where_clause = f"""
-                    FROM Studies
-                    WHERE LOWER(name) LIKE :value_{len(values)}
-                """
-                values.append(f"%{study_name}%")
-        elif query_dict['option'] == 'Study ID':
-            study_id = query_dict['value'].strip()
-            where_clause = f"""
-                FROM Studies
-                WHERE publicId = :value_{len(values)}
-            """
-            values.append(study_id)
-        elif query_dict['option'] == 'Microbial Strain':
-            microb_strain = query_dict['value'].strip().lower()
-            # Note: Creating a nested query so that "Strains.studyId" can be
-            # renamed to "publicId"
-            where_clause = f"""
-            FROM (
-                SELECT studyId as publicId, name, ncbiId
-                FROM StudyStrains
-            ) as Strains_Alias
-            WHERE LOWER(name) LIKE :value_{len(values)}
-            """
-            values.append(f"%{microb_strain}%")
-        elif query_dict['option'] == 'NCBI ID':
-            microb_ID = query_dict['value'].strip()
-            where_clause = f"""
-            FROM (
-                SELECT studyId as publicId, name, ncbiId
-                FROM StudyStrains
-            ) as Strains_Alias
-            WHERE ncbiId = :value_{len(values)}
-            """
-            values.append(microb_ID)
-        elif query_dict['option'] == 'Metabolites':
-            metabo = query_dict['value'].strip().lower()
-            where_clause = f"""
-                FROM (
-                    SELECT
-                        studyId as publicId,
-                        Metabolites.name as name,
-                        Metabolites.chebiId
-                    FROM StudyMetabolites
-                    INNER JOIN Metabolites ON Metabolites.chebiId = StudyMetabolites.chebiId
-                ) as StudyMetabolites_Alias
-                WHERE LOWER(name) LIKE :value_{len(values)}
-            """
-            values.append(f"%{metabo}%")
-        elif query_dict['option'] == 'chEBI ID':
-            chebi_id = query_dict['value'].strip()
-
-            if not chebi_id.startswith('CHEBI:'):
-                chebi_id = f"CHEBI:{chebi_id}"
-
-            where_clause = f"""
-                FROM (
-                    SELECT
-                        studyId as publicId,
-                        Metabolites.name as name,
-                        Metabolites.chebiId
-                    FROM StudyMetabolites
-                    INNER JOIN Metabolites ON Metabolites.chebiId = StudyMetabolites.chebiId
-                ) as StudyMetabolites_Alias
-                WHERE chebiId = :value_{len(values)}
-            """
-            values.append(chebi_id)
-        else:
-            raise ValueError(f"Unknown option: {query_dict['option']}")
-
-        logic_add = ""
-        if 'logic_operator' in query_dict:
-            if query_dict['logic_operator'] == 'AND':
-                logic_add = " AND publicId IN ("
-            if query_dict['logic_operator'] == 'OR':
-                logic_add = " OR publicId IN ("
-            if query_dict['logic_operator'] == 'NOT':
-                logic_add = " AND publicId NOT IN ("
-
-        if logic_add != "":
-            final_query = logic_add + " " + base_query + " " + where_clause + " )"
-        else:
-            final_query = base_query + " " + where_clause + " "
-
-        search_final_query += final_query
-
-    search_final_query = search_final_query + ";"
-
-    return search_final_query, values
+def build_advanced_search_query(clauses):
+    """
+    Returns a select of the ``publicId`` of all studies that match the given
+    clauses, a list of dicts with ``option``, ``value`` and
+    ``logic_operator`` keys. The operator of the first clause is ignored.
+
+    Clauses with a blank value are skipped. If there are no other clauses,
+    the query matches nothing.
+    """
+    groups = [[]]
+
+    for (index, clause) in enumerate(clauses):
+        option = clause.get('option') or 'Study Name'
+        if option not in CLAUSE_COSTS:
+            raise ValueError(f"Unknown option: {option}")
+
+        logic_operator = clause.get('logic_operator') if index > 0 else None
+        study_ids      = _build_clause_query(option, (clause.get('value') or '').strip())
+
+        if study_ids is None:
+            continue
+
+        if logic_operator == 'OR' and groups[-1]:
+            groups.append([])
+
+        groups[-1].append((CLAUSE_COSTS[option], logic_operator == 'NOT', study_ids))
+
+    group_queries = [_build_group_query(group) for group in groups if group]
+
+    if not group_queries:
+        return sql.select(Study.publicId).where(sql.false())
+    elif len(group_queries) == 1:
+        return group_queries[0]
+    else:
+        return _as_select(sql.union(*group_queries))
+
+
+def _build_group_query(group):
+    # A stable sort keeps the order of the form for clauses with equal costs:
+    group = sorted(group, key=lambda item: item[0])
+
+    included = [study_ids for (_, negated, study_ids) in group if not negated]
+    excluded = [study_ids for (_, negated, study_ids) in group if negated]
+
+    if not included:
+        query = sql.select(Study.publicId)
+    elif len(included) == 1:
+        query = included[0]
+    else:
+        query = _as_select(sql.intersect(*included))
+
+    if excluded:
+        query = _as_select(sql.except_(query, *excluded))
+
+    return query
+
+
+def _build_clause_query(option, value):
+    if value == '':
+        return None
+
+    if option == 'Study ID':
+        return (
+            sql.select(Study.publicId)
+            .where(Study.publicId == value)
+        )
+    elif option == 'Project ID':
+        return (
+            sql.select(Study.publicId)
+            .join(Project, Project.uuid == Study.projectUuid)
+            .where(Project.publicId == value)
+        )
+    elif option == 'NCBI ID':
+        ncbi_id = value.removeprefix('NCBI:')
+        if not ncbi_id.isdigit():
+            return sql.select(Study.publicId).where(sql.false())
+
+        return (
+            sql.select(StudyStrain.studyId.label('publicId'))
+            .where(StudyStrain.ncbiId == int(ncbi_id))
+        )
+    elif option == 'chEBI ID':
+        chebi_id = value if value.startswith('CHEBI:') else f"CHEBI:{value}"
+
+        return (
+            sql.select(StudyMetabolite.studyId.label('publicId'))
+            .where(StudyMetabolite.chebiId == chebi_id)
+        )
+    elif option == 'Study Name':
+        return _build_name_query(value)
+    elif option == 'Project Name':
+        return (
+            sql.select(Study.publicId)
+            .join(Project, Project.uuid == Study.projectUuid)
+            .where(sql.func.lower(Project.name).contains(value.lower(), autoescape=True))
+        )
+    elif option == 'Microbial Strain':
+        return (
+            sql.select(StudyStrain.studyId.label('publicId'))
+            .where(sql.func.lower(StudyStrain.name).contains(value.lower(), autoescape=True))
+        )
+    elif option == 'Metabolites':
+        return (
+            sql.select(StudyMetabolite.studyId.label('publicId'))
+            .join(Metabolite, Metabolite.chebiId == StudyMetabolite.chebiId)
+            .where(sql.func.lower(Metabolite.name).contains(value.lower(), autoescape=True))
+        )
+
+
+def _build_name_query(value):
+    """
+    Matches the studies with a word in their name that starts with each word
+    of the value. The name has the highest weight in the search index, so its
+    words are the terms with at least that weight.
+    """
+    words = tokenize(value)
+    if not words:
+        return None
+
+    word_queries = [
+        sql.select(StudySearchTerm.studyId.label('publicId'))
+        .where(StudySearchTerm.term.startswith(word, autoescape=True))
+        .where(StudySearchTerm.weight >= SEARCH_FIELD_WEIGHTS['name'])
+        for word in words
+    ]
+
+    if len(word_queries) == 1:
+        return word_queries[0]
+    else:
+        return _as_select(sql.intersect(*word_queries))
+
+
+def _as_select(compound_query):
+    # Nested set operations are wrapped in a derived table, since not all
+    # databases accept parenthesized compound selects as operands:
+    subquery = compound_query.subquery()
+    return sql.select(subquery.c.publicId)
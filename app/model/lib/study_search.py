@@ -2,6 +2,12 @@ import re
 
 import sqlalchemy as sql
 
+from app.model.lib.study_search_index import (
+    build_relevance_subquery,
+    tokenize,
+)
+from app.model.lib.errors import ClientError
+from app.model.lib.search_facets import fetch_facet_counts
 from app.model.orm import (
     Metabolite,
     Study,
@@ -11,8 +17,18 @@ from app.model.orm import (
     Taxon,
 )
 
+STUDY_PUBLIC_ID_PATTERN = re.compile(r'SMGDB\d{8}')
+"Query words in this form are looked up as study ids instead of text"
+
 
 class StudySearch():
+    """
+    Studies that match a text query and/or a list of strains and metabolites,
+    paginated by the sort key of the last result instead of an offset: the
+    ``next_after`` attribute of a search can be given as the ``after``
+    parameter of the next one.
+    """
+
     def __init__(
         self,
         db_session,
@@ -21,7 +37,7 @@ class StudySearch():
         ncbiIds=None,
         chebiIds=None,
         per_page=10,
-        offset=0,
+        after=None,
     ):
         self.db_session = db_session
         self.user       = user
@@ -29,72 +45,118 @@ class StudySearch():
         self.per_page   = per_page
         self.ncbiIds    = [int(n) for n in (ncbiIds or [])]
         self.chebiIds   = chebiIds or []
-        self.offset     = offset
+        self.after      = after or None
 
         self.query_words = []
-        self.has_more = False
+        self.has_more    = False
+        self.next_after  = None
+
+        self._total_count = None
 
     def fetch_results(self):
-        publish_clause = self._build_publish_clause()
-        order_clauses = (Study.publicId.desc(),)
+        db_query, sort_keys = self._build_query()
+
+        db_query = db_query.add_columns(*sort_keys).order_by(*[key.desc() for key in sort_keys])
+
+        if self.after:
+            after_values = _parse_cursor(self.after, len(sort_keys))
+
+            if len(sort_keys) == 1:
+                db_query = db_query.where(Study.publicId < after_values[0])
+            else:
+                db_query = db_query.having(sql.tuple_(*sort_keys) < sql.tuple_(*after_values))
+
+        # One more than requested to find out if there's a next page:
+        db_query = db_query.limit(self.per_page + 1)
+
+        rows = self.db_session.execute(db_query).all()
+
+        self.has_more = len(rows) > self.per_page
+        rows          = rows[:self.per_page]
+
+        if self.has_more:
+            self.next_after = ','.join(str(value) for value in rows[-1][1:])
+        else:
+            self.next_after = None
+
+        return [row[0] for row in rows]
+
+    def fetch_total_count(self):
+        """
+        The number of all matching studies, regardless of pagination. It's
+        only calculated when requested, once per search.
+        """
+        if self._total_count is None:
+            db_query, _ = self._build_query()
+
+            self._total_count = self.db_session.scalars(
+                sql.select(sql.func.count()).select_from(db_query.subquery())
+            ).one()
+
+        return self._total_count
+
+    def _build_query(self):
+        """
+        Returns the grouped query of matching studies and the expressions of
+        its sort key, from the most important one to the ``publicId``, all of
+        them in descending order.
+        """
+        sort_keys = [Study.publicId]
 
         db_query = (
             sql.select(Study)
             .group_by(Study.publicId)
             .join(StudyUser, isouter=True)
-            .where(publish_clause)
-            .limit(self.per_page)
-            .offset(self.offset)
-        )
-        db_count_query = (
-            sql.select(sql.func.count(Study.publicId.distinct()))
-            .join(StudyUser, isouter=True)
-            .where(publish_clause)
+            .where(self._build_publish_clause())
         )
 
         if len(self.query):
             query = _replace_public_id_references(self.query)
             self.query_words = query.split()
 
-            # Note: this looks for the entire combination in each of the
-            # fields, so searching for e.g. "Garza batch" will not find a good
-            # result if "Garza" is an author, and "batch" is part of the title.
-            #
-            like_expr = '%' + '%'.join(self.query_words) + '%'
-
-            query_clause = sql.or_(
-                Study.name.ilike(like_expr),
-                Study.authorCache.like(like_expr),
-                Study.description.ilike(like_expr),
-                Study.publicId.in_(self.query_words),
-            )
+            # Words can match any of the indexed fields, public ids are
+            # matched directly:
+            public_ids   = [w for w in self.query_words if STUDY_PUBLIC_ID_PATTERN.fullmatch(w)]
+            search_words = tokenize(' '.join(w for w in self.query_words if w not in public_ids))
+
+            query_clauses = [Study.publicId.in_(public_ids)]
+
+            if search_words:
+                relevance = build_relevance_subquery(search_words)
+                db_query  = db_query.join(relevance, relevance.c.studyId == Study.publicId, isouter=True)
+
+                query_clauses.append(relevance.c.studyId.is_not(None))
+
+                # Public id matches have no score, they rank after text matches:
+                sort_keys.insert(0, sql.func.coalesce(sql.func.max(relevance.c.score), 0))
 
-            db_query       = db_query.where(query_clause)
-            db_count_query = db_count_query.where(query_clause)
+            db_query = db_query.where(sql.or_(*query_clauses))
         else:
             self.query_words = []
 
         if self.chebiIds:
-            db_query       = db_query.join(StudyMetabolite).where(StudyMetabolite.chebiId.in_(self.chebiIds))
-            db_count_query = db_count_query.join(StudyMetabolite).where(StudyMetabolite.chebiId.in_(self.chebiIds))
-
-            order_clauses = (sql.func.count(StudyMetabolite.id.distinct()).desc(), *order_clauses)
+            db_query = db_query.join(StudyMetabolite).where(StudyMetabolite.chebiId.in_(self.chebiIds))
+            sort_keys.insert(0, sql.func.count(StudyMetabolite.id.distinct()))
 
         if self.ncbiIds:
-            db_query       = db_query.join(StudyStrain).where(StudyStrain.ncbiId.in_(self.ncbiIds))
-            db_count_query = db_count_query.join(StudyStrain).where(StudyStrain.ncbiId.in_(self.ncbiIds))
-
-            order_clauses = (sql.func.count(StudyStrain.ncbiId.distinct()).desc(), *order_clauses)
+            db_query = db_query.join(StudyStrain).where(StudyStrain.ncbiId.in_(self.ncbiIds))
+            sort_keys.insert(0, sql.func.count(StudyStrain.ncbiId.distinct()))
 
-        db_query = db_query.order_by(*order_clauses)
+        return db_query, sort_keys
 
-        results = self.db_session.scalars(db_query).all()
-        count   = self.db_session.scalars(db_count_query).one()
+    def fetch_facet_counts(self, studies):
+        """
+        The number of studies that include each strain and metabolite of the
+        given studies, from the precomputed ``SearchFacets``. Unpublished
+        studies are only counted for admins.
+        """
+        facet_ids = {
+            'strain':     {s.ncbiId for study in studies for s in study.strains if s.notUnknown},
+            'metabolite': {m.chebiId for study in studies for m in study.metabolites},
+        }
+        include_unpublished = bool(self.user and self.user.isAdmin)
 
-        if count > self.offset + len(results):
-            self.has_more = True
-
-        return results
+        return fetch_facet_counts(self.db_session, facet_ids, include_unpublished=include_unpublished)
 
     def fetch_taxa(self):
         return self.db_session.scalars(
@@ -128,3 +190,13 @@ def _replace_public_id_references(text):
 
 def _replace_study_reference(m):
     return f"SMGDB{int(m[1]):08d}"
+
+
+def _parse_cursor(after, key_count):
+    # All keys are integers, except for the final public id:
+    *numbers, public_id = after.split(',')
+
+    if len(numbers) != key_count - 1 or not all(n.isdigit() for n in numbers):
+        raise ClientError(f"Invalid cursor: {after!r}")
+
+    return [*(int(n) for n in numbers), public_id]
@@ -0,0 +1,146 @@
+"""
+A full-text index of studies, stored as an inverted index in the
+``StudySearchTerms`` table.
+
+The searchable fields of a study are its name, description, authors, and the
+names of its strains and metabolites. They are split into lowercase words and
+each word is stored once per study, with the weight of the most important
+field it was found in. A study matches a query if every word of the query is
+the prefix of one of its terms, regardless of the field, and the results are
+ranked by the sum of the weights of the matching terms.
+
+The index of a study is rebuilt in full whenever a submission updates it.
+"""
+
+import re
+
+import sqlalchemy as sql
+
+from app.model.orm import (
+    Metabolite,
+    Study,
+    StudyMetabolite,
+    StudySearchTerm,
+    StudyStrain,
+)
+
+SEARCH_FIELD_WEIGHTS = {
+    'name':        4,
+    'authors':     3,
+    'strains':     2,
+    'metabolites': 2,
+    'description': 1,
+}
+"The weight of the terms of each searchable field in the ranking of results"
+
+EXACT_MATCH_FACTOR = 2
+"Multiplies the weight of a term that is equal to the query word, not just prefixed by it"
+
+MAX_TERM_LENGTH = 100
+"Longer words are truncated to fit the ``term`` column"
+
+
+def tokenize(text):
+    "Splits the text into lowercase words for indexing and searching"
+    return [word[:MAX_TERM_LENGTH] for word in re.findall(r'\w+', (text or '').lower())]
+
+
+def update_study_search_index(db_conn, study_id):
+    """
+    Replaces the indexed terms of the given study with the current contents
+    of its searchable fields. Works with both a session and a connection.
+    """
+    weighted_terms = {}
+
+    for (field, text) in _fetch_searchable_fields(db_conn, study_id):
+        weight = SEARCH_FIELD_WEIGHTS[field]
+
+        for term in tokenize(text):
+            weighted_terms[term] = max(weighted_terms.get(term, 0), weight)
+
+    db_conn.execute(
+        sql.delete(StudySearchTerm)
+        .where(StudySearchTerm.studyId == study_id)
+    )
+
+    if weighted_terms:
+        db_conn.execute(sql.insert(StudySearchTerm), [
+            {'studyId': study_id, 'term': term, 'weight': weight}
+            for (term, weight) in weighted_terms.items()
+        ])
+
+
+def rebuild_study_search_index(db_conn):
+    "Indexes all studies, for example to fill in the index of an existing database"
+    study_ids = db_conn.execute(sql.select(Study.publicId)).scalars().all()
+
+    for study_id in study_ids:
+        update_study_search_index(db_conn, study_id)
+
+
+def build_relevance_subquery(words):
+    """
+    Returns a subquery with ``studyId`` and ``score`` columns, for the studies
+    that match all of the given query words.
+
+    Each word contributes the highest weight of the terms that it is a prefix
+    of, multiplied by ``EXACT_MATCH_FACTOR`` for terms that are equal to it.
+    """
+    word_matches = []
+
+    for (index, word) in enumerate(words):
+        term_score = sql.case(
+            (StudySearchTerm.term == word, StudySearchTerm.weight * EXACT_MATCH_FACTOR),
+            else_=StudySearchTerm.weight,
+        )
+
+        word_matches.append(
+            sql.select(
+                StudySearchTerm.studyId.label('studyId'),
+                sql.literal(index).label('wordIndex'),
+                sql.func.max(term_score).label('score'),
+            )
+            .where(StudySearchTerm.term.startswith(word, autoescape=True))
+            .group_by(StudySearchTerm.studyId)
+        )
+
+    word_matches = sql.union_all(*word_matches).subquery()
+
+    return (
+        sql.select(
+            word_matches.c.studyId,
+            sql.func.sum(word_matches.c.score).label('score'),
+        )
+        .group_by(word_matches.c.studyId)
+        .having(sql.func.count(word_matches.c.wordIndex.distinct()) == len(words))
+        .subquery()
+    )
+
+
+def _fetch_searchable_fields(db_conn, study_id):
+    study = db_conn.execute(
+        sql.select(Study.name, Study.description, Study.authorCache)
+        .where(Study.publicId == study_id)
+    ).one_or_none()
+
+    if study is None:
+        return []
+
+    strain_names = db_conn.execute(
+        sql.select(StudyStrain.name)
+        .where(StudyStrain.studyId == study_id)
+    ).scalars().all()
+
+    metabolite_names = db_conn.execute(
+        sql.select(Metabolite.name)
+        .join(StudyMetabolite)
+        .where(StudyMetabolite.studyId == study_id)
+    ).scalars().all()
+
+    return [
+        ('name',        study.name),
+        ('description', study.description),
+        ('authors',     study.authorCache),
+        ('strains',     ' '.join(strain_names)),
+        ('metabolites', ' '.join(metabolite_names)),
+    ]
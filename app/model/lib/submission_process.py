@@ -1,9 +1,10 @@
-import io
 import copy
-import itertools
+import math
 from datetime import datetime, timedelta, time, UTC
+from decimal import Decimal
 from db import get_session, get_transaction
 
+import numpy as np
 import pandas as pd
 import sqlalchemy as sql
 
@@ -27,9 +28,19 @@ from app.model.orm import (
 )
 from app.model.lib.util import group_by_unique_name, is_non_negative_float
 from app.model.lib.conversion import convert_time
+from app.model.lib.db import execute_into_df
+from app.model.lib.chart_cache import invalidate_study_charts
+from app.model.lib.study_search_index import update_study_search_index
+from app.model.lib.search_facets import fetch_study_facet_ids, refresh_study_facets
 
 
-def persist_submission_to_database(submission_form):
+def persist_submission_to_database(submission_form, on_progress=None):
+    """
+    Create or update the study described by the submission.
+
+    The optional ``on_progress`` callback is invoked with the name of each
+    phase of the process as it starts: "saving", "averaging" and "exporting".
+    """
     submission = submission_form.submission
     user_uuid = submission.userUniqueID
     errors = []
@@ -40,12 +51,19 @@ def persist_submission_to_database(submission_form):
     if errors:
         return errors
 
+    if on_progress is None:
+        on_progress = lambda phase: None
+
     with get_transaction() as db_transaction:
         db_trans_session = get_session(db_transaction)
 
+        on_progress('saving')
+
         project = _save_project(db_trans_session, submission_form, user_uuid)
         study   = _save_study(db_trans_session, submission_form, user_uuid)
 
+        previous_facet_ids = fetch_study_facet_ids(db_trans_session, study.publicId)
+
         _clear_study(study)
 
         _save_study_techniques(db_trans_session, submission_form, study)
@@ -57,15 +75,23 @@ def persist_submission_to_database(submission_form):
 
         _save_measurements(db_trans_session, study, submission_form)
 
+        on_progress('averaging')
+
         for experiment in study.experiments:
             _create_average_measurements(db_trans_session, study, experiment)
 
+        update_study_search_index(db_trans_session, study.publicId)
+        refresh_study_facets(db_trans_session, study.publicId, previous_facet_ids)
+
         submission_form.save()
         submission_form.save_backup(study_id=study.publicId, project_id=project.publicId)
 
         db_trans_session.commit()
 
+        invalidate_study_charts(study.publicId)
+
         if study.isPublished:
+            on_progress('exporting')
             submission_form.submission.export_data(message="Study update")
 
         return []
@@ -85,8 +111,7 @@ def validate_data_file(submission_form, data_file=None):
     if not data_file:
         return []
 
-    data_xls = data_file.content
-    sheets = pd.read_excel(io.BytesIO(data_xls), sheet_name=None)
+    sheets = data_file.extract_sheets()
 
     # Validate columns:
     community_columns, strain_columns, metabolite_columns = _get_expected_column_names(submission_form)
@@ -134,33 +159,10 @@ def validate_data_file(submission_form, data_file=None):
 
     # Validate values:
     for sheet_name, df in sheets.items():
-        missing_time_rows = []
-        missing_values = {}
+        sheet_errors, sheet_warnings = _validate_sheet_values(sheet_name, df, expected_value_columns)
 
-        # Check for missing Time values:
-        if 'Time' in df:
-            for index, value in enumerate(df['Time']):
-                if not is_non_negative_float(value, isnan_check=True):
-                    missing_time_rows.append(str(index + 1))
-
-        if missing_time_rows:
-            row_description = _format_row_list_error(missing_time_rows)
-            # TODO (2025-10-01) Show warnings in UI
-            warnings.append(f"{sheet_name}: Missing or invalid time values on row(s) {row_description}")
-
-        # For the other rows, we're looking for non-negative numbers or blanks
-        value_columns = expected_value_columns.intersection(set(df.columns))
-
-        for column in value_columns:
-            for index, value in enumerate(df[column]):
-                if not is_non_negative_float(value, isnan_check=False):
-                    if column not in missing_values:
-                        missing_values[column] = []
-                    missing_values[column].append(str(index + 1))
-
-            if column in missing_values:
-                row_description = _format_row_list_error(missing_values[column])
-                errors.append(f"{sheet_name}: Invalid values in column \"{column}\" on row(s) {row_description}")
+        errors.extend(sheet_errors)
+        warnings.extend(sheet_warnings)
 
     return errors
 
@@ -430,15 +432,75 @@ def _save_study_techniques(db_session, submission_form, study):
 def _save_measurements(db_session, study, submission_form):
     submission = submission_form.submission
 
-    data_xls = submission.dataFile.content
-    sheets = pd.read_excel(io.BytesIO(data_xls), sheet_name=None)
+    for _, df in submission.dataFile.extract_sheets().items():
+        Measurement.insert_from_df(db_session, study, df)
 
-    for _, df in sheets.items():
-        Measurement.insert_from_csv_string(db_session, study, df.to_csv(index=False))
 
+def _create_average_measurements(db_session, study, experiment, batch_size=10_000):
+    """
+    Create an "Average" bioreplicate for the experiment with measurements
+    that average the ones of the other bioreplicates.
 
-def _create_average_measurements(db_session, study, experiment):
+    All measurements of the experiment are fetched with a single query and
+    grouped with pandas. Values are averaged separately for each technique and
+    compartment and only if all the contexts involved have the same time points.
+    """
     bioreplicate_ids = [b.id for b in experiment.bioreplicates if not b.calculationType]
+    if len(bioreplicate_ids) == 0:
+        return
+
+    techniques_by_id   = {t.id: t for t in study.measurementTechniques}
+    compartments_by_id = {c.id: c for c in experiment.compartments}
+
+    query = (
+        sql.select(
+            MeasurementContext.id.label('contextId'),
+            MeasurementContext.techniqueId,
+            MeasurementContext.compartmentId,
+            MeasurementContext.subjectId,
+            MeasurementContext.subjectType,
+            MeasurementContext.subjectName,
+            MeasurementContext.subjectExternalId,
+            Measurement.timeInSeconds,
+            Measurement.value,
+        )
+        .select_from(Measurement)
+        .join(Measurement.context)
+        .where(
+            MeasurementContext.bioreplicateId.in_(bioreplicate_ids),
+            MeasurementContext.techniqueId.in_(techniques_by_id.keys()),
+            MeasurementContext.compartmentId.in_(compartments_by_id.keys()),
+        )
+    )
+    df = execute_into_df(db_session, query)
+
+    # Contexts without any values are not averaged:
+    df = df[df.groupby('contextId')['value'].transform('count') > 0]
+    if len(df) == 0:
+        return
+
+    # We'll average values separately over techniques and compartments:
+    cluster_key = ['techniqueId', 'compartmentId']
+
+    context_df = df.drop_duplicates('contextId').set_index('contextId')[cluster_key]
+    context_df['timePoints'] = df.groupby('contextId')['timeInSeconds'].agg(frozenset)
+
+    cluster_df = context_df.groupby(cluster_key).agg(
+        contextCount=('timePoints', 'size'),
+        timePointSetCount=('timePoints', 'nunique'),
+    )
+
+    # If there is a single context for a cluster of measurements, there is
+    # nothing to average. If measurement time points don't match, don't
+    # average them:
+    averaged_clusters = cluster_df[
+        (cluster_df['contextCount'] > 1) &
+        (cluster_df['timePointSetCount'] == 1)
+    ].index
+    df = df[df.set_index(cluster_key).index.isin(averaged_clusters)].copy()
+
+    if len(df) == 0:
+        return
 
     # The averaged measurements will be parented by a custom-generated bioreplicate:
     average_bioreplicate = Bioreplicate(
@@ -447,134 +509,86 @@ def _create_average_measurements(db_session, study, experiment):
         experiment=experiment,
     )
     db_session.add(average_bioreplicate)
+    db_session.flush()
+
+    # A single context for a group of bioreplicates:
+    bioreplicate_technique_ids = [t.id for t in techniques_by_id.values() if t.subjectType == 'bioreplicate']
+    community_rows = df['techniqueId'].isin(bioreplicate_technique_ids)
+
+    df.loc[community_rows, 'subjectId']         = average_bioreplicate.id
+    df.loc[community_rows, 'subjectType']       = 'bioreplicate'
+    df.loc[community_rows, 'subjectName']       = average_bioreplicate.name
+    df.loc[community_rows, 'subjectExternalId'] = None
+
+    # Values are stored with three decimal places, so we aggregate them as
+    # whole numbers to avoid floating-point error in the averages:
+    df['valueInThousandths'] = (df['value'] * 1000).round()
+
+    subject_key = ['subjectType', 'subjectId', 'subjectName', 'subjectExternalId']
+    grouped_values = df.groupby([*cluster_key, *subject_key, 'timeInSeconds'], dropna=False)['valueInThousandths']
+
+    average_df = pd.DataFrame({
+        'count': grouped_values.count(),
+        'sum':   grouped_values.sum(),
+        'std':   grouped_values.std(ddof=0) / 1000,
+    }).reset_index()
+
+    # One context for each subject, in the order of the study's techniques:
+    technique_ordering   = {technique_id: index for index, technique_id in enumerate(techniques_by_id)}
+    compartment_ordering = {compartment_id: index for index, compartment_id in enumerate(compartments_by_id)}
+
+    average_df['techniqueOrdering']   = average_df['techniqueId'].map(technique_ordering)
+    average_df['compartmentOrdering'] = average_df['compartmentId'].map(compartment_ordering)
+    average_df = average_df.sort_values(
+        ['techniqueOrdering', 'compartmentOrdering', 'subjectType', 'subjectId', 'timeInSeconds'],
+        kind='stable',
+    )
 
-    has_measurements = False
-
-    for technique in study.measurementTechniques:
-        for compartment in experiment.compartments:
-            # We'll average values separately over techniques and compartments:
-            measurement_contexts = db_session.scalars(
-                sql.select(MeasurementContext)
-                .distinct()
-                .join(Measurement)
-                .where(
-                    MeasurementContext.compartmentId == compartment.id,
-                    MeasurementContext.bioreplicateId.in_(bioreplicate_ids),
-                    MeasurementContext.techniqueId == technique.id,
-                    Measurement.value.is_not(None),
-                )
-                .order_by(MeasurementContext.subjectType, MeasurementContext.subjectId)
-            ).all()
-
-            # If there is a single context for this cluster of measurements, there is nothing to average:
-            if len(measurement_contexts) <= 1:
-                continue
-
-            # If measurement time points don't match, don't average them:
-            time_point_sets = set()
-            for measurement_context in measurement_contexts:
-                time_points = [m.timeInSeconds for m in measurement_context.measurements]
-                time_point_sets.add(frozenset(time_points))
-
-            if len(time_point_sets) > 1:
-                continue
-
-            if technique.subjectType == 'bioreplicate':
-                # A single context for a group of bioreplicates
-                _create_average_measurement_context(
-                    db_session,
-                    parent_records=(study, technique, compartment),
-                    measurement_contexts=measurement_contexts,
-                    average_bioreplicate=average_bioreplicate,
-                    subject_id=average_bioreplicate.id,
-                    subject_type='bioreplicate',
-                    subject_name=average_bioreplicate.name,
-                    subject_external_id=None,
-                )
-            else:
-                grouped_contexts = itertools.groupby(
-                    measurement_contexts,
-                    lambda mc: (mc.subjectId, mc.subjectType, mc.subjectName, mc.subjectExternalId),
-                )
+    context_key = [*cluster_key, *subject_key]
+    average_contexts = []
 
-                for key, subject_contexts in grouped_contexts:
-                    (
-                        subject_id,
-                        subject_type,
-                        subject_name,
-                        subject_external_id,
-                    ) = key
-
-                    # One context for each subject:
-                    _create_average_measurement_context(
-                        db_session,
-                        parent_records=(study, technique, compartment),
-                        measurement_contexts=list(subject_contexts),
-                        average_bioreplicate=average_bioreplicate,
-                        subject_id=subject_id,
-                        subject_type=subject_type,
-                        subject_name=subject_name,
-                        subject_external_id=subject_external_id,
-                    )
-
-            has_measurements = True
-
-    if not has_measurements:
-        db_session.delete(average_bioreplicate)
-
-
-def _create_average_measurement_context(
-    db_session,
-    parent_records,
-    measurement_contexts,
-    average_bioreplicate,
-    subject_id,
-    subject_type,
-    subject_name,
-    subject_external_id=None,
-):
-    (study, technique, compartment) = parent_records
-
-    # Collect average measurement values for the given contexts:
-    measurement_rows = db_session.execute(
-        sql.select(
-            Measurement.timeInSeconds,
-            sql.func.avg(Measurement.value),
-            sql.func.std(Measurement.value),
-        )
-        .where(Measurement.contextId.in_([mc.id for mc in measurement_contexts]))
-        .group_by(Measurement.timeInSeconds)
-        .order_by(Measurement.timeInSeconds)
-    ).all()
+    for key, _ in average_df.groupby(context_key, sort=False, dropna=False):
+        (technique_id, compartment_id, subject_type, subject_id, subject_name, subject_external_id) = key
 
-    if len(measurement_rows) == 0:
-        # We do not want to create unnecessary contexts
-        return
+        average_contexts.append(MeasurementContext(
+            study=study,
+            bioreplicate=average_bioreplicate,
+            compartment=compartments_by_id[compartment_id],
+            subjectId=int(subject_id),
+            subjectType=subject_type,
+            subjectName=subject_name,
+            subjectExternalId=None if pd.isna(subject_external_id) else subject_external_id,
+            technique=techniques_by_id[technique_id],
+            calculationType='average',
+        ))
 
-    # Create a parent context for the individual measurements:
-    average_context = MeasurementContext(
-        study=study,
-        bioreplicate=average_bioreplicate,
-        compartment=compartment,
-        subjectId=subject_id,
-        subjectType=subject_type,
-        subjectName=subject_name,
-        subjectExternalId=subject_external_id,
-        technique=technique,
-        calculationType='average',
+    db_session.add_all(average_contexts)
+    db_session.flush()
+
+    average_df['contextId'] = average_df.groupby(context_key, sort=False, dropna=False).ngroup().map(
+        lambda index: average_contexts[index].id
     )
-    db_session.add(average_context)
-
-    # Create individual measurements
-    for (t, value, std) in measurement_rows:
-        measurement = Measurement(
-            timeInSeconds=t,
-            value=value,
-            std=std,
-            context=average_context,
-            study=study,
+
+    measurement_rows = [
+        {
+            'studyId':       study.publicId,
+            'contextId':     context_id,
+            'timeInSeconds': time_in_seconds,
+            'value':         Decimal(int(value_sum)) / count / 1000 if count > 0 else None,
+            'std':           None if math.isnan(std) else std,
+        }
+        for (context_id, time_in_seconds, value_sum, count, std) in zip(
+            average_df['contextId'].tolist(),
+            average_df['timeInSeconds'].tolist(),
+            average_df['sum'].tolist(),
+            average_df['count'].tolist(),
+            average_df['std'].tolist(),
         )
-        db_session.add(measurement)
+    ]
+
+    for offset in range(0, len(measurement_rows), batch_size):
+        batch = measurement_rows[offset:offset + batch_size]
+        db_session.execute(sql.insert(Measurement.__table__), batch)
 
 
 def _find_custom_strain(submission, identifier):
@@ -680,6 +694,76 @@ def _build_strain(db_session, identifier, submission, study, user_uuid):
     return StudyStrain(**strain_params)
 
 
+def _validate_sheet_values(sheet_name, df, expected_value_columns):
+    """
+    Check the time and value columns of a single sheet for invalid entries.
+
+    Numeric columns are checked as whole arrays and the rest are converted with
+    ``pd.to_numeric(errors='coerce')``. The few cells that fail conversion
+    without being blank are re-checked individually with
+    ``is_non_negative_float``, so that values like "nan" are treated exactly
+    as a cell-by-cell check would treat them.
+
+    Returns a tuple of a list of errors and a list of warnings.
+    """
+    errors   = []
+    warnings = []
+
+    # Check for missing Time values:
+    if 'Time' in df:
+        times = pd.to_numeric(df['Time'], errors='coerce')
+        invalid_time_mask = (times.isna() | (times < 0)).to_numpy()
+
+        if invalid_time_mask.any():
+            row_description = _format_row_list_error(_mask_to_row_list(invalid_time_mask))
+            # TODO (2025-10-01) Show warnings in UI
+            warnings.append(f"{sheet_name}: Missing or invalid time values on row(s) {row_description}")
+
+    # For the other rows, we're looking for non-negative numbers or blanks
+    value_columns = [c for c in df.columns if c in expected_value_columns]
+    if len(value_columns) == 0:
+        return errors, warnings
+
+    dtypes          = df.dtypes
+    numeric_columns = [c for c in value_columns if pd.api.types.is_numeric_dtype(dtypes[c])]
+    other_columns   = [c for c in value_columns if c not in numeric_columns]
+
+    # Columns read as numbers by pandas can be checked in one go, the rest
+    # are converted one by one:
+    invalid_masks = {}
+
+    if numeric_columns:
+        values = df[numeric_columns].to_numpy(dtype=float, na_value=np.nan)
+        invalid_masks.update(zip(numeric_columns, (values < 0).T))
+
+    for column in other_columns:
+        column_values  = df[column]
+        numeric_values = pd.to_numeric(column_values, errors='coerce')
+        invalid_mask   = (numeric_values < 0).to_numpy(copy=True)
+
+        # Non-blank cells that could not be converted:
+        unparsed_mask = (numeric_values.isna() & column_values.notna()).to_numpy()
+        for row_index in np.flatnonzero(unparsed_mask):
+            if not is_non_negative_float(column_values.iat[row_index], isnan_check=False):
+                invalid_mask[row_index] = True
+
+        invalid_masks[column] = invalid_mask
+
+    for column in value_columns:
+        invalid_mask = invalid_masks[column]
+
+        if invalid_mask.any():
+            row_description = _format_row_list_error(_mask_to_row_list(invalid_mask))
+            errors.append(f"{sheet_name}: Invalid values in column \"{column}\" on row(s) {row_description}")
+
+    return errors, warnings
+
+
+def _mask_to_row_list(mask):
+    "Converts a boolean mask to a list of 1-based row numbers as strings"
+    return [str(index + 1) for index in np.flatnonzero(mask)]
+
+
 def _format_row_list_error(row_list):
     description = ', '.join(row_list[0:3])
     if len(row_list) > 3:
@@ -13,6 +13,8 @@ from datetime import datetime, UTC
 import requests
 from flask import url_for, request
 
+from app.model.lib.errors import ClientError
+
 
 def is_non_negative_float(string: str, *, isnan_check: bool):
     """
@@ -139,6 +141,27 @@ def is_ajax(request):
     return request.headers.get('X-Requested-With', '') == 'XMLHttpRequest'
 
 
+def get_int_arg(args, name: str, minimum: int = 0) -> Optional[int]:
+    """
+    Parse the request parameter with the given name as an integer of at least
+    ``minimum``. Missing parameters are ``None``, invalid ones raise a
+    ``ClientError``.
+    """
+    value = args.get(name, None)
+    if value is None:
+        return None
+
+    try:
+        value = int(value)
+    except ValueError:
+        raise ClientError(f"Expected an integer for the \"{name}\" parameter, got: {value}")
+
+    if value < minimum:
+        raise ClientError(f"Expected an integer of at least {minimum} for the \"{name}\" parameter, got: {value}")
+
+    return value
+
+
 def _one_or_error(key, iterator):
     value = next(iterator)
     try:
@@ -17,8 +17,10 @@ from .page_visit_counter import PageVisitCounter
 from .perturbation import Perturbation
 from .project import Project
 from .project_user import ProjectUser
+from .search_facet import SearchFacet
 from .study import Study
 from .study_metabolite import StudyMetabolite
+from .study_search_term import StudySearchTerm
 from .study_strain import StudyStrain
 from .study_technique import StudyTechnique
 from .study_user import StudyUser
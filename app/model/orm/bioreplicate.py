@@ -63,6 +63,9 @@ class Bioreplicate(OrmBase):
         return None
 
     def get_df(self, db_session):
+        return execute_into_df(db_session, self.get_df_query())
+
+    def get_df_query(self):
         from app.model.orm import Measurement, MeasurementContext
 
         query = (
@@ -87,4 +90,4 @@ class Bioreplicate(OrmBase):
             )
         )
 
-        return execute_into_df(db_session, query)
+        return query
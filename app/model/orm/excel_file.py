@@ -1,5 +1,4 @@
 from datetime import datetime
-from io import BytesIO
 
 import sqlalchemy as sql
 from sqlalchemy.orm import (
@@ -8,9 +7,9 @@ from sqlalchemy.orm import (
 )
 from sqlalchemy_utc.sqltypes import UtcDateTime
 import humanize
-import pandas as pd
 
 from app.model.orm.orm_base import OrmBase
+from app.model.lib.excel import read_sheets
 
 
 class ExcelFile(OrmBase):
@@ -41,11 +40,9 @@ class ExcelFile(OrmBase):
         return humanize.naturalsize(self.size)
 
     def extract_sheets(self):
-        excel = pd.ExcelFile(BytesIO(self.content))
-
-        sheets = {
-            name: pd.read_excel(excel, sheet_name=name)
-            for name in excel.sheet_names
-        }
-
-        return sheets
+        """
+        Returns the parsed sheets of the file as dataframes, indexed by sheet
+        name. Parsing happens once per unique file content, see
+        ``app.model.lib.excel.read_sheets``.
+        """
+        return read_sheets(self.content)
@@ -66,6 +66,9 @@ class Experiment(OrmBase):
     )
 
     def get_df(self, db_session):
+        return execute_into_df(db_session, self.get_df_query())
+
+    def get_df_query(self):
         from app.model.orm import (
             Bioreplicate,
             Compartment,
@@ -91,6 +94,7 @@ class Experiment(OrmBase):
             .distinct()
             .select_from(Measurement)
             .join(MeasurementContext)
+            .join(MeasurementTechnique)
             .join(Compartment)
             .join(Bioreplicate)
             .join(Experiment)
@@ -107,7 +111,7 @@ class Experiment(OrmBase):
             )
         )
 
-        return execute_into_df(db_session, query)
+        return query
 
     @staticmethod
     def generate_public_id(db_session):
@@ -1,7 +1,9 @@
-import csv
+import math
 from io import StringIO
 from decimal import Decimal
 
+import numpy as np
+import pandas as pd
 import sqlalchemy as sql
 from sqlalchemy.orm import (
     Mapped,
@@ -12,7 +14,6 @@ from sqlalchemy.ext.hybrid import hybrid_property
 
 from app.model.orm.orm_base import OrmBase
 from app.model.lib.conversion import convert_time
-from app.model.lib.util import group_by_unique_name, is_non_negative_float
 
 
 class Measurement(OrmBase):
@@ -65,98 +66,195 @@ class Measurement(OrmBase):
 
     @classmethod
     def insert_from_csv_string(Self, db_session, study, csv_string):
+        df = pd.read_csv(
+            StringIO(csv_string),
+            dtype={'Biological Replicate': str, 'Compartment': str},
+            float_precision='round_trip',
+        )
+
+        contexts = Self.insert_from_df(db_session, study, df)
+
+        return db_session.scalars(
+            sql.select(Measurement)
+            .where(Measurement.contextId.in_([c.id for c in contexts]))
+            .order_by(Measurement.contextId, Measurement.id)
+        ).all()
+
+    @classmethod
+    def insert_from_df(Self, db_session, study, df, batch_size=10_000):
+        """
+        Insert the measurements of a single data sheet in bulk.
+
+        The sheet is "melted" into a long table with one row per value cell,
+        which is annotated with the keys of its measurement context. Contexts
+        that only have empty values are dropped before anything is inserted.
+        Measurements are inserted with batched ``executemany`` statements
+        instead of individual ORM objects.
+
+        Returns the list of created ``MeasurementContext`` records.
+        """
         from app.model.orm import MeasurementContext
 
-        reader = csv.DictReader(StringIO(csv_string), dialect='unix')
-
-        bioreplicates_by_name = group_by_unique_name(study.bioreplicates)
-        compartments_by_name  = group_by_unique_name(study.compartments)
-        context_cache = {}
-
-        for row in reader:
-            bioreplicate = bioreplicates_by_name[row['Biological Replicate'].strip()]
-            compartment  = compartments_by_name[row['Compartment'].strip()]
-
-            if bioreplicate is None or compartment is None:
-                # Missing entry, skip
-                continue
-
-            if not is_non_negative_float(row['Time'], isnan_check=True):
-                # Missing time, skip
-                continue
-
-            time_in_seconds = convert_time(row['Time'], source=study.timeUnits, target='s')
-
-            for technique in study.measurementTechniques:
-                if technique.subjectType == 'bioreplicate':
-                    subjects = [bioreplicate]
-                elif technique.subjectType == 'strain':
-                    subjects = study.strains
-                elif technique.subjectType == 'metabolite':
-                    subjects = study.metabolites
-                else:
-                    raise KeyError(f"Unexpected subject type: {subject_type}")
-
-                for subject in subjects:
-                    value_column_name = technique.csv_column_name(subject.name)
-                    if value_column_name not in row:
-                        continue
-
-                    value = row[value_column_name]
-                    if value == '':
-                        value = None
-
-                    std = row.get(f"{value_column_name} STD", None)
-                    if std == '':
-                        std = None
-
-                    # Create a measurement context only if it doesn't already exist:
-                    context_key = (
-                        bioreplicate.id,
-                        compartment.id,
-                        technique.id,
-                        subject.id,
-                        technique.subjectType,
-                    )
-                    if context_key not in context_cache:
-                        context = MeasurementContext(
-                            # Relationships:
-                            study=study,
-                            bioreplicate=bioreplicate,
-                            compartment=compartment,
-                            # Subject:
-                            subjectId=subject.id,
-                            subjectType=technique.subjectType,
-                            subjectName=subject.name,
-                            subjectExternalId=subject.externalId,
-                            # Technique:
-                            techniqueId=technique.id,
-                        )
-                        db_session.add(context)
-                        context_cache[context_key] = context
-
-                    context = context_cache[context_key]
-                    measurement = Measurement(
-                        study=study,
-                        context=context,
-                        timeInSeconds=time_in_seconds,
-                        value=value,
-                        std=std,
-                    )
-                    db_session.add(measurement)
-
-        db_session.commit()
-
-        # Prune measurement contexts that only have empty values:
-        measurements = []
-
-        for _, context in context_cache.items():
-            if all([m.value is None for m in context.measurements]):
-                db_session.execute(
-                    sql.delete(MeasurementContext)
-                    .where(MeasurementContext.id == context.id)
-                )
+        if len(df) == 0:
+            return []
+
+        bioreplicate_ids = {b.name: b.id for b in study.bioreplicates}
+        compartment_ids  = {c.name: c.id for c in study.compartments}
+
+        bioreplicate_id_column = df['Biological Replicate'].astype(str).str.strip().map(bioreplicate_ids)
+        compartment_id_column  = df['Compartment'].astype(str).str.strip().map(compartment_ids)
+        time_column            = pd.to_numeric(df['Time'], errors='coerce')
+
+        # Skip rows with a missing entry or a missing time:
+        valid_rows = (
+            bioreplicate_id_column.notna() &
+            compartment_id_column.notna() &
+            time_column.notna() &
+            (time_column >= 0)
+        )
+        df = df[valid_rows]
+        if len(df) == 0:
+            return []
+
+        bioreplicate_id_column = bioreplicate_id_column[valid_rows].astype(int).to_numpy()
+        compartment_id_column  = compartment_id_column[valid_rows].astype(int).to_numpy()
+
+        # There are few distinct time points, so we convert each one once:
+        time_column = time_column[valid_rows]
+        time_conversions = {
+            t: convert_time(t, source=study.timeUnits, target='s')
+            for t in time_column.unique()
+        }
+        time_in_seconds_column = time_column.map(time_conversions).to_numpy()
+
+        # Find the columns that map to a (technique, subject) pair:
+        column_descriptions = []
+        for technique in study.measurementTechniques:
+            if technique.subjectType == 'bioreplicate':
+                subjects = [None]
+            elif technique.subjectType == 'strain':
+                subjects = study.strains
+            elif technique.subjectType == 'metabolite':
+                subjects = study.metabolites
             else:
-                measurements.extend(context.measurements)
-
-        return measurements
+                raise KeyError(f"Unexpected subject type: {technique.subjectType}")
+
+            for subject in subjects:
+                subject_name = subject.name if subject else None
+                value_column_name = technique.csv_column_name(subject_name)
+
+                if value_column_name in df:
+                    column_descriptions.append((value_column_name, technique, subject))
+
+        if len(column_descriptions) == 0:
+            return []
+
+        # Melt the value and std columns into a single long table. Each value
+        # column is placed in a consecutive block of rows:
+        row_count    = len(df)
+        column_count = len(column_descriptions)
+
+        value_columns = [name for (name, _, _) in column_descriptions]
+        std_columns   = [f"{name} STD" for name in value_columns]
+
+        values = df[value_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        stds   = df.reindex(columns=std_columns).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+        technique_ids = np.array([t.id for (_, t, _) in column_descriptions])
+        subject_ids = np.array([s.id if s else -1 for (_, _, s) in column_descriptions])
+
+        long_df = pd.DataFrame({
+            'columnIndex':    np.repeat(np.arange(column_count), row_count),
+            'rowIndex':       np.tile(np.arange(row_count), column_count),
+            'bioreplicateId': np.tile(bioreplicate_id_column, column_count),
+            'compartmentId':  np.tile(compartment_id_column, column_count),
+            'techniqueId':    np.repeat(technique_ids, row_count),
+            'subjectId':      np.repeat(subject_ids, row_count),
+            'timeInSeconds':  np.tile(time_in_seconds_column, column_count),
+            'value':          values.ravel(order='F'),
+            'std':            stds.ravel(order='F'),
+        })
+
+        # Community-level measurements have the bioreplicate as a subject:
+        community_rows = long_df['subjectId'] == -1
+        long_df.loc[community_rows, 'subjectId'] = long_df.loc[community_rows, 'bioreplicateId']
+
+        # Contexts are ordered by their first appearance in the sheet, reading
+        # it row by row:
+        context_key = ['bioreplicateId', 'compartmentId', 'techniqueId', 'subjectId']
+        long_df['cellIndex'] = long_df['rowIndex'] * column_count + long_df['columnIndex']
+
+        context_df = (
+            long_df
+            .groupby(context_key, sort=False)
+            .agg(
+                columnIndex=('columnIndex', 'first'),
+                cellIndex=('cellIndex', 'min'),
+                valueCount=('value', 'count'),
+            )
+            .reset_index()
+        )
+
+        # Skip contexts that only have empty values:
+        context_df = context_df[context_df['valueCount'] > 0].sort_values('cellIndex')
+
+        bioreplicates_by_id = {b.id: b for b in study.bioreplicates}
+        compartments_by_id  = {c.id: c for c in study.compartments}
+        contexts = []
+
+        for row in context_df.itertuples(index=False):
+            (_, technique, subject) = column_descriptions[row.columnIndex]
+            bioreplicate = bioreplicates_by_id[row.bioreplicateId]
+            compartment  = compartments_by_id[row.compartmentId]
+
+            if subject is None:
+                subject = bioreplicate
+
+            contexts.append(MeasurementContext(
+                # Relationships:
+                study=study,
+                bioreplicate=bioreplicate,
+                compartment=compartment,
+                # Subject:
+                subjectId=subject.id,
+                subjectType=technique.subjectType,
+                subjectName=subject.name,
+                subjectExternalId=subject.externalId,
+                # Technique:
+                techniqueId=technique.id,
+            ))
+
+        # Contexts are comparatively few, so we let the ORM insert them to
+        # fetch their ids:
+        db_session.add_all(contexts)
+        db_session.flush()
+
+        context_df['contextId'] = [c.id for c in contexts]
+
+        long_df = (
+            long_df
+            .merge(context_df[[*context_key, 'contextId', 'cellIndex']], on=context_key, suffixes=('', 'Context'))
+            .sort_values(['cellIndexContext', 'rowIndex'])
+        )
+
+        measurement_rows = [
+            {
+                'studyId':       study.publicId,
+                'contextId':     context_id,
+                'timeInSeconds': time_in_seconds,
+                'value':         None if math.isnan(value) else value,
+                'std':           None if math.isnan(std) else std,
+            }
+            for (context_id, time_in_seconds, value, std) in zip(
+                long_df['contextId'].tolist(),
+                long_df['timeInSeconds'].tolist(),
+                long_df['value'].tolist(),
+                long_df['std'].tolist(),
+            )
+        ]
+
+        for offset in range(0, len(measurement_rows), batch_size):
+            batch = measurement_rows[offset:offset + batch_size]
+            db_session.execute(sql.insert(Measurement.__table__), batch)
+
+        return contexts
@@ -72,6 +72,9 @@ class MeasurementContext(OrmBase):
         return [mr for mr in self.modelingResults if mr.isPublished]
 
     def get_df(self, db_session):
+        return execute_into_df(db_session, self.get_df_query())
+
+    def get_df_query(self):
         from app.model.orm import Measurement
 
         query = (
@@ -88,7 +91,7 @@ class MeasurementContext(OrmBase):
             .order_by(Measurement.timeInSeconds)
         )
 
-        return execute_into_df(db_session, query)
+        return query
 
     def get_chart_label(self, model_name=None):
         from markupsafe import Markup, escape
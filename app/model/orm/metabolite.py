@@ -9,6 +9,7 @@ from sqlalchemy.orm import (
 )
 
 from app.model.orm.orm_base import OrmBase
+from app.model.lib.name_index import NameIndex, get_name_index
 
 
 class Metabolite(OrmBase):
@@ -51,6 +52,13 @@ class Metabolite(OrmBase):
         if len(term) <= 0:
             return [], 0
 
+        name_index = get_name_index('metabolites')
+        if name_index is not None:
+            results, has_more = name_index.search(term, page, per_page)
+            results = [{'id': chebi_id, 'text': f"{name} ({chebi_id})"} for (chebi_id, name) in results]
+
+            return results, has_more
+
         limit  = per_page
         offset = (page - 1) * per_page
 
@@ -80,3 +88,10 @@ class Metabolite(OrmBase):
         has_more = (page * per_page < total_count)
 
         return results, has_more
+
+    @staticmethod
+    def build_name_index(db_session):
+        "An index of all metabolite names that ``search_by_name`` uses when available"
+        records = db_session.execute(sql.select(Metabolite.chebiId, Metabolite.name)).all()
+
+        return NameIndex(records)
@@ -23,6 +23,10 @@ from app.model.lib.modeling import (
     ALL_COEFFICIENTS,
     FIT_PARAMETERS,
 )
+from app.model.lib.growth_fitting import (
+    predict_logistic,
+    predict_baranyi_roberts,
+)
 
 _VALID_TYPES = [
     'easy_linear',
@@ -89,6 +93,9 @@ class ModelingResult(OrmBase):
     error:    Mapped[str] = mapped_column(sql.String)
     rSummary: Mapped[str] = mapped_column(sql.String)
 
+    # A hash of the input data and parameters, set when the result is ready:
+    inputFingerprint: Mapped[str] = mapped_column(sql.String(64))
+
     createdAt:    Mapped[datetime] = mapped_column(UtcDateTime, server_default=sql.FetchedValue())
     updatedAt:    Mapped[datetime] = mapped_column(UtcDateTime, server_default=sql.FetchedValue())
     calculatedAt: Mapped[datetime] = mapped_column(UtcDateTime)
@@ -292,7 +299,7 @@ class ModelingResult(OrmBase):
         mumax = float(coefficients['mumax'])
         K     = float(coefficients['K'])
 
-        return (K * y0)/(y0 + (K - y0) * np.exp(-mumax * time))
+        return predict_logistic(time, y0, mumax, K)
 
     def _predict_baranyi_roberts(self, time):
         coefficients = self.params['coefficients']
@@ -302,13 +309,7 @@ class ModelingResult(OrmBase):
         K     = float(coefficients['K'])
         h0    = float(coefficients['h0'])
 
-        # Formula taken from the "growthrates" documentation under `grow_baranyi`:
-        # https://cran.r-project.org/web/packages/growthrates/growthrates.pdf
-        #
-        A = time + 1/mumax * np.log(np.exp(-mumax * time) + np.exp(-h0) - np.exp(-mumax * time - h0))
-        log_y = np.log(y0) + mumax * A - np.log(1 + (np.exp(mumax * A) - 1)/np.exp(np.log(K) - np.log(y0)))
-
-        return np.exp(log_y)
+        return predict_baranyi_roberts(time, y0, mumax, K, h0)
 
 
 def _map_float(decimal_list):
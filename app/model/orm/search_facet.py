@@ -0,0 +1,29 @@
+import sqlalchemy as sql
+from sqlalchemy.orm import (
+    Mapped,
+    mapped_column,
+)
+
+from app.model.orm.orm_base import OrmBase
+
+
+class SearchFacet(OrmBase):
+    """
+    The number of studies that include a particular strain or metabolite,
+    split by publication state.
+
+    The ``subjectType`` is either "strain" or "metabolite", and the
+    ``subjectId`` is the NCBI id or the ChEBI id, respectively. The counts are
+    maintained by ``app.model.lib.search_facets`` when a study is submitted or
+    published.
+    """
+
+    __tablename__ = 'SearchFacets'
+
+    id: Mapped[int] = mapped_column(sql.Integer, primary_key=True)
+
+    subjectType: Mapped[str] = mapped_column(sql.String(100), nullable=False)
+    subjectId:   Mapped[str] = mapped_column(sql.String(100), nullable=False)
+
+    publishedStudyCount:   Mapped[int] = mapped_column(sql.Integer, nullable=False, default=0)
+    unpublishedStudyCount: Mapped[int] = mapped_column(sql.Integer, nullable=False, default=0)
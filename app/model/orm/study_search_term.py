@@ -0,0 +1,26 @@
+import sqlalchemy as sql
+from sqlalchemy.orm import (
+    Mapped,
+    mapped_column,
+)
+
+from app.model.orm.orm_base import OrmBase
+
+
+class StudySearchTerm(OrmBase):
+    """
+    A single word of the full-text search index of studies.
+
+    Each searchable field of a study is split into words, and each word is
+    recorded once per study with the weight of the most important field it
+    was found in. The index is maintained by ``app.model.lib.study_search_index``
+    whenever a submission updates a study.
+    """
+
+    __tablename__ = 'StudySearchTerms'
+
+    id: Mapped[int] = mapped_column(sql.Integer, primary_key=True)
+
+    studyId: Mapped[str] = mapped_column(sql.ForeignKey('Studies.publicId'), nullable=False)
+    term:    Mapped[str] = mapped_column(sql.String(100), nullable=False)
+    weight:  Mapped[int] = mapped_column(sql.Integer, nullable=False)
@@ -1,5 +1,5 @@
 from typing import Optional
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from pathlib import Path
 import shutil
 import subprocess
@@ -54,9 +54,47 @@ class Submission(OrmBase):
         single_parent=True,
     )
 
+    # The state of the background job that creates the study from the
+    # submission. One of ``PROCESSING_STATES``, or NULL if no job was started:
+    processingState:  Mapped[str]      = mapped_column(sql.String(50), nullable=True)
+    processingErrors: Mapped[sql.JSON] = mapped_column(sql.JSON, nullable=True)
+
     createdAt: Mapped[datetime] = mapped_column(UtcDateTime, server_default=sql.FetchedValue())
     updatedAt: Mapped[datetime] = mapped_column(UtcDateTime, server_default=sql.FetchedValue())
 
+    PROCESSING_STATES = {
+        'pending':    "Waiting to be processed",
+        'validating': "Validating the data file",
+        'saving':     "Saving the study and its measurements",
+        'averaging':  "Calculating averages of biological replicates",
+        'exporting':  "Exporting the published data",
+        'ready':      "Processing finished",
+        'error':      "Processing failed",
+    }
+    "The phases a submission goes through while it's being processed, in order"
+
+    PROCESSING_TIMEOUT = timedelta(hours=1)
+    """
+    The time after which a submission that is still in the same phase is
+    assumed to belong to a background job that died, so it can be submitted
+    again
+    """
+
+    @property
+    def is_processing(self):
+        return self.processingState not in (None, 'ready', 'error') and not self.is_processing_stale
+
+    @property
+    def is_processing_stale(self):
+        if self.processingState in (None, 'ready', 'error') or self.updatedAt is None:
+            return False
+
+        return datetime.now(UTC) - self.updatedAt > self.PROCESSING_TIMEOUT
+
+    @property
+    def processing_description(self):
+        return self.PROCESSING_STATES.get(self.processingState)
+
     @property
     def completed_step_count(self):
         return sum([
@@ -9,6 +9,7 @@ from sqlalchemy.orm import (
 )
 
 from app.model.orm.orm_base import OrmBase
+from app.model.lib.name_index import NameIndex, get_name_index
 
 
 class Taxon(OrmBase):
@@ -40,6 +41,13 @@ class Taxon(OrmBase):
         if len(term) <= 0:
             return [], 0
 
+        name_index = get_name_index('taxa')
+        if name_index is not None:
+            results, has_more = name_index.search(term, page, per_page)
+            results = [{'id': ncbi_id, 'text': f"{name} (NCBI:{ncbi_id})"} for (ncbi_id, name) in results]
+
+            return results, has_more
+
         limit  = per_page
         offset = (page - 1) * per_page
 
@@ -67,3 +75,10 @@ class Taxon(OrmBase):
         has_more = (page * per_page < total_count)
 
         return results, has_more
+
+    @staticmethod
+    def build_name_index(db_session):
+        "An index of all taxon names that ``search_by_name`` uses when available"
+        records = db_session.execute(sql.select(Taxon.ncbiId, Taxon.name)).all()
+
+        return NameIndex(records, anchored=True)
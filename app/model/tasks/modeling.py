@@ -1,13 +1,20 @@
+import re
+import hashlib
 import tempfile
+from pathlib import Path
 from datetime import datetime, UTC
 
+import simplejson as json
 import sqlalchemy as sql
 from sqlalchemy.orm.attributes import flag_modified
-from celery import shared_task
+from celery import shared_task, chain
 from celery.utils.log import get_task_logger
 
 from db import FLASK_DB
 from app.model.lib.r_script import RScript
+from app.model.lib.r_worker_pool import get_pool as get_r_worker_pool
+from app.model.lib.growth_fitting import fit_model
+from app.model.lib.bulk_modeling import build_modeling_inputs
 from app.model.orm import (
     ModelingResult,
     MeasurementContext,
@@ -23,79 +30,315 @@ def process_modeling_request(modeling_result_id, measurement_context_id, args):
     _process_modeling_request(db_session, modeling_result_id, measurement_context_id, args)
 
 
-def _process_modeling_request(db_session, modeling_result_id, measurement_context_id, args={}):
-    modeling_result = db_session.get(ModelingResult, modeling_result_id)
+@shared_task
+def process_modeling_batch(requests):
+    db_session = FLASK_DB.session
+
+    _process_modeling_batch(db_session, requests)
+
 
+def queue_modeling_batches(batches):
+    "Queues batch jobs that run one after the other, occupying a single worker"
+    chain(*[process_modeling_batch.si(batch) for batch in batches]).delay()
+
+
+def _process_modeling_request(db_session, modeling_result_id, measurement_context_id, args={}):
+    modeling_result     = db_session.get(ModelingResult, modeling_result_id)
     measurement_context = db_session.get(MeasurementContext, measurement_context_id)
 
     modeling_type = modeling_result.type
-    point_count   = int(args.get('pointCount', '5'))
-    end_time      = args.get('endTime', '')
+    inputs, data  = _prepare_modeling_input(db_session, modeling_type, measurement_context, args)
+    fingerprint   = _calculate_fingerprint(modeling_type, inputs, data, args)
 
-    with tempfile.TemporaryDirectory() as tmp_dir_name:
-        inputs = {}
+    if _reuse_matching_result(db_session, modeling_result, fingerprint):
+        _LOGGER.info(f"Reusing modeling result with fingerprint {fingerprint}")
+    elif args.get('backend') == 'python':
+        _fit_modeling_result_in_python(modeling_result, inputs, data)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            try:
+                rscript = RScript(root_path=tmp_dir_name, pool=get_r_worker_pool())
+                _write_modeling_input(rscript, modeling_type, inputs, data)
 
-        if modeling_type == 'easy_linear':
-            inputs = {'pointCount': point_count}
-        elif modeling_type in ('logistic', 'baranyi_roberts'):
-            inputs = {'endTime': end_time}
+                script_name = f"scripts/modeling/{modeling_type}.R"
+                output      = rscript.run(script_name)
 
-        data = measurement_context.get_df(db_session)
-        if modeling_type in ('logistic', 'baranyi_roberts') and end_time != '':
-            data = data[data['time'] <= float(end_time)]
+                _LOGGER.info(output)
 
-        # We don't need standard deviation for modeling:
-        data = data.drop(columns=['std'])
+                _update_modeling_result(
+                    modeling_result,
+                    rscript,
+                    output,
+                    inputs,
+                    r_version=rscript.get_r_version(),
+                    growthrates_version=rscript.get_growthrates_version(),
+                )
+            except Exception as e:
+                modeling_result.state = 'error'
+                modeling_result.error = 'RScript error'
+                _LOGGER.error(e)
 
-        # Remove rows with NA values, if any
-        data = data.dropna()
+    _update_fingerprint(modeling_result, fingerprint)
 
-        try:
-            rscript = RScript(root_path=tmp_dir_name)
-            rscript.write_csv('input.csv', data)
-            if modeling_type == 'easy_linear':
-                rscript.write_json('input.json', {'pointCount': point_count})
+    db_session.add(modeling_result)
+    db_session.commit()
 
-            script_name = f"scripts/modeling/{modeling_type}.R"
-            output      = rscript.run(script_name)
+    # Returning the object for testing purposes, not used
+    return modeling_result
 
-            _LOGGER.info(output)
 
-            fit          = rscript.read_flat_json('fit.json', discard_keys="_row")
-            coefficients = rscript.read_key_value_json(
-                'coefficients.json',
-                key_name="_row",
-                value_name="coefficients",
-            )
+def _process_modeling_batch(db_session, requests):
+    """
+    Fit several models in a single R process.
 
-            if coefficients is None or fit is None:
-                modeling_result.state = 'error'
-                modeling_result.error = 'No coefficients and/or fit were generated by the R script'
+    The ``requests`` are a list of ``(modeling_result_id,
+    measurement_context_id, args)`` tuples, with the same meaning as the
+    arguments of ``process_modeling_request``. The inputs of each one are
+    written in a separate directory and ``scripts/modeling/batch.R`` runs all
+    of them, so R and its libraries are only loaded once. Requests for the
+    Python backend are fitted directly.
+    """
+    modeling_results = []
+    fingerprints     = []
+    jobs             = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir_name:
+        for index, (modeling_result_id, measurement_context_id, args) in enumerate(requests):
+            modeling_result     = db_session.get(ModelingResult, modeling_result_id)
+            measurement_context = db_session.get(MeasurementContext, measurement_context_id)
+
+            inputs, data = _prepare_modeling_input(db_session, modeling_result.type, measurement_context, args)
+            fingerprint  = _calculate_fingerprint(modeling_result.type, inputs, data, args)
+
+            modeling_results.append(modeling_result)
+            fingerprints.append(fingerprint)
+
+            if _reuse_matching_result(db_session, modeling_result, fingerprint):
+                continue
+            elif args.get('backend') == 'python':
+                _fit_modeling_result_in_python(modeling_result, inputs, data)
             else:
-                modeling_result.update(
-                    rSummary=_extract_r_summary(output),
-                    params={
-                        'inputs':              inputs,
-                        'coefficients':        coefficients,
-                        'fit':                 fit,
-                        'r_version':           rscript.get_r_version(),
-                        'growthrates_version': rscript.get_growthrates_version(),
-                    },
-                    state='ready',
-                    error=None,
-                    calculatedAt=datetime.now(UTC),
-                )
-                flag_modified(modeling_result, 'params')
-        except Exception as e:
-            modeling_result.state = 'error'
-            modeling_result.error = 'RScript error'
-            _LOGGER.error(e)
+                jobs.append((f"job{index}", modeling_result, inputs, data))
 
-    db_session.add(modeling_result)
+        if jobs:
+            try:
+                rscript = RScript(root_path=tmp_dir_name, pool=get_r_worker_pool())
+
+                for (job_name, modeling_result, inputs, data) in jobs:
+                    (rscript.root_path / job_name).mkdir()
+                    _write_modeling_input(rscript, modeling_result.type, inputs, data, directory=job_name)
+
+                # A pool worker can't find the modeling scripts on its own:
+                rscript.write_json('jobs.json', {
+                    'scriptDir': str(Path('scripts/modeling').absolute()),
+                    'jobs': [
+                        {'name': job_name, 'type': modeling_result.type}
+                        for (job_name, modeling_result, _, _) in jobs
+                    ],
+                })
+
+                output   = rscript.run('scripts/modeling/batch.R')
+                versions = rscript.read_flat_json('versions.json') or {}
+
+                _LOGGER.info(output)
+
+                job_outputs = _split_job_output(output)
+
+                for (job_name, modeling_result, inputs, _) in jobs:
+                    _update_modeling_result(
+                        modeling_result,
+                        rscript,
+                        job_outputs.get(job_name, ''),
+                        inputs,
+                        r_version=versions.get('r_version'),
+                        growthrates_version=versions.get('growthrates_version'),
+                        directory=job_name,
+                    )
+            except Exception as e:
+                for (_, modeling_result, _, _) in jobs:
+                    modeling_result.state = 'error'
+                    modeling_result.error = 'RScript error'
+                _LOGGER.error(e)
+
+    for modeling_result, fingerprint in zip(modeling_results, fingerprints):
+        _update_fingerprint(modeling_result, fingerprint)
+
+    db_session.add_all(modeling_results)
     db_session.commit()
 
-    # Returning the object for testing purposes, not used
-    return modeling_result
+    # Returning the objects for testing purposes, not used
+    return modeling_results
+
+
+def _prepare_modeling_input(db_session, modeling_type, measurement_context, args):
+    inputs   = build_modeling_inputs(modeling_type, args)
+    end_time = inputs.get('endTime', '')
+
+    data = measurement_context.get_df(db_session)
+    if end_time != '':
+        data = data[data['time'] <= float(end_time)]
+
+    # We don't need standard deviation for modeling:
+    data = data.drop(columns=['std'])
+
+    # Remove rows with NA values, if any
+    data = data.dropna()
+
+    return inputs, data
+
+
+def _write_modeling_input(rscript, modeling_type, inputs, data, directory='.'):
+    rscript.write_csv(f"{directory}/input.csv", data)
+
+    if modeling_type == 'easy_linear':
+        rscript.write_json(f"{directory}/input.json", {'pointCount': inputs['pointCount']})
+
+
+def _update_modeling_result(
+    modeling_result,
+    rscript,
+    output,
+    inputs,
+    r_version,
+    growthrates_version,
+    directory='.',
+):
+    fit          = rscript.read_flat_json(f"{directory}/fit.json", discard_keys="_row")
+    coefficients = rscript.read_key_value_json(
+        f"{directory}/coefficients.json",
+        key_name="_row",
+        value_name="coefficients",
+    )
+
+    if coefficients is None or fit is None:
+        modeling_result.state = 'error'
+        modeling_result.error = 'No coefficients and/or fit were generated by the R script'
+    else:
+        modeling_result.update(
+            rSummary=_extract_r_summary(output),
+            params={
+                'inputs':              inputs,
+                'coefficients':        coefficients,
+                'fit':                 fit,
+                'backend':             'r',
+                'r_version':           r_version,
+                'growthrates_version': growthrates_version,
+            },
+            state='ready',
+            error=None,
+            calculatedAt=datetime.now(UTC),
+        )
+        flag_modified(modeling_result, 'params')
+
+
+def _fit_modeling_result_in_python(modeling_result, inputs, data):
+    try:
+        result = fit_model(modeling_result.type, data['time'], data['value'], inputs)
+    except ValueError as e:
+        modeling_result.state = 'error'
+        modeling_result.error = str(e)
+        return
+    except Exception:
+        _LOGGER.exception(f"Failed to fit modeling result {modeling_result.id}")
+
+        modeling_result.state = 'error'
+        modeling_result.error = 'Fitting error'
+        return
+
+    modeling_result.update(
+        rSummary=None,
+        params={
+            'inputs':       inputs,
+            'coefficients': result['coefficients'],
+            'fit':          result['fit'],
+            'backend':      'python',
+        },
+        state='ready',
+        error=None,
+        calculatedAt=datetime.now(UTC),
+    )
+    flag_modified(modeling_result, 'params')
+
+
+def _calculate_fingerprint(modeling_type, inputs, data, args):
+    """
+    A hash of everything that determines the outcome of a fit: the model type,
+    its inputs, the backend and the time and value series.
+    """
+    parameters = {
+        'type':    modeling_type,
+        'inputs':  inputs,
+        'backend': args.get('backend', 'r'),
+    }
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(parameters, sort_keys=True).encode('utf-8'))
+    digest.update(data['time'].to_numpy(dtype=float).tobytes())
+    digest.update(data['value'].to_numpy(dtype=float).tobytes())
+
+    return digest.hexdigest()
+
+
+def _reuse_matching_result(db_session, modeling_result, fingerprint):
+    """
+    Copies the parameters of a ready result with the same fingerprint, if
+    there is one. Only ready results keep their fingerprint, so the given
+    result is a match if it hasn't changed since it was last calculated.
+    """
+    matching_result = db_session.scalars(
+        sql.select(ModelingResult)
+        .where(
+            ModelingResult.inputFingerprint == fingerprint,
+            sql.or_(
+                ModelingResult.id == modeling_result.id,
+                ModelingResult.state == 'ready',
+            ),
+        )
+        .order_by(ModelingResult.id != modeling_result.id)
+        .limit(1)
+    ).one_or_none()
+
+    if matching_result is None:
+        return False
+
+    if matching_result != modeling_result:
+        modeling_result.update(
+            rSummary=matching_result.rSummary,
+            params=dict(matching_result.params),
+            calculatedAt=matching_result.calculatedAt,
+        )
+        flag_modified(modeling_result, 'params')
+
+    modeling_result.state = 'ready'
+    modeling_result.error = None
+
+    return True
+
+
+def _update_fingerprint(modeling_result, fingerprint):
+    if modeling_result.state == 'ready':
+        modeling_result.inputFingerprint = fingerprint
+    else:
+        modeling_result.inputFingerprint = None
+
+
+def _split_job_output(text):
+    "Splits the output of ``batch.R`` into the output of each job by name"
+    job_outputs   = {}
+    current_name  = None
+    current_lines = []
+
+    for line in text.splitlines():
+        if match := re.search(r'## JOB (\S+) START', line):
+            current_name  = match[1]
+            current_lines = []
+        elif re.search(r'## JOB (\S+) END', line):
+            job_outputs[current_name] = "\n".join(current_lines)
+            current_name = None
+        elif current_name is not None:
+            current_lines.append(line)
+
+    return job_outputs
 
 
 def _extract_r_summary(text):
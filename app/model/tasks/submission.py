@@ -0,0 +1,71 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from db import FLASK_DB, get_connection
+from app.model.orm import Submission
+from app.model.lib.db import named_lock
+from app.model.lib.submission_process import (
+    persist_submission_to_database,
+    validate_data_file,
+)
+from app.view.forms.submission_form import SubmissionForm
+
+_LOGGER = get_task_logger(__name__)
+
+PROCESSING_LOCK_TIMEOUT = int(Submission.PROCESSING_TIMEOUT.total_seconds())
+"Seconds to wait for a previous job that is processing the same submission"
+
+
+@shared_task
+def process_submission(submission_id, user_uuid):
+    db_session = FLASK_DB.session
+
+    _process_submission(db_session, submission_id, user_uuid)
+
+
+def _process_submission(db_session, submission_id, user_uuid):
+    # A job that is only slow can outlive PROCESSING_TIMEOUT, after which the
+    # submission can be processed again. Jobs of the same submission wait for
+    # each other, so they never save its study at the same time:
+    with get_connection() as lock_connection:
+        lock_name = f"submission-{submission_id}"
+
+        with named_lock(lock_connection, lock_name, timeout=PROCESSING_LOCK_TIMEOUT) as acquired:
+            return _process_locked_submission(db_session, submission_id, user_uuid, acquired)
+
+
+def _process_locked_submission(db_session, submission_id, user_uuid, acquired):
+    submission_form = SubmissionForm(submission_id, db_session=db_session, user_uuid=user_uuid)
+    submission      = submission_form.submission
+
+    def update_state(state, errors=None):
+        submission.processingState  = state
+        submission.processingErrors = errors
+
+        db_session.add(submission)
+        db_session.commit()
+
+    try:
+        if not acquired:
+            errors = ["The data is still being processed by a previous submission, please try again later"]
+        elif not submission.dataFile:
+            errors = ["No data file uploaded"]
+        else:
+            update_state('validating')
+            errors = validate_data_file(submission_form)
+
+        if not errors:
+            errors = persist_submission_to_database(submission_form, on_progress=update_state)
+    except Exception:
+        _LOGGER.exception(f"Failed to process submission {submission_id}")
+        db_session.rollback()
+
+        errors = ["Unexpected error while processing the data, please try again later"]
+
+    if errors:
+        update_state('error', errors)
+    else:
+        update_state('ready')
+
+    # Returning the object for testing purposes, not used
+    return submission
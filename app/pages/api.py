@@ -3,18 +3,25 @@ import re
 from flask import (
     g,
     request,
+    Response,
+    stream_with_context,
 )
 from werkzeug.exceptions import NotFound
+import pandas as pd
 import sqlalchemy as sql
+import simplejson as json
 
+from app.model.lib.db import stream_into_dfs
 from app.model.lib.conversion import (
     convert_df_units,
+    convert_df_units_by_row,
     CELL_COUNT_UNITS,
     CFU_COUNT_UNITS,
     METABOLITE_UNITS,
 )
 from app.model.orm import (
     Bioreplicate,
+    Community,
     Experiment,
     Measurement,
     MeasurementContext,
@@ -24,6 +31,19 @@ from app.model.orm import (
     StudyStrain,
 )
 from app.model.lib.errors import ClientError
+from app.model.lib.util import get_int_arg
+
+SEARCH_PAGINATION_PARAMS = ('limit', 'after', 'format')
+"Search parameters that control the form of the results, not the results themselves"
+
+SEARCH_STREAM_BATCH_SIZE = 1000
+"Number of measurement contexts read from the database at a time when streaming"
+
+MEASUREMENT_UNIT_PARAMS = ('cellCountUnits', 'cfuCountUnits', 'metaboliteUnits')
+"Parameters that select the units of the measurements in CSV downloads"
+
+CSV_STREAM_CHUNK_SIZE = 10_000
+"Number of measurements read from the database at a time for CSV downloads"
 
 
 def project_json(publicId):
@@ -65,7 +85,19 @@ def study_json(publicId):
 
 
 def experiment_json(publicId):
-    experiment = g.db_session.get_one(Experiment, publicId)
+    experiment = g.db_session.get_one(Experiment, publicId, options=[
+        sql.orm.selectinload(Experiment.study),
+        sql.orm.selectinload(Experiment.community),
+        sql.orm.selectinload(Experiment.community, Community.strains),
+        sql.orm.selectinload(Experiment.compartments),
+        sql.orm.selectinload(Experiment.bioreplicates),
+        sql.orm.selectinload(Experiment.bioreplicates, Bioreplicate.measurementContexts),
+        sql.orm.selectinload(
+            Experiment.bioreplicates,
+            Bioreplicate.measurementContexts,
+            MeasurementContext.technique,
+        ),
+    ])
 
     if not experiment.study.isPublished:
         raise NotFound
@@ -75,6 +107,12 @@ def experiment_json(publicId):
     else:
         community_strains = []
 
+    metabolite_masses = _fetch_metabolite_masses([
+        mc
+        for b in experiment.bioreplicates
+        for mc in b.measurementContexts
+    ])
+
     return {
         'id':              experiment.publicId,
         'name':            experiment.name,
@@ -122,7 +160,7 @@ def experiment_json(publicId):
                 'measurementContexts': [
                     {
                         'id': mc.id,
-                        **_measurement_technique_fields(mc),
+                        **_measurement_technique_fields(mc, metabolite_masses),
                         **_measurement_subject_fields(mc)
                     }
                     for mc in b.measurementContexts
@@ -138,9 +176,7 @@ def experiment_csv(publicId):
     if not experiment or not experiment.study.isPublished:
         raise NotFound
 
-    df = experiment.get_df(g.db_session)
-
-    return df.to_csv(index=False)
+    return _csv_response(experiment.get_df_query())
 
 
 def measurement_context_json(id):
@@ -159,7 +195,7 @@ def measurement_context_json(id):
         'studyId':              measurement_context.studyId,
         'bioreplicateId':       measurement_context.bioreplicate.id,
         'bioreplicateName':     measurement_context.bioreplicate.name,
-        **_measurement_technique_fields(measurement_context),
+        **_measurement_technique_fields(measurement_context, _fetch_metabolite_masses([measurement_context])),
         **_measurement_subject_fields(measurement_context),
         'measurementCount':     measurement_count,
         'measurementTimeUnits': 'h',
@@ -171,26 +207,39 @@ def measurement_context_csv(id):
     if not measurement_context or not measurement_context.study.isPublished:
         raise NotFound
 
-    df           = measurement_context.get_df(g.db_session)
-    source_units = measurement_context.technique.units
-
-    metabolite_mass = _get_metabolite_mass(measurement_context)
-    _convert_to_requested_units(df, source_units, metabolite_mass)
+    metabolite_masses = _fetch_metabolite_masses([measurement_context])
+    conversion        = _requested_conversion(measurement_context, metabolite_masses)
 
+    columns = None
     if request.args.get('withLabel'):
         html_label = measurement_context.get_chart_label()
         plain_label = re.sub(r'</?(b|sub)>', '', html_label)
 
-        df.rename(columns={'value': plain_label}, inplace=True)
+        columns = {'value': plain_label}
+
+    def convert_chunk(df):
+        if conversion:
+            convert_df_units(df, *conversion)
 
-    return df.to_csv(index=False)
+    return _csv_response(
+        measurement_context.get_df_query(),
+        convert_chunk=convert_chunk,
+        columns=columns,
+    )
 
 
 def bioreplicate_json(id):
-    bioreplicate = g.db_session.get(Bioreplicate, id)
+    bioreplicate = g.db_session.get(Bioreplicate, id, options=[
+        sql.orm.selectinload(Bioreplicate.study),
+        sql.orm.selectinload(Bioreplicate.experiment),
+        sql.orm.selectinload(Bioreplicate.measurementContexts),
+        sql.orm.selectinload(Bioreplicate.measurementContexts, MeasurementContext.technique),
+    ])
     if not bioreplicate or not bioreplicate.study.isPublished:
         raise NotFound
 
+    metabolite_masses = _fetch_metabolite_masses(bioreplicate.measurementContexts)
+
     return {
         'id':                   bioreplicate.id,
         'experimentId':         bioreplicate.experiment.publicId,
@@ -202,7 +251,7 @@ def bioreplicate_json(id):
         'measurementContexts': [
             {
                 'id': mc.id,
-                **_measurement_technique_fields(mc),
+                **_measurement_technique_fields(mc, metabolite_masses),
                 **_measurement_subject_fields(mc),
             }
             for mc in bioreplicate.measurementContexts
@@ -211,83 +260,187 @@ def bioreplicate_json(id):
 
 
 def bioreplicate_csv(id):
-    bioreplicate = g.db_session.get(Bioreplicate, id)
+    bioreplicate = g.db_session.get(Bioreplicate, id, options=[
+        sql.orm.selectinload(Bioreplicate.study),
+        sql.orm.selectinload(Bioreplicate.measurementContexts),
+        sql.orm.selectinload(Bioreplicate.measurementContexts, MeasurementContext.technique),
+    ])
     if not bioreplicate or not bioreplicate.study.isPublished:
         raise NotFound
 
-    df = bioreplicate.get_df(g.db_session)
+    convert_chunk = _context_chunk_converter(bioreplicate.measurementContexts)
 
-    measurement_contexts = g.db_session.scalars(
+    return _csv_response(bioreplicate.get_df_query(), convert_chunk=convert_chunk)
+
+
+def measurement_contexts_csv():
+    """
+    Measurements of multiple contexts in a single long-format CSV with a
+    ``measurementContextId`` column. The contexts are given either as a
+    comma-separated list of ``ids`` or with the parameters of the search
+    endpoint. All of them need to be public.
+    """
+    request_args = request.args.to_dict()
+
+    query = (
         sql.select(MeasurementContext)
-        .where(MeasurementContext.id.in_([mc.id for mc in bioreplicate.measurementContexts]))
+        .join(Study)
+        .where(Study.isPublished)
         .options(sql.orm.selectinload(MeasurementContext.technique))
+        .order_by(MeasurementContext.id)
     )
 
-    # Convert units for each individual measurement context:
-    for mc in measurement_contexts:
-        mc_df = df[df['measurementContextId'] == mc.id].copy()
-        _convert_to_requested_units(mc_df, mc.technique.units, _get_metabolite_mass(mc))
-        df.loc[df['measurementContextId'] == mc.id] = mc_df
+    if 'ids' in request_args:
+        for key in request_args:
+            if key != 'ids' and key not in MEASUREMENT_UNIT_PARAMS:
+                raise ClientError(f"Unknown parameter: {key}")
+
+        context_ids = _get_int_list_arg('ids')
+
+        measurement_contexts = g.db_session.scalars(
+            query.where(MeasurementContext.id.in_(context_ids))
+        ).all()
+
+        # Missing and private contexts can't be distinguished:
+        if len(measurement_contexts) < len(set(context_ids)):
+            raise NotFound
+    else:
+        conditions, _ = _search_conditions(request_args, ignored_params=MEASUREMENT_UNIT_PARAMS)
+
+        measurement_contexts = g.db_session.scalars(
+            query.where(sql.or_(*conditions))
+        ).all()
+
+    convert_chunk = _context_chunk_converter(measurement_contexts)
+
+    measurements_query = (
+        sql.select(
+            Measurement.contextId.label("measurementContextId"),
+            Measurement.timeInHours.label("time"),
+            Measurement.value,
+            Measurement.std,
+        )
+        .where(
+            Measurement.contextId.in_([mc.id for mc in measurement_contexts]),
+            Measurement.value.is_not(None),
+        )
+        .order_by(
+            Measurement.contextId,
+            Measurement.timeInSeconds,
+        )
+    )
 
-    return df.to_csv(index=False)
+    return _csv_response(measurements_query, convert_chunk=convert_chunk)
 
 
 def search_json():
+    """
+    Measurement contexts of the given strains or metabolites, ordered by id.
+
+    With ``limit``, at most that many contexts are returned along with a
+    ``nextAfter`` cursor to pass as the ``after`` parameter of the next
+    request. With ``format=ndjson``, the contexts are streamed one per line
+    as they are read from the database.
+    """
     request_args = request.args.to_dict()
-    if len(request_args) == 0:
-        return {"error": "No search query parameters"}, 400
 
-    results = set()
+    conditions, metabolite_masses = _search_conditions(
+        request_args,
+        ignored_params=SEARCH_PAGINATION_PARAMS,
+    )
 
-    for (key, value) in request_args.items():
-        if key == 'strainNcbiIds':
-            values = value.split(',')
-            study_strain_ids = g.db_session.scalars(
-                sql.select(StudyStrain.id)
-                .where(StudyStrain.ncbiId.in_(values)),
-            ).all()
-            results.update(_contexts_by_subject('strain', study_strain_ids))
+    limit = get_int_arg(request.args, 'limit', minimum=1)
+    after = get_int_arg(request.args, 'after')
 
-        elif key == 'metaboliteChebiIds':
-            values = [f"CHEBI:{v}" for v in value.split(',')]
+    query = (
+        sql.select(MeasurementContext)
+        .where(sql.or_(*conditions))
+        .options(
+            sql.orm.joinedload(MeasurementContext.technique),
+            sql.orm.joinedload(MeasurementContext.experiment),
+            sql.orm.joinedload(MeasurementContext.bioreplicate),
+        )
+        .order_by(MeasurementContext.id)
+    )
+    if after is not None:
+        query = query.where(MeasurementContext.id > after)
 
-            metabolite_ids = g.db_session.scalars(
-                sql.select(Metabolite.id)
-                .where(Metabolite.chebiId.in_(values)),
-            ).all()
-            results.update(_contexts_by_subject('metabolite', metabolite_ids))
+    response_format = request_args.get('format', 'json')
+    if response_format not in ('json', 'ndjson'):
+        raise ClientError(f"Unknown format: {response_format}")
 
-        else:
-            return {"error": f"Unknown search parameter: {key}"}, 400
+    if response_format == 'ndjson':
+        if limit is not None:
+            query = query.limit(limit)
+
+        stream = _stream_search_results(query, metabolite_masses)
+        return Response(stream_with_context(stream), mimetype='application/x-ndjson')
+
+    if limit is not None:
+        # One more than requested to find out if there's a next page:
+        query = query.limit(limit + 1)
 
-    measurement_contexts = list(results)
+    measurement_contexts = g.db_session.scalars(query).all()
+
+    if limit is not None and len(measurement_contexts) > limit:
+        measurement_contexts = measurement_contexts[:limit]
+        next_after = measurement_contexts[-1].id
+    else:
+        next_after = None
 
     experiment_ids = sorted({mc.experiment.publicId for mc in measurement_contexts})
     study_ids      = sorted({mc.experiment.studyId for mc in measurement_contexts})
 
-    return {
+    data = {
         'studies':              study_ids,
         'experiments':          experiment_ids,
         'measurementTimeUnits': 'h',
         'measurementContexts': [
-            {
-                'id':               mc.id,
-                'experimentId':     mc.experiment.publicId,
-                'studyId':          mc.studyId,
-                'bioreplicateId':   mc.bioreplicate.id,
-                'bioreplicateName': mc.bioreplicate.name,
-                **_measurement_technique_fields(mc),
-                **_measurement_subject_fields(mc),
-            }
+            _search_result_fields(mc, metabolite_masses)
             for mc in measurement_contexts
         ]
     }
+    if limit is not None:
+        data['nextAfter'] = next_after
+
+    return data
+
+
+def _stream_search_results(query, metabolite_masses):
+    # Read in batches through a server-side cursor, so the full result is
+    # never held in memory:
+    measurement_contexts = g.db_session.scalars(
+        query.execution_options(yield_per=SEARCH_STREAM_BATCH_SIZE)
+    )
+
+    for batch in measurement_contexts.partitions():
+        lines = [
+            json.dumps(_search_result_fields(mc, metabolite_masses)) + '\n'
+            for mc in batch
+        ]
+        yield ''.join(lines)
+
+
+def _search_result_fields(measurement_context, metabolite_masses):
+    return {
+        'id':               measurement_context.id,
+        'experimentId':     measurement_context.experiment.publicId,
+        'studyId':          measurement_context.studyId,
+        'bioreplicateId':   measurement_context.bioreplicate.id,
+        'bioreplicateName': measurement_context.bioreplicate.name,
+        **_measurement_technique_fields(measurement_context, metabolite_masses),
+        **_measurement_subject_fields(measurement_context),
+    }
 
 
-def _measurement_technique_fields(measurement_context):
+def _measurement_technique_fields(measurement_context, metabolite_masses):
     measurement_technique = measurement_context.technique
 
-    metabolite_mass = _get_metabolite_mass(measurement_context)
+    if measurement_context.subjectType == 'metabolite':
+        metabolite_mass = metabolite_masses.get(measurement_context.subjectId)
+    else:
+        metabolite_mass = None
+
     requested_units = _convert_unit_label_to_requested(measurement_technique.units, metabolite_mass)
 
     fields = {
@@ -323,37 +476,80 @@ def _measurement_subject_fields(measurement_context):
     }
 
 
-def _contexts_by_subject(subject_type, subject_id):
-    sql_options = (
-        sql.orm.joinedload(MeasurementContext.technique),
-        sql.orm.joinedload(MeasurementContext.experiment),
+def _search_conditions(request_args, ignored_params=()):
+    """
+    Builds the conditions on measurement contexts for the parameters of the
+    search endpoint. Returns a list of conditions that any of the contexts can
+    match and the masses of the requested metabolites.
+    """
+    conditions        = []
+    metabolite_masses = {}
+
+    for (key, value) in request_args.items():
+        if key == 'strainNcbiIds':
+            values = value.split(',')
+            study_strain_ids = g.db_session.scalars(
+                sql.select(StudyStrain.id)
+                .where(StudyStrain.ncbiId.in_(values)),
+            ).all()
+            conditions.append(_subject_condition('strain', study_strain_ids))
+
+        elif key == 'metaboliteChebiIds':
+            values = [f"CHEBI:{v}" for v in value.split(',')]
+
+            metabolite_masses = dict(g.db_session.execute(
+                sql.select(Metabolite.id, Metabolite.averageMass)
+                .where(Metabolite.chebiId.in_(values)),
+            ).all())
+            conditions.append(_subject_condition('metabolite', list(metabolite_masses.keys())))
+
+        elif key in ignored_params:
+            continue
+
+        else:
+            raise ClientError(f"Unknown search parameter: {key}")
+
+    if len(conditions) == 0:
+        raise ClientError("No search query parameters")
+
+    return conditions, metabolite_masses
+
+
+def _subject_condition(subject_type, subject_ids):
+    return sql.and_(
+        MeasurementContext.subjectType == subject_type,
+        MeasurementContext.subjectId.in_(subject_ids),
     )
 
-    if isinstance(subject_id, list):
-        return g.db_session.scalars(
-            sql.select(MeasurementContext)
-            .where(
-                MeasurementContext.subjectType == subject_type,
-                MeasurementContext.subjectId.in_(subject_id),
-            )
-            .options(*sql_options)
-        ).all()
-    else:
-        return g.db_session.scalars(
-            sql.select(MeasurementContext)
-            .where(
-                MeasurementContext.subjectType == subject_type,
-                MeasurementContext.subjectId == subject_id,
-            )
-            .options(*sql_options)
-        ).all()
 
+def _get_int_list_arg(name):
+    values = [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+    if len(values) == 0:
+        raise ClientError(f"Expected a comma-separated list of integers for the \"{name}\" parameter")
 
-def _get_metabolite_mass(measurement_context):
-    if measurement_context.subjectType != 'metabolite':
-        return None
+    try:
+        return [int(v) for v in values]
+    except ValueError:
+        raise ClientError(f"Expected a comma-separated list of integers for the \"{name}\" parameter, got: {request.args[name]}")
+
+
+def _fetch_metabolite_masses(measurement_contexts):
+    """
+    Fetches the masses of the metabolites measured in the given contexts with
+    a single query, returning a dict with metabolite ids as keys.
+    """
+    metabolite_ids = sorted({
+        mc.subjectId
+        for mc in measurement_contexts
+        if mc.subjectType == 'metabolite'
+    })
+    if not metabolite_ids:
+        return {}
 
-    return measurement_context.get_subject(g.db_session).averageMass
+    return dict(g.db_session.execute(
+        sql.select(Metabolite.id, Metabolite.averageMass)
+        .where(Metabolite.id.in_(metabolite_ids))
+    ).all())
 
 
 def _convert_unit_label_to_requested(source_units, metabolite_mass=None):
@@ -367,24 +563,94 @@ def _convert_unit_label_to_requested(source_units, metabolite_mass=None):
         return source_units
 
 
-def _convert_to_requested_units(df, source_units, metabolite_mass=None):
+def _requested_conversion(measurement_context, metabolite_masses):
+    """
+    Returns the ``(source_units, target_units, metabolite_mass)`` arguments
+    for ``convert_df_units`` that convert the context's measurements to the
+    requested units, or ``None`` if they are not convertible.
+    """
+    source_units = measurement_context.technique.units
+
+    if measurement_context.subjectType == 'metabolite':
+        metabolite_mass = metabolite_masses.get(measurement_context.subjectId)
+    else:
+        metabolite_mass = None
+
     if source_units in CELL_COUNT_UNITS:
         target_units = request.args.get('cellCountUnits', 'Cells/mL')
         if target_units not in CELL_COUNT_UNITS:
             raise ClientError(f"Unexpected cell count units requested: {target_units}")
 
-        convert_df_units(df, source_units, target_units)
+        return (source_units, target_units, None)
 
     elif source_units in CFU_COUNT_UNITS:
         target_units  = request.args.get('cfuCountUnits', 'CFUs/mL')
         if target_units not in CFU_COUNT_UNITS:
             raise ClientError(f"Unexpected CFU count units requested: {target_units}")
 
-        convert_df_units(df, source_units, target_units)
+        return (source_units, target_units, None)
 
     elif source_units in METABOLITE_UNITS and metabolite_mass:
         target_units = request.args.get('metaboliteUnits', 'mM')
         if target_units not in METABOLITE_UNITS:
             raise ClientError(f"Unexpected metabolite count units requested: {target_units}")
 
-        convert_df_units(df, source_units, target_units, metabolite_mass)
+        return (source_units, target_units, metabolite_mass)
+
+    else:
+        return None
+
+
+def _context_chunk_converter(measurement_contexts):
+    """
+    Returns a function that converts a chunk of measurements of the given
+    contexts to the requested units, all rows at once. The chunk needs a
+    "measurementContextId" column.
+
+    The requested units are validated and the metabolite masses are fetched
+    right away, before a response starts streaming.
+    """
+    metabolite_masses = _fetch_metabolite_masses(measurement_contexts)
+    conversions = {
+        mc.id: conversion
+        for mc in measurement_contexts
+        if (conversion := _requested_conversion(mc, metabolite_masses))
+    }
+    conversion_df = pd.DataFrame.from_dict(
+        conversions,
+        orient='index',
+        columns=['sourceUnits', 'targetUnits', 'metaboliteMass'],
+    )
+
+    def convert_chunk(df):
+        row_conversions = conversion_df.reindex(df['measurementContextId'])
+
+        convert_df_units_by_row(
+            df,
+            row_conversions['sourceUnits'],
+            row_conversions['targetUnits'],
+            row_conversions['metaboliteMass'],
+        )
+
+    return convert_chunk
+
+
+def _csv_response(query, convert_chunk=None, columns=None):
+    """
+    Streams the results of the query as CSV, reading them in chunks through a
+    server-side cursor. The ``convert_chunk`` function can modify each chunk's
+    dataframe in place, ``columns`` renames columns in the output.
+    """
+    def generate():
+        chunks = stream_into_dfs(g.db_session, query, CSV_STREAM_CHUNK_SIZE)
+
+        for (i, df) in enumerate(chunks):
+            if convert_chunk:
+                convert_chunk(df)
+
+            if columns:
+                df = df.rename(columns=columns)
+
+            yield df.to_csv(index=False, header=(i == 0))
+
+    return Response(stream_with_context(generate()), mimetype='text/csv')
@@ -12,6 +12,10 @@ import sqlalchemy as sql
 
 from app.model.orm import MeasurementContext, ModelingResult
 from app.view.forms.comparative_chart_form import ComparativeChartForm
+from app.model.lib.chart_cache import (
+    cached_chart_fragment,
+    chart_record_ids,
+)
 
 
 def comparison_show_page():
@@ -120,19 +124,30 @@ def comparison_chart_fragment():
     args = request.form.to_dict()
     width = request.args.get('width', None)
 
-    # TODO (2025-05-18) Convert time units between studies
-    chart_form = ComparativeChartForm(
+    def render():
+        # TODO (2025-05-18) Convert time units between studies
+        chart_form = ComparativeChartForm(
+            g.db_session,
+            time_units='h',
+            show_std=args.get('showStd', None) is not None,
+            show_perturbations=args.get('showPerturbations', None) is not None,
+        )
+        chart = chart_form.build_chart(args, width, clamp_x_data=True)
+
+        return render_template(
+            'pages/comparison/_chart.html',
+            chart_form=chart_form,
+            chart=chart,
+        )
+
+    context_ids, model_ids = chart_record_ids(args)
+
+    return cached_chart_fragment(
         g.db_session,
-        time_units='h',
-        show_std=args.get('showStd', None) is not None,
-        show_perturbations=args.get('showPerturbations', None) is not None,
-    )
-    chart = chart_form.build_chart(args, width, clamp_x_data=True)
-
-    return render_template(
-        'pages/comparison/_chart.html',
-        chart_form=chart_form,
-        chart=chart,
+        key=['comparison', sorted(args.items()), width],
+        render=render,
+        context_ids=context_ids,
+        model_ids=model_ids,
     )
 
 
@@ -6,6 +6,7 @@ import sqlalchemy as sql
 from db import get_connection
 from app.model.orm import Metabolite, StudyMetabolite
 from app.model.lib.util import read_timestamp_date
+from app.model.lib.search_facets import fetch_facet_counts
 
 
 def metabolite_show_page(chebiId):
@@ -15,10 +16,12 @@ def metabolite_show_page(chebiId):
         .limit(1)
     ).one()
 
-    study_count = g.db_session.scalars(
-        sql.select(sql.func.count(StudyMetabolite.id))
-        .where(StudyMetabolite.chebiId == metabolite.chebiId)
-    ).one()
+    facet_counts = fetch_facet_counts(
+        g.db_session,
+        {'metabolite': [metabolite.chebiId]},
+        include_unpublished=True,
+    )
+    study_count = facet_counts['metabolite'].get(metabolite.chebiId, 0)
 
     search_url = url_for('search_index_page', chebiIds=metabolite.chebiId)
 
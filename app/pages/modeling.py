@@ -26,9 +26,25 @@ from app.model.orm import (
     StudyTechnique,
 )
 from app.model.lib.chart import Chart
+from app.model.lib.chart_cache import (
+    cached_chart_fragment,
+    invalidate_study_charts,
+)
 from app.model.lib.model_export import export_model_csv
 from app.model.lib.modeling import COMMON_COEFFICIENTS
-from app.model.tasks.modeling import process_modeling_request
+from app.model.lib.errors import ClientError
+from app.model.lib.bulk_modeling import (
+    BUILT_IN_MODEL_TYPES,
+    build_modeling_inputs,
+    group_into_sequences,
+    prepare_bulk_modeling,
+    split_into_batches,
+    summarize_modeling_states,
+)
+from app.model.tasks.modeling import (
+    process_modeling_request,
+    queue_modeling_batches,
+)
 
 
 def modeling_page(publicId):
@@ -94,6 +110,9 @@ def modeling_submit_action(publicId):
     modeling_type = args.pop('modelingType')
     measurement_context_id = int(args.pop('selectedContext').removeprefix('measurementContext|'))
 
+    # Validate the inputs before queueing the fit:
+    build_modeling_inputs(modeling_type, args)
+
     modeling_result = g.db_session.scalars(
         sql.select(ModelingResult)
         .where(
@@ -117,6 +136,54 @@ def modeling_submit_action(publicId):
     return {'modelingResultId': modeling_result.id}
 
 
+def modeling_submit_all_action(publicId):
+    study = _fetch_study_for_manager(publicId)
+    if not study.manageable_by_user(g.current_user):
+        raise Forbidden()
+
+    modeling_types = request.form.getlist('modelingTypes') or request.form.getlist('modelingType')
+    modeling_types = [t for t in modeling_types if t in BUILT_IN_MODEL_TYPES]
+
+    args = {
+        key: request.form[key]
+        for key in ('pointCount', 'endTime', 'backend')
+        if key in request.form
+    }
+
+    try:
+        technique_ids = [int(id) for id in request.form.getlist('techniqueIds')]
+    except ValueError:
+        raise ClientError("Expected a list of integers for the \"techniqueIds\" parameter")
+
+    modeling_requests, skipped_count = prepare_bulk_modeling(
+        g.db_session,
+        study,
+        modeling_types,
+        args,
+        technique_ids=technique_ids,
+        experiment_ids=request.form.getlist('experimentIds'),
+    )
+    g.db_session.commit()
+
+    for batches in group_into_sequences(split_into_batches(modeling_requests)):
+        queue_modeling_batches(batches)
+
+    return {
+        'modelingResultIds': [modeling_result_id for (modeling_result_id, _, _) in modeling_requests],
+        'skippedCount':      skipped_count,
+    }
+
+
+def modeling_status_json(publicId):
+    study = _fetch_study_for_manager(publicId)
+    if not study.manageable_by_user(g.current_user):
+        raise Forbidden()
+
+    modeling_results = [mr for mr in study.modelingResults if mr.type in BUILT_IN_MODEL_TYPES]
+
+    return summarize_modeling_states(modeling_results)
+
+
 def modeling_chart_fragment(publicId, measurementContextId):
     study = _fetch_study_for_manager(publicId)
     if not study.manageable_by_user(g.current_user):
@@ -128,21 +195,6 @@ def modeling_chart_fragment(publicId, measurementContextId):
     log_transform = args.pop('logTransform', 'false') == 'true'
 
     measurement_context = g.db_session.get(MeasurementContext, measurementContextId)
-    measurement_df      = measurement_context.get_df(g.db_session)
-
-    chart = Chart(
-        time_units=study.timeUnits,
-        log_left=log_transform,
-    )
-    units = measurement_context.technique.units
-    if units == '':
-        units = measurement_context.technique.short_name
-
-    chart.add_df(
-        measurement_df,
-        units=units,
-        label=measurement_context.get_chart_label(),
-    )
 
     modeling_record = g.db_session.scalars(
         sql.select(ModelingResult)
@@ -153,29 +205,54 @@ def modeling_chart_fragment(publicId, measurementContextId):
         )
     ).one_or_none()
 
-    if modeling_record:
-        df = modeling_record.generate_chart_df(measurement_df)
+    def render():
+        measurement_df = measurement_context.get_df(g.db_session)
 
-        label = modeling_record.model_name
-        chart.add_model_df(df, units=units, label=label)
+        chart = Chart(
+            time_units=study.timeUnits,
+            log_left=log_transform,
+        )
+        units = measurement_context.technique.units
+        if units == '':
+            units = measurement_context.technique.short_name
+
+        chart.add_df(
+            measurement_df,
+            units=units,
+            label=measurement_context.get_chart_label(),
+        )
 
-        model_params = modeling_record.params
-        r_summary    = modeling_record.rSummary
-    else:
-        model_params = ModelingResult.empty_params(modeling_type)
-        r_summary    = None
+        if modeling_record:
+            df = modeling_record.generate_chart_df(measurement_df)
+
+            label = modeling_record.model_name
+            chart.add_model_df(df, units=units, label=label)
+
+            model_params = modeling_record.params
+            r_summary    = modeling_record.rSummary
+        else:
+            model_params = ModelingResult.empty_params(modeling_type)
+            r_summary    = None
+
+        return render_template(
+            'pages/modeling/_chart.html',
+            study_id=publicId,
+            chart=chart,
+            modeling_record=modeling_record,
+            form_data=request.form,
+            modeling_type=modeling_type,
+            model_params=model_params,
+            r_summary=r_summary,
+            measurement_context=measurement_context,
+            log_transform=log_transform,
+        )
 
-    return render_template(
-        'pages/modeling/_chart.html',
-        study_id=publicId,
-        chart=chart,
-        modeling_record=modeling_record,
-        form_data=request.form,
-        modeling_type=modeling_type,
-        model_params=model_params,
-        r_summary=r_summary,
-        measurement_context=measurement_context,
-        log_transform=log_transform,
+    return cached_chart_fragment(
+        g.db_session,
+        key=['modeling', measurement_context.id, modeling_type, log_transform],
+        render=render,
+        context_ids=[measurement_context.id],
+        model_ids=[modeling_record.id] if modeling_record else [],
     )
 
 
@@ -195,6 +272,9 @@ def modeling_toggle_published_action(publicId, modelingResultId):
         g.db_session.add(modeling_record)
         g.db_session.commit()
 
+    # Cached charts show the publication state of models:
+    invalidate_study_charts(study.publicId)
+
     return {}
 
 
@@ -247,6 +327,9 @@ def modeling_custom_model_update_action(publicId):
     g.db_session.add(custom_model)
     g.db_session.commit()
 
+    # Model names are shown in chart labels:
+    invalidate_study_charts(study.publicId)
+
     redirect_url = url_for(
         'modeling_page',
         publicId=study.publicId,
@@ -270,6 +353,8 @@ def modeling_custom_model_delete_action(publicId, customModelId):
     g.db_session.delete(custom_model)
     g.db_session.commit()
 
+    invalidate_study_charts(study.publicId)
+
     # The ajax action will reload the page
     return {}
 
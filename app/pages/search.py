@@ -13,7 +13,7 @@ from flask import (
 import sqlalchemy as sql
 
 from app.view.forms.search_form import SearchForm, SearchFormClause
-from app.model.lib.search_queries import dynamical_query
+from app.model.lib.search_queries import build_advanced_search_query
 from app.model.orm import (
     Study,
     StudyUser,
@@ -30,7 +30,7 @@ def search_index_page():
         ncbiIds=request.args.getlist('ncbiIds'),
         chebiIds=request.args.getlist('chebiIds'),
         per_page=int(request.args.get('perPage', g.items_per_page)),
-        offset=int(request.args.get('offset', '0')),
+        after=request.args.get('after'),
     )
 
     studies = search.fetch_results()
@@ -38,7 +38,7 @@ def search_index_page():
     render_params = dict(
         search=search,
         studies=studies,
-        offset=0,
+        facet_counts=search.fetch_facet_counts(studies),
     )
 
     if is_ajax(request):
@@ -57,7 +57,6 @@ def advanced_search_index_page():
 
     template_clause  = SearchFormClause()
     search_submitted = False
-    study_ids        = []
     results          = []
 
     if form.data['clauses'] and form.data['clauses'][0]['value']:
@@ -74,12 +73,7 @@ def advanced_search_index_page():
         else:
             publish_clause = Study.isPublished
 
-        query, values = dynamical_query(form.data['clauses'])
-        value_dict = {f"value_{i}": v for i, v in enumerate(values)}
-        study_ids = [
-            studyId for (studyId,)
-            in g.db_conn.execute(sql.text(query), value_dict)
-        ]
+        study_ids = build_advanced_search_query(form.data['clauses'])
 
         results = g.db_session.scalars(
             sql.select(Study)
@@ -2,6 +2,7 @@ import uuid
 
 from flask import (
     g,
+    make_response,
     render_template,
     send_file,
     request,
@@ -21,6 +22,10 @@ from app.model.orm import (
 )
 from app.view.forms.experiment_export_form import ExperimentExportForm
 from app.view.forms.comparative_chart_form import ComparativeChartForm
+from app.model.lib.chart_cache import (
+    cached_chart_fragment,
+    chart_record_ids,
+)
 import app.model.lib.util as util
 
 
@@ -203,26 +208,81 @@ def study_visualize_page(publicId):
 
 
 def study_chart_fragment(publicId):
+    """
+    The controls of the study's chart. The chart itself is rendered by the
+    client with the data from ``study_chart_json``.
+    """
     study = _fetch_study_for_visitor(publicId)
     args = request.form.to_dict()
 
-    width = request.args.get('width', None)
+    def render():
+        chart_form = ComparativeChartForm(
+            g.db_session,
+            time_units=study.timeUnits,
+            show_std=args.get('showStd', None) is not None,
+            show_perturbations=args.get('showPerturbations', None) is not None,
+        )
+        chart_form.load_records(args)
 
-    chart_form = ComparativeChartForm(
+        return render_template(
+            'pages/studies/visualize/_chart.html',
+            chart_form=chart_form,
+            study=study,
+        )
+
+    context_ids, model_ids = chart_record_ids(args)
+
+    return cached_chart_fragment(
         g.db_session,
-        time_units=study.timeUnits,
-        show_std=args.get('showStd', None) is not None,
-        show_perturbations=args.get('showPerturbations', None) is not None,
+        key=['study', study.publicId, sorted(args.items())],
+        render=render,
+        context_ids=context_ids,
+        model_ids=model_ids,
     )
-    chart = chart_form.build_chart(args, width)
 
-    return render_template(
-        'pages/studies/visualize/_chart.html',
-        chart_form=chart_form,
-        chart=chart,
-        study=study,
+
+def study_chart_json(publicId):
+    """
+    The data of the study's chart in a compact form for ``Plotly.newPlot``.
+
+    Query parameters:
+    - width: the width of the chart in pixels
+    - float32: if present, numbers are rounded to single precision
+    - maxPoints: series with more points are downsampled
+    """
+    study = _fetch_study_for_visitor(publicId)
+    args = request.form.to_dict()
+
+    width      = util.get_int_arg(request.args, 'width', minimum=1)
+    float32    = request.args.get('float32', None) is not None
+    max_points = util.get_int_arg(request.args, 'maxPoints', minimum=1)
+
+    def render():
+        chart_form = ComparativeChartForm(
+            g.db_session,
+            time_units=study.timeUnits,
+            show_std=args.get('showStd', None) is not None,
+            show_perturbations=args.get('showPerturbations', None) is not None,
+        )
+        chart = chart_form.build_chart(args, width)
+
+        return chart.to_json(float32=float32, max_points=max_points)
+
+    context_ids, model_ids = chart_record_ids(args)
+
+    chart_json = cached_chart_fragment(
+        g.db_session,
+        key=['study.json', study.publicId, sorted(args.items()), width, float32, max_points],
+        render=render,
+        context_ids=context_ids,
+        model_ids=model_ids,
     )
 
+    response = make_response(chart_json)
+    response.headers['Content-Type'] = 'application/json'
+
+    return response
+
 
 def _fetch_study_for_visitor(publicId, check_user_visibility=True, sql_options=None):
     sql_options = sql_options or ()
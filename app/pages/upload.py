@@ -12,10 +12,9 @@ from flask import (
 
 from app.model.orm import ExcelFile
 import app.model.lib.data_spreadsheet as data_spreadsheet
-from app.model.lib.submission_process import (
-    persist_submission_to_database,
-    validate_data_file,
-)
+from app.model.lib.submission_process import validate_data_file
+from app.model.lib.search_facets import refresh_study_facets
+from app.model.tasks.submission import process_submission
 from app.model.lib.errors import LoginRequired
 from app.model.lib.util import is_ajax
 from app.view.forms.submission_form import SubmissionForm
@@ -24,6 +23,9 @@ from app.view.forms.upload_step3_form import UploadStep3Form
 from app.view.forms.upload_step4_form import UploadStep4Form
 from app.view.forms.upload_step5_form import UploadStep5Form
 
+STALE_PROCESSING_ERRORS = ["Processing the data took too long, please submit it again"]
+"Shown when the background job of a submission didn't finish in time"
+
 
 def upload_status_page():
     submission_form = _init_submission_form(step=0)
@@ -197,7 +199,10 @@ def upload_step6_page():
     submission = submission_form.submission
     errors = []
 
-    if request.method == 'POST':
+    if request.method == 'POST' and submission.is_processing:
+        # The data is being saved in the background, don't interrupt:
+        return redirect(url_for('upload_step6_page'))
+    elif request.method == 'POST':
         if request.files['data-template']:
             submission.dataFile = ExcelFile.from_upload(request.files['data-template'])
         submission_form.save()
@@ -206,14 +211,20 @@ def upload_step6_page():
             errors = ["No data file uploaded"]
 
         if not errors:
-            errors = validate_data_file(submission_form)
+            # Validation and saving happen in a background job, the page polls
+            # for its progress:
+            submission.processingState  = 'pending'
+            submission.processingErrors = None
+            submission_form.save()
 
-        if not errors:
-            errors = persist_submission_to_database(submission_form)
+            process_submission.delay(submission.id, submission.userUniqueID)
 
-        if not errors:
-            return redirect(url_for('upload_step7_page'))
-    else:
+            return redirect(url_for('upload_step6_page'))
+    elif submission.processingState == 'error':
+        errors = submission.processingErrors
+    elif submission.is_processing_stale:
+        errors = STALE_PROCESSING_ERRORS
+    elif not submission.is_processing:
         errors = validate_data_file(submission_form)
 
     return render_template(
@@ -223,6 +234,25 @@ def upload_step6_page():
     )
 
 
+def upload_step6_status_json():
+    submission_form = _init_submission_form(step=6)
+    submission = submission_form.submission
+
+    if submission.is_processing_stale:
+        # The page shows the errors and the form to submit again:
+        return {
+            'state':       'error',
+            'description': submission.PROCESSING_STATES['error'],
+            'errors':      STALE_PROCESSING_ERRORS,
+        }
+
+    return {
+        'state':       submission.processingState,
+        'description': submission.processing_description,
+        'errors':      submission.processingErrors or [],
+    }
+
+
 def download_data_template_xlsx():
     submission_form = _init_submission_form(step=6)
     spreadsheet = data_spreadsheet.create_excel(submission_form)
@@ -250,12 +280,13 @@ def upload_spreadsheet_preview_fragment():
 def upload_step7_page():
     submission_form = _init_submission_form(step=7)
 
-    if request.method == 'POST':
+    if request.method == 'POST' and not submission_form.submission.is_processing:
         study = submission_form.submission.study
 
         if study and study.isPublishable:
             study.publish()
             g.db_session.add(study)
+            refresh_study_facets(g.db_session, study.publicId)
             g.db_session.commit()
 
             submission_form.submission.export_data(message="Study published")
@@ -7,6 +7,8 @@ from app.model.orm import (
     Experiment,
     Measurement,
     MeasurementContext,
+    MeasurementTechnique,
+    Metabolite,
     ModelingResult,
     Perturbation,
 )
@@ -48,10 +50,32 @@ class ComparativeChartForm:
         self.log_left  = False
         self.log_right = False
 
-    def build_chart(self, args=None, width=None, clamp_x_data=False):
+    def load_records(self, args=None):
+        """
+        Loads the measurement contexts and modeling results for the chart,
+        without their measurements.
+        """
         if args:
             self._extract_args(args)
 
+        self.measurement_contexts = self.db_session.scalars(
+            sql.select(MeasurementContext)
+            .where(MeasurementContext.id.in_(self.measurement_context_ids))
+            .options(*_label_loading_options())
+        ).all()
+
+        self.modeling_results = self.db_session.scalars(
+            sql.select(ModelingResult)
+            .where(ModelingResult.id.in_(self.modeling_result_ids))
+            .options(
+                sql.orm.selectinload(ModelingResult.customModel),
+                *_label_loading_options(ModelingResult.measurementContext),
+            )
+        ).all()
+
+    def build_chart(self, args=None, width=None, clamp_x_data=False):
+        self.load_records(args)
+
         chart = Chart(
             time_units=self.time_units,
             cell_count_units=self.cell_count_units,
@@ -64,25 +88,14 @@ class ComparativeChartForm:
             show_std=self.show_std,
         )
 
-        self.measurement_contexts = self.db_session.scalars(
-            sql.select(MeasurementContext)
-            .where(MeasurementContext.id.in_(self.measurement_context_ids))
-            .options(
-                sql.orm.selectinload(MeasurementContext.technique),
-                sql.orm.selectinload(MeasurementContext.bioreplicate),
-            )
-        ).all()
-
-        self.modeling_results = self.db_session.scalars(
-            sql.select(ModelingResult)
-            .where(ModelingResult.id.in_(self.modeling_result_ids))
-            .options(
-                sql.orm.selectinload(ModelingResult.measurementContext),
-                sql.orm.selectinload(ModelingResult.measurementContext, MeasurementContext.technique),
-            )
-        ).all()
+        # Measurements of the selected contexts and the ones of the models, in
+        # a single query:
+        model_context_ids = [mr.measurementContextId for mr in self.modeling_results]
+        context_ids       = sorted({*self.measurement_context_ids, *model_context_ids})
+        measurements_df   = self.get_measurements_df(context_ids)
+        context_dfs       = dict(tuple(measurements_df.groupby('contextId')))
 
-        measurements_df = self.get_measurements_df(self.measurement_context_ids)
+        metabolite_masses = self._fetch_metabolite_masses()
 
         for measurement_context in self.measurement_contexts:
             technique = measurement_context.technique
@@ -94,12 +107,11 @@ class ComparativeChartForm:
                 axis = 'left'
                 log_transform = self.log_left
 
-            measurement_df = measurements_df[measurements_df['contextId'] == measurement_context.id]
+            measurement_df = context_dfs.get(measurement_context.id, measurements_df.iloc[0:0])
             label = measurement_context.get_chart_label()
 
             if technique.subjectType == 'metabolite':
-                subject = measurement_context.get_subject(self.db_session)
-                metabolite_mass = subject.averageMass
+                metabolite_mass = metabolite_masses.get(measurement_context.subjectId)
             else:
                 metabolite_mass = None
 
@@ -127,11 +139,7 @@ class ComparativeChartForm:
                 axis = 'left'
                 log_transform = self.log_left
 
-            measurement_df = measurements_df[measurements_df['contextId'] == measurement_context.id]
-            if measurement_df.empty:
-                # Could happen if we're just rendering the model without the parent measurement:
-                measurement_df = measurement_context.get_df(self.db_session)
-
+            measurement_df = context_dfs.get(measurement_context.id, measurements_df.iloc[0:0])
             model_df = modeling_result.generate_chart_df(measurement_df)
             label    = modeling_result.get_chart_label()
 
@@ -155,6 +163,7 @@ class ComparativeChartForm:
                 .join(Bioreplicate)
                 .join(MeasurementContext)
                 .where(MeasurementContext.id.in_(self.measurement_context_ids))
+                .options(sql.orm.selectinload(Perturbation.experiment))
                 .order_by(Perturbation.startTimeInSeconds)
             ).all()
 
@@ -247,6 +256,20 @@ class ComparativeChartForm:
             elif arg == 'metaboliteUnits':
                 self.metabolite_units = value
 
+    def _fetch_metabolite_masses(self):
+        metabolite_ids = [
+            mc.subjectId
+            for mc in self.measurement_contexts
+            if mc.technique.subjectType == 'metabolite'
+        ]
+        if not metabolite_ids:
+            return {}
+
+        return dict(self.db_session.execute(
+            sql.select(Metabolite.id, Metabolite.averageMass)
+            .where(Metabolite.id.in_(metabolite_ids))
+        ).all())
+
     def get_measurements_df(self, measurement_context_ids):
         query = (
             sql.select(
@@ -264,3 +287,28 @@ class ComparativeChartForm:
         )
 
         return execute_into_df(self.db_session, query)
+
+
+def _label_loading_options(*path):
+    """
+    Eager-loading options for the relationships of measurement contexts that
+    their chart labels use, optionally for contexts behind the given path of
+    relationships.
+
+    Each level of a chain of relationships needs its own option, since only
+    the last one of a chain is loaded eagerly.
+    """
+    relationship_chains = [
+        (*path, MeasurementContext.technique, MeasurementTechnique.studyTechnique),
+        (*path, MeasurementContext.bioreplicate, Bioreplicate.experiment, Experiment.compartments),
+        (*path, MeasurementContext.compartment),
+    ]
+
+    # Unique prefixes of the chains, in order:
+    loading_paths = dict.fromkeys(
+        chain[:depth]
+        for chain in relationship_chains
+        for depth in range(1, len(chain) + 1)
+    )
+
+    return [sql.orm.selectinload(*loading_path) for loading_path in loading_paths]
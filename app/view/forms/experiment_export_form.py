@@ -1,3 +1,4 @@
+import numpy as np
 import sqlalchemy as sql
 
 from app.model.orm import (
@@ -6,10 +7,12 @@ from app.model.orm import (
     Experiment,
     Measurement,
     MeasurementContext,
+    MeasurementTechnique,
+    Metabolite,
 )
 from app.model.lib.db import execute_into_df
 from app.model.lib.conversion import (
-    convert_df_units,
+    convert_df_units_by_row,
     CELL_COUNT_UNITS,
     CFU_COUNT_UNITS,
 )
@@ -60,20 +63,29 @@ class ExperimentExportForm:
                         measurement_context.technique,
                     ))
 
+            # All measurements of the experiment, converted at once and split
+            # into one dataframe per column:
+            measurements_df = self._get_measurements_df(experiment)
+            column_dfs = dict(tuple(measurements_df.groupby(
+                ['subjectType', 'columnSubjectId', 'techniqueId'],
+                dropna=False,
+            )))
+            empty_df = measurements_df.iloc[0:0]
+
             # Bioreplicate-level measurements:
             for technique in measurement_targets['bioreplicate']:
-                df = self._get_bioreplicate_df(experiment, technique)
-                measurement_dfs.append(df)
+                df = column_dfs.get(('bioreplicate', 0, technique.id), empty_df)
+                measurement_dfs.append(self._get_bioreplicate_df(df, technique))
 
             # Strain-level measurements:
             for (strain, technique) in sorted(measurement_targets['strain']):
-                df = self._get_strain_df(experiment, strain, technique)
-                measurement_dfs.append(df)
+                df = column_dfs.get(('strain', strain.id, technique.id), empty_df)
+                measurement_dfs.append(self._get_strain_df(df, strain, technique))
 
             # Metabolite measurements:
             for (metabolite, technique) in sorted(measurement_targets['metabolite']):
-                df = self._get_metabolite_df(experiment, metabolite, technique)
-                measurement_dfs.append(df)
+                df = column_dfs.get(('metabolite', metabolite.id, technique.id), empty_df)
+                measurement_dfs.append(self._get_metabolite_df(df, metabolite, technique))
 
             if len(measurement_dfs) == 0:
                 continue
@@ -98,76 +110,55 @@ class ExperimentExportForm:
 
         return experiment_data
 
-    def _get_bioreplicate_df(self, experiment, technique):
-        condition = (
-            MeasurementContext.subjectType == 'bioreplicate',
-            MeasurementContext.techniqueId == technique.id,
-        )
-
-        query = self._base_bioreplicate_query(experiment).where(*condition)
-        df = execute_into_df(self.db_session, query)
-
-        if technique.units in CELL_COUNT_UNITS:
-            units = convert_df_units(df, technique.units, self.cell_count_units)
-        elif technique.units in CFU_COUNT_UNITS:
-            units = convert_df_units(df, technique.units, self.cfu_count_units)
-        else:
-            units = technique.units
+    def _get_bioreplicate_df(self, df, technique):
+        units = self._get_converted_units(df, technique)
 
         value_label = f"Community {technique.short_name}"
         if units is not None and units != '':
             value_label += f" ({units})"
 
-        return df.rename(columns={'value': value_label})
-
-    def _get_strain_df(self, experiment, metabolite, technique):
-        condition = (
-            MeasurementContext.subjectType == 'strain',
-            MeasurementContext.subjectId == metabolite.id,
-            MeasurementContext.techniqueId == technique.id,
-        )
-
-        query = self._base_bioreplicate_query(experiment).where(*condition)
-        df = execute_into_df(self.db_session, query)
-
-        if technique.units in CELL_COUNT_UNITS:
-            units = convert_df_units(df, technique.units, self.cell_count_units)
-        elif technique.units in CFU_COUNT_UNITS:
-            units = convert_df_units(df, technique.units, self.cfu_count_units)
-        else:
-            units = technique.units
-
-        value_label = f"{metabolite.name} {technique.short_name} ({units})"
-
-        return df.rename(columns={'value': value_label})
+        return self._get_column_df(df, value_label)
 
-    def _get_metabolite_df(self, experiment, metabolite, technique):
-        condition = (
-            MeasurementContext.subjectType == 'metabolite',
-            MeasurementContext.subjectId == metabolite.id,
-        )
+    def _get_strain_df(self, df, strain, technique):
+        units = self._get_converted_units(df, technique)
+        value_label = f"{strain.name} {technique.short_name} ({units})"
 
-        query = self._base_bioreplicate_query(experiment).where(*condition)
-        df = execute_into_df(self.db_session, query)
+        return self._get_column_df(df, value_label)
 
-        units = convert_df_units(df, technique.units, self.metabolite_units, metabolite.averageMass)
+    def _get_metabolite_df(self, df, metabolite, technique):
+        units = self._get_converted_units(df, technique)
         value_label = f"{metabolite.name} ({units})"
 
-        return df.rename(columns={'value': value_label})
+        return self._get_column_df(df, value_label)
 
-    def _base_bioreplicate_query(self, experiment):
-        return (
+    def _get_measurements_df(self, experiment):
+        """
+        Fetches all measurements of the experiment's selected bioreplicates
+        with their units and metabolite masses, and converts them to the
+        requested units in a single pass.
+        """
+        query = (
             sql.select(
                 Measurement.timeInHours.label("Time (hours)"),
                 Bioreplicate.name.label("Biological Replicate"),
                 Compartment.name.label("Compartment"),
                 Measurement.value.label("value"),
+                MeasurementContext.subjectType.label("subjectType"),
+                MeasurementContext.subjectId.label("subjectId"),
+                MeasurementContext.techniqueId.label("techniqueId"),
+                MeasurementTechnique.units.label("sourceUnits"),
+                Metabolite.averageMass.label("metaboliteMass"),
             )
             .select_from(Measurement)
             .join(MeasurementContext)
+            .join(MeasurementTechnique)
             .join(Bioreplicate)
             .join(Compartment)
             .join(Experiment)
+            .outerjoin(Metabolite, sql.and_(
+                MeasurementContext.subjectType == 'metabolite',
+                MeasurementContext.subjectId == Metabolite.id,
+            ))
             .where(
                 Experiment.publicId == experiment.publicId,
                 Bioreplicate.id.in_(self.bioreplicate_uuids),
@@ -178,6 +169,36 @@ class ExperimentExportForm:
                 Measurement.timeInSeconds,
             )
         )
+        df = execute_into_df(self.db_session, query)
+
+        # Community measurements of all bioreplicates go in the same column:
+        df['columnSubjectId'] = df['subjectId'].where(df['subjectType'] != 'bioreplicate', 0)
+
+        source_units = df['sourceUnits'].to_numpy(dtype=object)
+        target_units = source_units.copy()
+
+        is_metabolite = (df['subjectType'] == 'metabolite').to_numpy()
+        target_units[np.isin(source_units, CELL_COUNT_UNITS) & ~is_metabolite] = self.cell_count_units
+        target_units[np.isin(source_units, CFU_COUNT_UNITS) & ~is_metabolite]  = self.cfu_count_units
+        target_units[is_metabolite] = self.metabolite_units
+
+        converted = convert_df_units_by_row(df, source_units, target_units, df['metaboliteMass'])
+        df['units'] = np.where(converted, target_units, source_units)
+
+        return df
+
+    def _get_converted_units(self, df, technique):
+        if len(df) == 0:
+            return technique.units
+
+        return df['units'].iloc[0]
+
+    def _get_column_df(self, df, value_label):
+        return (
+            df[['Time (hours)', 'Biological Replicate', 'Compartment', 'value']]
+            .rename(columns={'value': value_label})
+            .reset_index(drop=True)
+        )
 
     def _extract_bioreplicate_args(self, args):
         for arg in args.getlist('bioreplicates'):
@@ -0,0 +1,12 @@
+// Renders a chart from the compact JSON of `Chart.to_json` into the given
+// container.
+//
+// Missing values are serialized as `null`, which plotly.js treats as gaps
+// just like the NaNs in server-rendered charts.
+//
+function renderChart($container, chartData) {
+  let container = $container[0];
+
+  Plotly.purge(container);
+  return Plotly.newPlot(container, chartData.data, chartData.layout, chartData.config);
+}
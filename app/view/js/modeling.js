@@ -81,6 +81,26 @@ Page('.study-modeling-page', function($page) {
     })
   });
 
+  $page.on('click', '.js-submit-all', function(e) {
+    e.preventDefault();
+
+    let $button            = $(e.currentTarget);
+    let $calculationResult = $page.find('.js-calculation-result');
+
+    $.ajax({
+      url: $button.data('url'),
+      dataType: 'json',
+      method: 'POST',
+      data: $form.serializeArray(),
+      success: function(response) {
+        let queuedCount = response.modelingResultIds.length;
+
+        $calculationResult.html(`⏳ ${queuedCount} calculations queued, ${response.skippedCount} already up to date`);
+        checkStudyStatus();
+      }
+    })
+  });
+
   $page.on('click', '.js-toggle-published', function(e) {
     e.preventDefault();
 
@@ -248,6 +268,26 @@ Page('.study-modeling-page', function($page) {
     $page.find('.js-units-label').html(unitsLabel);
   }
 
+  function checkStudyStatus() {
+    $.ajax({
+      url: `/modeling/${studyId}/status.json`,
+      dataType: 'json',
+      success: function(response) {
+        let $calculationResult = $page.find('.js-calculation-result');
+
+        if (response.pending > 0) {
+          $calculationResult.html(
+            `⏳ Calculating: ${response.ready} ready, ${response.error} failed, ${response.pending} pending`
+          );
+          setTimeout(checkStudyStatus, 2000);
+        } else {
+          // Reload to show the indicators of newly created results:
+          window.location.reload();
+        }
+      }
+    });
+  }
+
   function checkForUpdates() {
     $.ajax({
       url: `/modeling/${studyId}/check.json`,
@@ -89,13 +89,13 @@ Page('.search-page', function($page) {
   }
 
   function loadNextPage($button) {
-    let offset = $page.find('.js-search-result').length;
-    let $searchForm  = $page.find('.js-search-form');
+    let after       = $button.data('after');
+    let $searchForm = $page.find('.js-search-form');
 
     $button.addClass('loading');
 
     $searchForm.ajaxSubmit({
-      urlParams: { offset },
+      urlParams: { after },
       success: function(response) {
         $button.replaceWith(response);
       }
@@ -1,4 +1,8 @@
 Page('.study-visualize-page', function($page) {
+  // Long series are downsampled by the server, a few thousand points are
+  // more than can be distinguished on screen:
+  const CHART_MAX_POINTS = 5000;
+
   let $compareData = $(document).find('[data-compare-ids]')
 
   let studyId = $page.data('studyId')
@@ -115,16 +119,28 @@ Page('.study-visualize-page', function($page) {
     let width          = Math.floor($chart.width());
     let scrollPosition = $(document).scrollTop();
 
-    return $.ajax({
-      url: `/study/${studyId}/visualize/chart?width=${width}`,
+    let formData = $form.serializeArray();
+
+    let controlsRequest = $.ajax({
+      url: `/study/${studyId}/visualize/chart`,
       dataType: 'html',
       method: 'POST',
-      data: $form.serializeArray(),
-      success: function(response) {
-        $chart.html(response);
-        $(document).scrollTop(scrollPosition);
-      }
-    })
+      data: formData,
+    });
+
+    let dataRequest = $.ajax({
+      url: `/study/${studyId}/visualize/chart.json?width=${width}&float32=1&maxPoints=${CHART_MAX_POINTS}`,
+      dataType: 'json',
+      method: 'POST',
+      data: formData,
+    });
+
+    return $.when(controlsRequest, dataRequest).then(function(controlsResult, dataResult) {
+      $chart.html(controlsResult[0]);
+      renderChart($chart.find('.js-chart-plot'), dataResult[0]);
+
+      $(document).scrollTop(scrollPosition);
+    });
   }
 
   // TODO duplicates study.js, extract
@@ -0,0 +1,25 @@
+Page('.upload-page .js-processing-status', function($status) {
+  let statusUrl = $status.data('statusUrl');
+  let doneUrl   = $status.data('doneUrl');
+  let errorUrl  = $status.data('errorUrl');
+
+  checkForUpdates();
+
+  function checkForUpdates() {
+    $.ajax({
+      url: statusUrl,
+      dataType: 'json',
+      success: function(response) {
+        if (response.state == 'ready') {
+          window.location = doneUrl;
+        } else if (response.state == 'error') {
+          // The errors are rendered in the upload form:
+          window.location = errorUrl;
+        } else {
+          $status.find('.js-processing-description').text(response.description);
+          setTimeout(checkForUpdates, 1000);
+        }
+      }
+    });
+  }
+});
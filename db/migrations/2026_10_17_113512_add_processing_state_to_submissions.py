@@ -0,0 +1,24 @@
+import sqlalchemy as sql
+
+
+def up(conn):
+    query = """
+        ALTER TABLE Submissions
+        ADD processingState VARCHAR(50) DEFAULT NULL,
+        ADD processingErrors JSON DEFAULT NULL
+    """
+    conn.execute(sql.text(query))
+
+
+def down(conn):
+    query = """
+        ALTER TABLE Submissions
+        DROP processingState,
+        DROP processingErrors
+    """
+    conn.execute(sql.text(query))
+
+
+if __name__ == "__main__":
+    from app.model.lib.migrate import run
+    run(__file__, up, down)
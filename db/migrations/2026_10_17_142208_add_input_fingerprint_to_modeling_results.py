@@ -0,0 +1,24 @@
+import sqlalchemy as sql
+
+
+def up(conn):
+    query = """
+        ALTER TABLE ModelingResults
+        ADD inputFingerprint VARCHAR(64) DEFAULT NULL,
+        ADD KEY ModelingResults_inputFingerprint (inputFingerprint)
+    """
+    conn.execute(sql.text(query))
+
+
+def down(conn):
+    query = """
+        ALTER TABLE ModelingResults
+        DROP KEY ModelingResults_inputFingerprint,
+        DROP inputFingerprint
+    """
+    conn.execute(sql.text(query))
+
+
+if __name__ == "__main__":
+    from app.model.lib.migrate import run
+    run(__file__, up, down)
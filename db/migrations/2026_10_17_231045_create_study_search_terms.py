@@ -0,0 +1,27 @@
+import sqlalchemy as sql
+
+
+def up(conn):
+    query = """
+        CREATE TABLE StudySearchTerms (
+            id INT NOT NULL AUTO_INCREMENT,
+            studyId VARCHAR(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            term VARCHAR(100) NOT NULL,
+            weight INT NOT NULL,
+            PRIMARY KEY (id),
+            KEY StudySearchTerms_term (term, studyId),
+            KEY StudySearchTerms_studyId (studyId),
+            CONSTRAINT StudySearchTerms_studyId FOREIGN KEY (studyId) REFERENCES Studies (publicId) ON DELETE CASCADE ON UPDATE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """
+    conn.execute(sql.text(query))
+
+
+def down(conn):
+    query = "DROP TABLE StudySearchTerms"
+    conn.execute(sql.text(query))
+
+
+if __name__ == "__main__":
+    from app.model.lib.migrate import run
+    run(__file__, up, down)
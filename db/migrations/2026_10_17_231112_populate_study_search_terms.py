@@ -0,0 +1,17 @@
+import sqlalchemy as sql
+
+from app.model.lib.study_search_index import rebuild_study_search_index
+
+
+def up(conn):
+    rebuild_study_search_index(conn)
+
+
+def down(conn):
+    query = "DELETE FROM StudySearchTerms"
+    conn.execute(sql.text(query))
+
+
+if __name__ == "__main__":
+    from app.model.lib.migrate import run
+    run(__file__, up, down)
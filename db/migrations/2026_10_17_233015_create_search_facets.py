@@ -0,0 +1,26 @@
+import sqlalchemy as sql
+
+
+def up(conn):
+    query = """
+        CREATE TABLE SearchFacets (
+            id INT NOT NULL AUTO_INCREMENT,
+            subjectType VARCHAR(100) NOT NULL,
+            subjectId VARCHAR(100) NOT NULL,
+            publishedStudyCount INT NOT NULL DEFAULT '0',
+            unpublishedStudyCount INT NOT NULL DEFAULT '0',
+            PRIMARY KEY (id),
+            UNIQUE KEY SearchFacets_subject (subjectType, subjectId)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """
+    conn.execute(sql.text(query))
+
+
+def down(conn):
+    query = "DROP TABLE SearchFacets"
+    conn.execute(sql.text(query))
+
+
+if __name__ == "__main__":
+    from app.model.lib.migrate import run
+    run(__file__, up, down)
@@ -0,0 +1,17 @@
+import sqlalchemy as sql
+
+from app.model.lib.search_facets import rebuild_search_facets
+
+
+def up(conn):
+    rebuild_search_facets(conn)
+
+
+def down(conn):
+    query = "DELETE FROM SearchFacets"
+    conn.execute(sql.text(query))
+
+
+if __name__ == "__main__":
+    from app.model.lib.migrate import run
+    run(__file__, up, down)
@@ -354,9 +354,11 @@ CREATE TABLE ModelingResults (
   yErrors json DEFAULT (json_array()),
   customModelId int DEFAULT NULL,
   publishedAt datetime DEFAULT NULL,
+  inputFingerprint varchar(64) DEFAULT NULL,
   PRIMARY KEY (id),
   KEY Calculations_calculationTechniqueId (requestId),
   KEY ModelingResults_customModelId (customModelId),
+  KEY ModelingResults_inputFingerprint (inputFingerprint),
   CONSTRAINT Calculations_calculationTechniqueId FOREIGN KEY (requestId) REFERENCES ModelingRequests (id) ON DELETE CASCADE ON UPDATE CASCADE,
   CONSTRAINT ModelingResults_customModelId FOREIGN KEY (customModelId) REFERENCES CustomModels (id) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -492,6 +494,24 @@ CREATE TABLE Projects (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `SearchFacets`
+--
+
+DROP TABLE IF EXISTS SearchFacets;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE SearchFacets (
+  id int NOT NULL AUTO_INCREMENT,
+  subjectType varchar(100) NOT NULL,
+  subjectId varchar(100) NOT NULL,
+  publishedStudyCount int NOT NULL DEFAULT '0',
+  unpublishedStudyCount int NOT NULL DEFAULT '0',
+  PRIMARY KEY (id),
+  UNIQUE KEY SearchFacets_subject (subjectType,subjectId)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `Studies`
 --
@@ -539,6 +559,25 @@ CREATE TABLE StudyMetabolites (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `StudySearchTerms`
+--
+
+DROP TABLE IF EXISTS StudySearchTerms;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE StudySearchTerms (
+  id int NOT NULL AUTO_INCREMENT,
+  studyId varchar(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+  term varchar(100) NOT NULL,
+  weight int NOT NULL,
+  PRIMARY KEY (id),
+  KEY StudySearchTerms_term (term,studyId),
+  KEY StudySearchTerms_studyId (studyId),
+  CONSTRAINT StudySearchTerms_studyId FOREIGN KEY (studyId) REFERENCES Studies (publicId) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `StudyStrains`
 --
@@ -640,6 +679,8 @@ CREATE TABLE Submissions (
   dataFileId int DEFAULT NULL,
   createdAt datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updatedAt datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  processingState varchar(50) DEFAULT NULL,
+  processingErrors json DEFAULT NULL,
   PRIMARY KEY (id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -784,5 +825,11 @@ INSERT INTO MigrationVersions VALUES
 (90,'2026_01_28_155444_track_country_in_page_visit_counters','2026-01-28 15:14:22'),
 (91,'2026_01_29_165248_add_authorship_fields_to_studies','2026-02-04 11:42:55'),
 (92,'2026_02_06_164753_create_page_errors','2026-02-06 16:10:14'),
-(93,'2026_02_18_115807_add_api_count_to_page_visit_counter','2026-02-18 11:11:29');
+(93,'2026_02_18_115807_add_api_count_to_page_visit_counter','2026-02-18 11:11:29'),
+(94,'2026_10_17_113512_add_processing_state_to_submissions','2026-10-17 11:35:40'),
+(95,'2026_10_17_142208_add_input_fingerprint_to_modeling_results','2026-10-17 14:22:15'),
+(96,'2026_10_17_231045_create_study_search_terms','2026-10-17 23:10:52'),
+(97,'2026_10_17_231112_populate_study_search_terms','2026-10-17 23:11:20'),
+(98,'2026_10_17_233015_create_search_facets','2026-10-17 23:30:22'),
+(99,'2026_10_17_233041_populate_search_facets','2026-10-17 23:30:48');
 
@@ -32,6 +32,7 @@ def init_assets(app):
         '../app/view/js/lib/tooltips.js',
         '../app/view/js/lib/compare_buttons.js',
         '../app/view/js/lib/custom_file_input.js',
+        '../app/view/js/lib/charts.js',
         # Pages:
         '../app/view/js/upload/step1.js',
         '../app/view/js/upload/step2.js',
@@ -39,6 +40,7 @@ def init_assets(app):
         '../app/view/js/upload/step4.js',
         '../app/view/js/upload/step5.js',
         '../app/view/js/upload/step6.js',
+        '../app/view/js/upload/processing.js',
         '../app/view/js/main.js',
         '../app/view/js/search.js',
         '../app/view/js/export.js',
@@ -49,6 +49,8 @@ def init_routes(app):
     app.add_url_rule("/upload/6", view_func=upload_pages.upload_step6_page, methods=["GET", "POST"])
     app.add_url_rule("/upload/7", view_func=upload_pages.upload_step7_page, methods=["GET", "POST"])
 
+    app.add_url_rule("/upload/6/status.json", view_func=upload_pages.upload_step6_status_json)
+
     app.add_url_rule(
         "/upload/new_submission/",
         view_func=submission_pages.new_submission_action,
@@ -72,14 +74,15 @@ def init_routes(app):
         methods=["POST"],
     )
 
-    app.add_url_rule("/study/<string:publicId>/",                view_func=study_pages.study_show_page)
-    app.add_url_rule("/study/<string:publicId>.zip",             view_func=study_pages.study_download_data_zip)
-    app.add_url_rule("/study/<string:publicId>/export/",         view_func=study_pages.study_export_page)
-    app.add_url_rule("/study/<string:publicId>/export/preview",  view_func=study_pages.study_export_preview_fragment)
-    app.add_url_rule("/study/<string:publicId>/manage/",         view_func=study_pages.study_manage_page)
-    app.add_url_rule("/study/<string:publicId>/visualize/",      view_func=study_pages.study_visualize_page)
-    app.add_url_rule("/study/<string:publicId>/visualize/chart", view_func=study_pages.study_chart_fragment, methods=["POST"])
-    app.add_url_rule("/study/<string:publicId>/reset",           view_func=study_pages.study_reset_action,   methods=["POST"])
+    app.add_url_rule("/study/<string:publicId>/",                     view_func=study_pages.study_show_page)
+    app.add_url_rule("/study/<string:publicId>.zip",                  view_func=study_pages.study_download_data_zip)
+    app.add_url_rule("/study/<string:publicId>/export/",              view_func=study_pages.study_export_page)
+    app.add_url_rule("/study/<string:publicId>/export/preview",       view_func=study_pages.study_export_preview_fragment)
+    app.add_url_rule("/study/<string:publicId>/manage/",              view_func=study_pages.study_manage_page)
+    app.add_url_rule("/study/<string:publicId>/visualize/",           view_func=study_pages.study_visualize_page)
+    app.add_url_rule("/study/<string:publicId>/visualize/chart",      view_func=study_pages.study_chart_fragment, methods=["POST"])
+    app.add_url_rule("/study/<string:publicId>/visualize/chart.json", view_func=study_pages.study_chart_json,     methods=["POST"])
+    app.add_url_rule("/study/<string:publicId>/reset",                view_func=study_pages.study_reset_action,   methods=["POST"])
 
     app.add_url_rule("/modeling/<string:publicId>/",           view_func=modeling_pages.modeling_page)
     app.add_url_rule("/modeling/<string:publicId>/models.csv", view_func=modeling_pages.modeling_params_csv, methods=["POST"])
@@ -89,6 +92,11 @@ def init_routes(app):
         view_func=modeling_pages.modeling_submit_action,
         methods=["POST"],
     )
+    app.add_url_rule(
+        "/modeling/<string:publicId>/submit-all",
+        view_func=modeling_pages.modeling_submit_all_action,
+        methods=["POST"],
+    )
     app.add_url_rule(
         "/modeling/<string:publicId>/toggle-published/<int:modelingResultId>/",
         view_func=modeling_pages.modeling_toggle_published_action,
@@ -113,6 +121,10 @@ def init_routes(app):
         "/modeling/<string:publicId>/check.json",
         view_func=modeling_pages.modeling_check_json,
     )
+    app.add_url_rule(
+        "/modeling/<string:publicId>/status.json",
+        view_func=modeling_pages.modeling_status_json,
+    )
     app.add_url_rule(
         "/modeling/<string:publicId>/chart/<int:measurementContextId>/",
         view_func=modeling_pages.modeling_chart_fragment,
@@ -167,6 +179,7 @@ def init_routes(app):
 
     app.add_url_rule("/api/v1/measurement-context/<int:id>.json", view_func=api_pages.measurement_context_json)
     app.add_url_rule("/api/v1/measurement-context/<int:id>.csv",  view_func=api_pages.measurement_context_csv)
+    app.add_url_rule("/api/v1/measurement-contexts.csv",          view_func=api_pages.measurement_contexts_csv)
 
     app.add_url_rule("/api/v1/bioreplicate/<int:id>.json", view_func=api_pages.bioreplicate_json)
     app.add_url_rule("/api/v1/bioreplicate/<int:id>.csv",  view_func=api_pages.bioreplicate_csv)
@@ -0,0 +1,147 @@
+"""
+Compare the per-element y-axis range calculation of charts with the
+vectorized one in ``app.model.lib.chart``, and time the rendering of charts
+with many series.
+
+Run from the root of the repository, with ``PYTHONPATH=.`` so that the
+``app`` package can be imported, as ``scripts/init.sh`` does:
+
+    PYTHONPATH=. python scripts/benchmarks/render_charts.py [<repeat-count>]
+
+The charts are built from synthetic growth curves in mixed units, with missing
+standard deviations, a few model curves and a highlighted region, similar to
+a comparison of many bioreplicates.
+"""
+
+import sys
+import math
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from app.model.lib.chart import Chart
+
+UNITS = ['Cells/mL', 'Cells/μL', 'CFUs/mL', 'mM', 'g/L', 'OD']
+
+CHART_SIZES = [
+    (10,  200),
+    (40,  2000),
+    (100, 5000),
+]
+"Pairs of series count and points per series"
+
+
+def calculate_y_range_per_element(data, model_df_indices, log=False):
+    "The y-range calculation that ``Chart._calculate_y_range`` replaced"
+    global_max_y          = 0
+    global_min_y          = math.inf
+    global_positive_min_y = math.inf
+
+    for (i, (series, _)) in enumerate(data):
+        if i in model_df_indices:
+            continue
+
+        lowers = []
+        uppers = []
+
+        for value, std in zip(series['value'], series['std']):
+            if std is None or math.isnan(std):
+                std = 0
+
+            uppers.append(value + std)
+            if log:
+                lowers.append(value - std)
+            else:
+                lowers.append(np.clip(value - std, min=0))
+
+        positive_ys = [y for y in lowers if y > 0]
+
+        global_max_y = max(global_max_y, max(uppers))
+        global_min_y = min(global_min_y, min(lowers))
+        if positive_ys:
+            global_positive_min_y = min(global_positive_min_y, min(positive_ys))
+
+    padding = (global_max_y - global_min_y) * 0.05
+
+    if log:
+        padding = 0.2
+        global_max_y = np.log10(global_max_y)
+
+        if global_min_y <= 0.0:
+            global_min_y = np.log10(global_positive_min_y)
+        else:
+            global_min_y = np.log10(global_min_y)
+
+    return [global_min_y - padding, global_max_y + padding]
+
+
+def build_chart(series_count, point_count, log=False):
+    rng  = np.random.default_rng(0)
+    time = np.arange(point_count) * 0.5
+
+    chart = Chart(time_units='h', log_left=log, log_right=log, metabolite_units='μM')
+
+    for i in range(series_count):
+        units  = UNITS[i % len(UNITS)]
+        values = rng.lognormal(5, 2, point_count)
+        std    = rng.random(point_count) * values
+        std[rng.random(point_count) < 0.2] = np.nan
+
+        chart.add_df(
+            pd.DataFrame({'time': time, 'value': values, 'std': std}),
+            units=units,
+            label=f"Series {i}",
+            axis=('right' if i % 3 == 0 else 'left'),
+            metabolite_mass=(180.16 if units == 'g/L' else None),
+        )
+
+        if i % 10 == 0:
+            chart.add_model_df(
+                pd.DataFrame({'time': time, 'value': values * 10, 'std': np.nan}),
+                units=units,
+                label=f"Model {i}",
+            )
+
+    chart.add_region(1, 5, 'p', 'Exponential phase')
+
+    return chart
+
+
+def main(repeat_count):
+    print(f"{'Chart':<24} {'Points':>8} {'Old range (ms)':>15} {'New range (ms)':>15} {'Speedup':>8} {'to_html (ms)':>13}")
+
+    for (series_count, point_count) in CHART_SIZES:
+        for log in (False, True):
+            chart = build_chart(series_count, point_count, log=log)
+
+            converted_data, _ = chart._convert_units(chart.data_left)
+            model_df_indices  = chart.model_df_left_indices
+
+            old_range = calculate_y_range_per_element(converted_data, model_df_indices, log=log)
+            new_range = chart._calculate_y_range(converted_data, model_df_indices, log=log)
+
+            if not np.allclose(old_range, new_range):
+                raise AssertionError(f"Different ranges: {old_range} != {new_range}")
+
+            old_time = timeit.timeit(
+                lambda: calculate_y_range_per_element(converted_data, model_df_indices, log=log),
+                number=repeat_count,
+            )
+            new_time = timeit.timeit(
+                lambda: chart._calculate_y_range(converted_data, model_df_indices, log=log),
+                number=repeat_count,
+            )
+            render_time = timeit.timeit(chart.to_html, number=repeat_count)
+
+            old_ms    = 1000 * old_time / repeat_count
+            new_ms    = 1000 * new_time / repeat_count
+            render_ms = 1000 * render_time / repeat_count
+
+            name = f"{series_count} series{' (log)' if log else ''}"
+            print(f"{name:<24} {series_count * point_count:>8} {old_ms:>15.2f} {new_ms:>15.2f} {old_ms / new_ms:>7.1f}x {render_ms:>13.2f}")
+
+
+if __name__ == '__main__':
+    repeat_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    main(repeat_count)
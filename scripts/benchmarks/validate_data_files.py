@@ -0,0 +1,115 @@
+"""
+Compare the cell-by-cell validation of uploaded data values with the
+vectorized one in ``app.model.lib.submission_process``.
+
+Run from the root of the repository, with ``PYTHONPATH=.`` so that the
+``app`` package can be imported, as ``scripts/init.sh`` does:
+
+    PYTHONPATH=. python scripts/benchmarks/validate_data_files.py [<repeat-count>]
+
+Every sheet of the workbooks in ``scripts/bootstrap/measurement_data`` is
+validated with both implementations, treating all columns except the row keys
+as value columns. A wide synthetic sheet is added to show how the two scale
+with the number of columns.
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.model.lib.excel import read_sheets
+from app.model.lib.util import is_non_negative_float
+from app.model.lib.submission_process import (
+    _format_row_list_error,
+    _validate_sheet_values,
+)
+
+KEY_COLUMNS = {'Biological Replicate', 'Compartment', 'Time'}
+
+
+def validate_cell_by_cell(sheet_name, df, expected_value_columns):
+    "The validation loop that ``_validate_sheet_values`` replaced"
+    errors = []
+    warnings = []
+
+    missing_time_rows = []
+    missing_values = {}
+
+    if 'Time' in df:
+        for index, value in enumerate(df['Time']):
+            if not is_non_negative_float(value, isnan_check=True):
+                missing_time_rows.append(str(index + 1))
+
+    if missing_time_rows:
+        row_description = _format_row_list_error(missing_time_rows)
+        warnings.append(f"{sheet_name}: Missing or invalid time values on row(s) {row_description}")
+
+    value_columns = [c for c in df.columns if c in expected_value_columns]
+
+    for column in value_columns:
+        for index, value in enumerate(df[column]):
+            if not is_non_negative_float(value, isnan_check=False):
+                if column not in missing_values:
+                    missing_values[column] = []
+                missing_values[column].append(str(index + 1))
+
+        if column in missing_values:
+            row_description = _format_row_list_error(missing_values[column])
+            errors.append(f"{sheet_name}: Invalid values in column \"{column}\" on row(s) {row_description}")
+
+    return errors, warnings
+
+
+def build_wide_sheet(row_count=500, column_count=500):
+    rng = np.random.default_rng(0)
+    values = rng.random((row_count, column_count))
+    values[3, 7] = -1.0
+
+    df = pd.DataFrame(values, columns=[f"Strain {i} FC counts" for i in range(column_count)])
+
+    # A text cell turns its column into an "object" one, like in a real upload:
+    df[df.columns[20]] = df[df.columns[20]].astype(object)
+    df.iat[10, 20] = 'n/a'
+
+    df.insert(0, 'Time', np.arange(row_count))
+    df.insert(0, 'Compartment', 'WC')
+    df.insert(0, 'Biological Replicate', 'b1')
+
+    return df
+
+
+def main(repeat_count):
+    sheets = {}
+
+    for path in sorted(Path('scripts/bootstrap/measurement_data').glob('*.xlsx')):
+        for sheet_name, df in read_sheets(path.read_bytes()).items():
+            sheets[f"{path.stem}/{sheet_name}"] = df
+
+    sheets['synthetic/500x500'] = build_wide_sheet()
+
+    print(f"{'Sheet':<70} {'Cells':>8} {'Old (ms)':>10} {'New (ms)':>10} {'Speedup':>8}")
+
+    for name, df in sheets.items():
+        value_columns = set(df.columns) - KEY_COLUMNS
+
+        old_result = validate_cell_by_cell(name, df, value_columns)
+        new_result = _validate_sheet_values(name, df, value_columns)
+
+        if old_result != new_result:
+            raise AssertionError(f"Different results for {name}:\n{old_result}\n{new_result}")
+
+        old_time = timeit.timeit(lambda: validate_cell_by_cell(name, df, value_columns), number=repeat_count)
+        new_time = timeit.timeit(lambda: _validate_sheet_values(name, df, value_columns), number=repeat_count)
+
+        old_ms = 1000 * old_time / repeat_count
+        new_ms = 1000 * new_time / repeat_count
+
+        print(f"{name:<70} {df.size:>8} {old_ms:>10.2f} {new_ms:>10.2f} {old_ms / new_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    repeat_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    main(repeat_count)
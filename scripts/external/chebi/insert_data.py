@@ -7,6 +7,7 @@ import sqlalchemy as sql
 from long_task_printer import LongTask
 
 from db import get_session
+from app.model.lib.name_index import save_name_index
 from app.model.orm import Metabolite
 
 base_dir_path      = Path('var/external_data/chebi/')
@@ -91,3 +92,6 @@ with get_session() as db_session:
             db_session.commit()
 
     print(f"Missing IDs in the file: {all_db_ids.difference(all_file_ids)}")
+
+    print("Building the name index for completion...")
+    save_name_index('metabolites', Metabolite.build_name_index(db_session))
@@ -2,6 +2,7 @@ import csv
 from pathlib import Path
 
 from db import get_session
+from app.model.lib.name_index import save_name_index
 from app.model.orm import Taxon
 
 import sqlalchemy as sql
@@ -53,3 +54,6 @@ with get_session() as db_session:
         if len(data_to_insert) > 0:
             db_session.execute(sql.insert(Taxon), data_to_insert)
             db_session.commit()
+
+    print("Building the name index for completion...")
+    save_name_index('taxa', Taxon.build_name_index(db_session))
@@ -3,6 +3,7 @@ import requests
 import json
 
 from app.model.orm import Study
+from app.model.lib.study_search_index import update_study_search_index
 from main import create_app
 from db import FLASK_DB
 
@@ -44,4 +45,7 @@ with app.app_context():
 
         db_session.add(study)
 
+        # Authors are searchable, so the study's indexed terms are replaced:
+        update_study_search_index(db_session, study.publicId)
+
     db_session.commit()
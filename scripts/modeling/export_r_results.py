@@ -0,0 +1,63 @@
+"""
+Fit the growth curves of ``app.model.lib.growth_fitting_reference`` with the R
+scripts in this directory and write the results to the fixture that the
+Python implementation is compared with.
+
+Requires ``Rscript`` with the growthrates library. Run from the root of the
+repository, with ``PYTHONPATH=.``:
+
+    PYTHONPATH=. python scripts/modeling/export_r_results.py
+
+The fixture only needs to be exported again when the curves or the R scripts
+change.
+"""
+
+import tempfile
+
+import simplejson as json
+import pandas as pd
+
+from app.model.lib.r_script import RScript
+from app.model.lib.growth_fitting_reference import (
+    GROWTH_CURVES,
+    PARITY_POINT_COUNT,
+    R_RESULTS_PATH,
+)
+
+
+def fit_in_r(modeling_type, df, point_count):
+    with tempfile.TemporaryDirectory() as tmp_dir_name:
+        rscript = RScript(root_path=tmp_dir_name)
+        rscript.write_csv('input.csv', df)
+        rscript.write_json('input.json', {'pointCount': point_count})
+
+        rscript.run(f"scripts/modeling/{modeling_type}.R")
+
+        return {
+            'fit': rscript.read_flat_json('fit.json', discard_keys='_row'),
+            'coefficients': rscript.read_key_value_json(
+                'coefficients.json',
+                key_name='_row',
+                value_name='coefficients',
+            ),
+        }
+
+
+if __name__ == '__main__':
+    r_results = {}
+
+    for curve_name, data in GROWTH_CURVES.items():
+        df = pd.DataFrame(data, columns=['time', 'value'])
+
+        r_results[curve_name] = {
+            modeling_type: fit_in_r(modeling_type, df, point_count=PARITY_POINT_COUNT)
+            for modeling_type in ('easy_linear', 'logistic', 'baranyi_roberts')
+        }
+
+    R_RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(R_RESULTS_PATH, 'w') as f:
+        json.dump(r_results, f, indent=2)
+        f.write("\n")
+
+    print(f"> Written {R_RESULTS_PATH}")
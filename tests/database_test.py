@@ -1,9 +1,12 @@
 import os
 import unittest
 from uuid import uuid4
+from contextlib import contextmanager
 from decimal import Decimal
 from datetime import datetime, UTC
 
+import sqlalchemy as sql
+
 import db
 from app.model.lib.db import execute_text
 from app.model.orm import (
@@ -363,6 +366,26 @@ class DatabaseTest(unittest.TestCase):
 
         return self._create_orm_record(PageVisit, params)
 
+    @contextmanager
+    def _count_queries(self):
+        """
+        Collects the SQL statements executed by any engine inside the block:
+
+            with self._count_queries() as queries:
+                ...
+            self.assertEqual(len(queries), 3)
+        """
+        queries = []
+
+        def collect_query(conn, cursor, statement, parameters, context, executemany):
+            queries.append(statement)
+
+        sql.event.listen(sql.engine.Engine, 'before_cursor_execute', collect_query)
+        try:
+            yield queries
+        finally:
+            sql.event.remove(sql.engine.Engine, 'before_cursor_execute', collect_query)
+
     def _create_orm_record(self, model_class, params):
         instance = model_class(**params)
         self.db_session.add(instance)
@@ -0,0 +1,144 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+from app.model.lib.bulk_modeling import (
+    build_modeling_inputs,
+    group_into_sequences,
+    prepare_bulk_modeling,
+    split_into_batches,
+    summarize_modeling_states,
+)
+from app.model.lib.errors import ClientError
+from tests.database_test import DatabaseTest
+
+
+class TestBulkModeling(DatabaseTest):
+    def test_preparing_requests_for_a_study(self):
+        study = self.create_study()
+
+        experiment1 = self.create_experiment(studyId=study.publicId)
+        experiment2 = self.create_experiment(studyId=study.publicId)
+        technique1  = self.create_measurement_technique(studyId=study.publicId)
+        technique2  = self.create_measurement_technique(studyId=study.publicId)
+
+        bioreplicate1 = self.create_bioreplicate(experimentId=experiment1.publicId)
+        bioreplicate2 = self.create_bioreplicate(experimentId=experiment2.publicId)
+
+        context1 = self.create_measurement_context(studyId=study.publicId, bioreplicateId=bioreplicate1.id, techniqueId=technique1.id)
+        context2 = self.create_measurement_context(studyId=study.publicId, bioreplicateId=bioreplicate1.id, techniqueId=technique2.id)
+        context3 = self.create_measurement_context(studyId=study.publicId, bioreplicateId=bioreplicate2.id, techniqueId=technique1.id)
+
+        # Contexts of other studies are ignored:
+        self.create_measurement_context()
+
+        # Calculated with the same inputs, skipped:
+        ready_result = self.create_modeling_result(
+            type='easy_linear',
+            measurementContextId=context1.id,
+            state='ready',
+            params={'inputs': {'pointCount': 5}},
+        )
+        # Calculated with different inputs, recalculated:
+        stale_result = self.create_modeling_result(
+            type='logistic',
+            measurementContextId=context1.id,
+            state='ready',
+            params={'inputs': {'endTime': '10'}},
+        )
+
+        requests, skipped_count = prepare_bulk_modeling(
+            self.db_session,
+            study,
+            ['easy_linear', 'logistic'],
+            {'pointCount': '5'},
+        )
+
+        self.assertEqual(skipped_count, 1)
+        self.assertEqual(len(requests), 5)
+        self.assertEqual(
+            [context_id for (_, context_id, _) in requests],
+            [context1.id, context2.id, context2.id, context3.id, context3.id],
+        )
+        self.assertNotIn(ready_result.id, [result_id for (result_id, _, _) in requests])
+        self.assertIn(stale_result.id, [result_id for (result_id, _, _) in requests])
+
+        self.db_session.refresh(stale_result)
+        self.assertEqual(stale_result.state, 'pending')
+
+        # Filtering by technique and experiment:
+        requests, _ = prepare_bulk_modeling(
+            self.db_session,
+            study,
+            ['easy_linear'],
+            {},
+            technique_ids=[technique1.id],
+            experiment_ids=[experiment2.publicId],
+        )
+        self.assertEqual([context_id for (_, context_id, _) in requests], [context3.id])
+
+    def test_recalculating_with_a_different_backend(self):
+        study = self.create_study()
+        context = self.create_measurement_context(studyId=study.publicId)
+
+        # Calculated before the backend was stored, so in R:
+        modeling_result = self.create_modeling_result(
+            type='easy_linear',
+            measurementContextId=context.id,
+            state='ready',
+            params={'inputs': {'pointCount': 5}},
+        )
+
+        requests, skipped_count = prepare_bulk_modeling(self.db_session, study, ['easy_linear'], {'backend': 'r'})
+        self.assertEqual(skipped_count, 1)
+        self.assertEqual(requests, [])
+
+        requests, skipped_count = prepare_bulk_modeling(self.db_session, study, ['easy_linear'], {'backend': 'python'})
+        self.assertEqual(skipped_count, 0)
+        self.assertEqual([result_id for (result_id, _, _) in requests], [modeling_result.id])
+
+    def test_building_inputs(self):
+        self.assertEqual(build_modeling_inputs('easy_linear', {}), {'pointCount': 5})
+        self.assertEqual(build_modeling_inputs('easy_linear', {'pointCount': '7'}), {'pointCount': 7})
+        self.assertEqual(build_modeling_inputs('logistic', {'endTime': '10'}), {'endTime': '10'})
+
+        with self.assertRaisesRegex(ClientError, 'pointCount'):
+            build_modeling_inputs('easy_linear', {'pointCount': 'five'})
+
+    def test_splitting_into_batches(self):
+        requests = [(i, i, {}) for i in range(10)]
+
+        batches = split_into_batches(requests, max_batches=4)
+        self.assertEqual([len(b) for b in batches], [3, 3, 3, 1])
+        self.assertEqual(sum(batches, []), requests)
+
+        batches = split_into_batches(requests[:2], max_batches=4)
+        self.assertEqual([len(b) for b in batches], [1, 1])
+
+        self.assertEqual(split_into_batches([]), [])
+
+        # Large requests are split into more batches, grouped into sequences:
+        batches = split_into_batches(requests, max_batches=2, max_batch_size=3)
+        self.assertEqual([len(b) for b in batches], [3, 3, 3, 1])
+
+        sequences = group_into_sequences(batches, max_sequences=2)
+        self.assertEqual(sequences, [[batches[0], batches[2]], [batches[1], batches[3]]])
+
+        self.assertEqual(group_into_sequences([]), [])
+
+    def test_summarizing_states(self):
+        results = [
+            self.create_modeling_result(state='ready'),
+            self.create_modeling_result(state='ready'),
+            self.create_modeling_result(state='pending'),
+            self.create_modeling_result(state='error'),
+        ]
+
+        self.assertEqual(
+            summarize_modeling_states(results),
+            {'pending': 1, 'ready': 2, 'error': 1, 'total': 4},
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.model.lib.chart import Chart
+
+
+class TestChart(unittest.TestCase):
+    def test_unit_conversion(self):
+        chart = Chart(time_units='h', cell_count_units='Cells/mL', metabolite_units='mM')
+
+        cells_df = pd.DataFrame({'time': [0, 1], 'value': [1.0, 2.0], 'std': [0.5, np.nan]})
+        mass_df  = pd.DataFrame({'time': [0, 1], 'value': [1.8, 3.6]})
+
+        data = [
+            (cells_df, 'Cells/μL', 'Cells', None),
+            (mass_df, 'g/L', 'Glucose', 180.0),
+        ]
+        converted_data, units_label = chart._convert_units(data)
+
+        self.assertEqual(units_label, '[mixed units]')
+
+        (cells, _), (glucose, _) = converted_data
+        self.assertEqual(cells['value'].tolist(), [1000.0, 2000.0])
+        self.assertEqual(cells['std'][0], 500.0)
+        self.assertTrue(np.isnan(cells['std'][1]))
+        self.assertEqual(glucose['value'].tolist(), [10.0, 20.0])
+        self.assertTrue(np.isnan(glucose['std']).all())
+
+        # The original dataframes are not modified:
+        self.assertEqual(cells_df['value'].tolist(), [1.0, 2.0])
+        self.assertEqual(mass_df['value'].tolist(), [1.8, 3.6])
+
+    def test_incompatible_units(self):
+        chart = Chart(time_units='h', metabolite_units='mM')
+
+        df   = pd.DataFrame({'time': [0, 1], 'value': [1.0, 2.0]})
+        data = [(df, 'g/L', 'Unknown mass', None)]
+
+        converted_data, units_label = chart._convert_units(data)
+
+        self.assertEqual(units_label, 'g/L')
+        self.assertEqual(converted_data[0][0]['value'].tolist(), [1.0, 2.0])
+
+    def test_y_range(self):
+        chart = Chart(time_units='h')
+
+        data = [
+            ({'value': np.array([10.0, 20.0]), 'std': np.array([5.0, np.nan])}, 'a'),
+            ({'value': np.array([30.0, 40.0]), 'std': np.array([40.0, 10.0])}, 'b'),
+            ({'value': np.array([1e9, 1e10]),  'std': np.array([np.nan, np.nan])}, 'model'),
+        ]
+
+        # The model is ignored and lower values are clipped at 0:
+        self.assertEqual(chart._calculate_y_range(data, model_df_indices=[2]), [-3.5, 73.5])
+
+        # In log scale, the smallest positive value is the lower bound:
+        lower, upper = chart._calculate_y_range(data, model_df_indices=[2], log=True)
+        self.assertAlmostEqual(lower, np.log10(5) - 0.2)
+        self.assertAlmostEqual(upper, np.log10(70) + 0.2)
+
+    def test_downsampling(self):
+        time   = np.arange(10_000, dtype=float)
+        values = np.ones(10_000)
+        values[1234] = 50
+
+        df = pd.DataFrame({'time': time, 'value': values})
+
+        chart = Chart(time_units='h', width=100)
+        chart.add_df(df, units='Cells/mL')
+
+        (chart_df, _, _, _) = chart.data_left[0]
+        self.assertEqual(len(chart_df), 200)
+        self.assertIn(1234.0, chart_df['time'].tolist())
+        self.assertEqual(chart_df['value'].max(), 50)
+
+        # Disabled downsampling:
+        chart = Chart(time_units='h', width=100, points_per_pixel=None)
+        chart.add_df(df, units='Cells/mL')
+
+        (chart_df, _, _, _) = chart.data_left[0]
+        self.assertEqual(len(chart_df), 10_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
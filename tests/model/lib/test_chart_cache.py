@@ -0,0 +1,107 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+import redis
+
+from app.model.lib.chart_cache import (
+    ChartCache,
+    chart_record_ids,
+    _fetch_data_versions,
+)
+from tests.database_test import DatabaseTest
+
+
+class InMemoryRedis:
+    "Implements the subset of the redis client that the cache uses"
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode('utf-8')
+
+
+class UnavailableRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("Connection refused")
+
+        return fail
+
+
+class TestChartCache(DatabaseTest):
+    def test_caching_and_invalidation(self):
+        cache = ChartCache(InMemoryRedis())
+        calls = []
+
+        def render():
+            calls.append(True)
+            return f"<div>chart {len(calls)}</div>"
+
+        self.assertEqual(cache.fetch({'key': 1}, ['s1', 's2'], render), "<div>chart 1</div>")
+        self.assertEqual(cache.fetch({'key': 1}, ['s1', 's2'], render), "<div>chart 1</div>")
+        self.assertEqual(len(calls), 1)
+
+        # Different key data:
+        self.assertEqual(cache.fetch({'key': 2}, ['s1', 's2'], render), "<div>chart 2</div>")
+
+        # Invalidating one of the studies:
+        cache.invalidate_study('s2')
+        self.assertEqual(cache.fetch({'key': 1}, ['s1', 's2'], render), "<div>chart 3</div>")
+        self.assertEqual(cache.fetch({'key': 1}, ['s1', 's2'], render), "<div>chart 3</div>")
+
+        # Other studies are not affected:
+        self.assertEqual(cache.fetch({'key': 1}, ['s1'], render), "<div>chart 4</div>")
+        cache.invalidate_study('s2')
+        self.assertEqual(cache.fetch({'key': 1}, ['s1'], render), "<div>chart 4</div>")
+
+    def test_unavailable_server(self):
+        cache = ChartCache(UnavailableRedis())
+
+        self.assertEqual(cache.fetch({'key': 1}, ['s1'], lambda: "<div></div>"), "<div></div>")
+        cache.invalidate_study('s1')
+
+    def test_extracting_record_ids(self):
+        args = {
+            'measurementContext|12':     'on',
+            'measurementContext|3':      'on',
+            'modelingResult|5':          'on',
+            'axis|measurementContext|3': 'right',
+            'log-left':                  'on',
+            'cellCountUnits':            'Cells/mL',
+        }
+
+        self.assertEqual(chart_record_ids(args), ([3, 12], [5]))
+
+    def test_data_versions(self):
+        study1 = self.create_study()
+        study2 = self.create_study()
+
+        context1 = self.create_measurement_context(studyId=study1.publicId)
+        context2 = self.create_measurement_context(studyId=study2.publicId)
+        modeling_result = self.create_modeling_result(measurementContextId=context2.id)
+
+        versions = _fetch_data_versions(self.db_session, [context1.id], [])
+        self.assertEqual([study_id for (study_id, _) in versions['studies']], [study1.publicId])
+        self.assertEqual(versions['models'], [])
+
+        versions = _fetch_data_versions(self.db_session, [context1.id], [modeling_result.id])
+        self.assertEqual(
+            [study_id for (study_id, _) in versions['studies']],
+            sorted([study1.publicId, study2.publicId]),
+        )
+        self.assertEqual([model_id for (model_id, _) in versions['models']], [modeling_result.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,12 +2,17 @@ import tests.init  # noqa: F401
 
 import unittest
 
+import itertools
+
+import numpy as np
 import pandas as pd
 
 from app.model.lib.conversion import (
     convert_time,
     convert_df_units,
+    convert_df_units_by_row,
     convert_measurement_units,
+    convert_measurement_units_by_row,
 )
 
 
@@ -92,6 +97,55 @@ class TestConversion(unittest.TestCase):
         value = convert_measurement_units(3000, 'mM', 'g/L')
         self.assertIsNone(value)
 
+    def test_converting_df_units_by_row(self):
+        df = pd.DataFrame.from_dict({
+            'value': [10, 20, 30, 40],
+            'std':   [2, None, 6, 8],
+        })
+
+        converted = convert_df_units_by_row(
+            df,
+            source_units=['Cells/μL', 'mM', 'g/L', 'CFUs/mL'],
+            target_units=['Cells/mL', 'μM', 'mM', 'Cells/mL'],
+            metabolite_masses=[None, None, 3, None],
+        )
+
+        self.assertEqual(converted.tolist(), [True, True, True, False])
+        self.assertEqual(df['value'].tolist(), [10_000, 20_000, 10_000, 40])
+        self.assertEqual(df['std'].fillna(0).tolist(), [2_000, 0, 2_000, 8])
+
+        # A single target unit for all rows, missing masses:
+        df = pd.DataFrame.from_dict({'value': [10, 20]})
+
+        converted = convert_df_units_by_row(df, ['mg/L', 'g/L'], 'mM', [2, None])
+
+        self.assertEqual(converted.tolist(), [True, False])
+        self.assertEqual(df['value'].tolist(), [5, 20])
+
+    def test_conversion_by_row_matches_individual_conversion(self):
+        units  = ['Cells/mL', 'Cells/μL', 'CFUs/mL', 'mM', 'nM', 'g/L', 'mg/L', '', None]
+        masses = [None, 180.156, 7]
+
+        rows = list(itertools.product(units, units, masses))
+        values = np.linspace(0.1, 1000, len(rows))
+
+        source_units, target_units, row_masses = zip(*rows)
+        converted_values, converted = convert_measurement_units_by_row(
+            values,
+            source_units,
+            target_units,
+            row_masses,
+        )
+
+        for i, (source, target, mass) in enumerate(rows):
+            expected_value = convert_measurement_units(values[i], source, target, mass=mass)
+
+            self.assertEqual(converted[i], expected_value is not None)
+            if expected_value is not None:
+                self.assertEqual(converted_values[i], expected_value)
+            else:
+                self.assertEqual(converted_values[i], values[i])
+
     def test_time_conversion_to_the_same_unit(self):
         for t in (1, 0.3, 100.0, 0.5):
             for unit in ('d', 'h', 'm', 's'):
@@ -0,0 +1,58 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+import pandas as pd
+
+from db import get_connection
+from app.model.lib.db import named_lock, stream_into_dfs
+from tests.database_test import DatabaseTest
+
+
+class TestDb(DatabaseTest):
+    def test_streaming_into_dfs(self):
+        study        = self.create_study()
+        experiment   = self.create_experiment(studyId=study.publicId)
+        bioreplicate = self.create_bioreplicate(experimentId=experiment.publicId)
+        context      = self.create_measurement_context(studyId=study.publicId, bioreplicateId=bioreplicate.id)
+
+        for i in range(1, 6):
+            self.create_measurement(contextId=context.id, timeInSeconds=(i * 3600), value=(i * 10))
+
+        query = bioreplicate.get_df_query()
+        full_df = bioreplicate.get_df(self.db_session)
+
+        chunks = list(stream_into_dfs(self.db_session, query, chunk_size=2))
+
+        self.assertEqual([len(df) for df in chunks], [2, 2, 1])
+        self.assertEqual(chunks[0].columns.tolist(), full_df.columns.tolist())
+
+        streamed_df = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(streamed_df['time'].tolist(), full_df['time'].tolist())
+        self.assertEqual(streamed_df['value'].tolist(), full_df['value'].tolist())
+
+    def test_streaming_empty_result(self):
+        bioreplicate = self.create_bioreplicate()
+
+        chunks = list(stream_into_dfs(self.db_session, bioreplicate.get_df_query(), chunk_size=2))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].empty)
+        self.assertIn('measurementContextId', chunks[0].columns)
+
+    def test_named_lock(self):
+        with get_connection() as conn1, get_connection() as conn2:
+            with named_lock(conn1, 'test-lock', timeout=0) as acquired:
+                self.assertTrue(acquired)
+
+                # Held by another connection:
+                with named_lock(conn2, 'test-lock', timeout=0) as acquired:
+                    self.assertFalse(acquired)
+
+            # Released at the end of the block:
+            with named_lock(conn2, 'test-lock', timeout=0) as acquired:
+                self.assertTrue(acquired)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+import numpy as np
+
+from app.model.lib.downsampling import lttb_indices
+
+
+class TestDownsampling(unittest.TestCase):
+    def test_short_series(self):
+        self.assertEqual(lttb_indices([0, 1, 2], [1, 2, 3], 5).tolist(), [0, 1, 2])
+        self.assertEqual(lttb_indices([0, 1, 2], [1, 2, 3], 3).tolist(), [0, 1, 2])
+
+    def test_keeping_the_shape(self):
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[500] = 10
+        y[700] = -5
+
+        indices = lttb_indices(x, y, 20)
+
+        self.assertEqual(len(indices), 20)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+        # Peaks are kept:
+        self.assertIn(500, indices)
+        self.assertIn(700, indices)
+
+    def test_uneven_buckets(self):
+        x = np.linspace(0, 1, 101)
+        y = np.sin(x * 10)
+
+        for threshold in (3, 7, 50, 100):
+            indices = lttb_indices(x, y, threshold)
+
+            self.assertEqual(len(indices), threshold)
+            self.assertEqual(len(set(indices)), threshold)
+
+
+if __name__ == '__main__':
+    unittest.main()
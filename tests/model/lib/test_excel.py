@@ -0,0 +1,37 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+from openpyxl import Workbook
+
+import app.model.lib.excel as excel
+
+
+class TestExcel(unittest.TestCase):
+    def test_read_sheets(self):
+        workbook = Workbook()
+
+        sheet = workbook.active
+        sheet.title = 'Growth data'
+        sheet.append(['Biological Replicate', 'Compartment', 'Time', 'Community OD'])
+        sheet.append(['b1', 'c1', 1, 0.1])
+        sheet.append(['b1', 'c1', 2, 0.2])
+
+        sheet = workbook.create_sheet('Metabolites')
+        sheet.append(['Biological Replicate', 'Compartment', 'Time', 'glucose'])
+        sheet.append(['b1', 'c1', 1, 10.0])
+
+        content = excel.export_to_xlsx(workbook)
+        sheets = excel.read_sheets(content)
+
+        self.assertEqual(list(sheets.keys()), ['Growth data', 'Metabolites'])
+        self.assertEqual(sheets['Growth data']['Community OD'].tolist(), [0.1, 0.2])
+        self.assertEqual(sheets['Metabolites']['glucose'].tolist(), [10.0])
+
+        # Parsing the same content again returns the cached dataframes:
+        cached_sheets = excel.read_sheets(bytes(content))
+        self.assertIs(cached_sheets['Growth data'], sheets['Growth data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+import numpy as np
+import simplejson as json
+
+from app.model.lib.growth_fitting import (
+    fit_model,
+    predict_logistic,
+    predict_baranyi_roberts,
+)
+from app.model.lib.growth_fitting_reference import (
+    GROWTH_CURVES,
+    PARITY_POINT_COUNT,
+    R_RESULTS_PATH,
+)
+from app.model.orm import ModelingResult
+
+
+class TestGrowthFitting(unittest.TestCase):
+    def test_easy_linear_exponential_growth(self):
+        time   = np.arange(0, 24, 2.0)
+        values = 100 * np.exp(0.3 * time)
+
+        result = fit_model('easy_linear', time, values, {'pointCount': 5})
+
+        self.assertEqual(result['coefficients'], {'y0': 100.0, 'y0_lm': 100.0, 'mumax': 0.3, 'lag': 0.0})
+        self.assertEqual(result['fit'], {'r2': 1.0, 'rss': 0.0})
+
+    def test_easy_linear_steepest_window(self):
+        # Flat, then exponential growth with a rate of 0.5 starting at t=4:
+        time   = np.arange(0, 16, 1.0)
+        values = 100 * np.exp(0.5 * np.maximum(time - 4, 0))
+
+        result = fit_model('easy_linear', time, values, {'pointCount': 3})
+
+        self.assertEqual(result['coefficients']['mumax'], 0.5)
+        self.assertEqual(result['coefficients']['lag'], 4.0)
+        self.assertEqual(result['coefficients']['y0'], 100.0)
+
+    def test_recovering_model_parameters(self):
+        time = np.linspace(0, 48, 25)
+
+        logistic_values = predict_logistic(time, y0=100, mumax=0.5, K=1e6)
+        result = fit_model('logistic', time, logistic_values)
+
+        self.assertEqual(set(result['coefficients'].keys()), {'y0', 'mumax', 'K'})
+        self._assert_close(result['coefficients'], {'y0': 100, 'mumax': 0.5, 'K': 1e6})
+        self.assertEqual(result['fit'], {'rss': 0.0})
+
+        baranyi_values = predict_baranyi_roberts(time, y0=100, mumax=0.5, K=1e6, h0=2)
+        result = fit_model('baranyi_roberts', time, baranyi_values)
+
+        self.assertEqual(set(result['coefficients'].keys()), {'y0', 'mumax', 'K', 'h0'})
+        self._assert_close(result['coefficients'], {'y0': 100, 'mumax': 0.5, 'K': 1e6, 'h0': 2})
+        self.assertEqual(result['fit'], {'rss': 0.0})
+
+    def test_result_structure(self):
+        time, values = zip(*GROWTH_CURVES['with_death_phase'])
+
+        for modeling_type in ('easy_linear', 'logistic', 'baranyi_roberts'):
+            result       = fit_model(modeling_type, time, values)
+            empty_params = ModelingResult.empty_params(modeling_type)
+
+            self.assertEqual(result['coefficients'].keys(), empty_params['coefficients'].keys())
+            self.assertLessEqual(result['fit'].keys(), empty_params['fit'].keys())
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            fit_model('easy_linear', [0, 1, 2], [1, 2, 3], {'pointCount': 5})
+
+        # Like growthrates, the easy linear method needs at least 3 points:
+        with self.assertRaises(ValueError):
+            fit_model('easy_linear', [0, 1, 2, 3], [1, 2, 4, 8], {'pointCount': 2})
+
+        with self.assertRaises(ValueError):
+            fit_model('logistic', [0, 1, 2, 3], [1, 0, 3, 4])
+
+        with self.assertRaises(ValueError):
+            fit_model('custom_1', [0, 1, 2, 3], [1, 2, 3, 4])
+
+    def test_parity_with_r(self):
+        self.assertTrue(
+            R_RESULTS_PATH.exists(),
+            f"Missing {R_RESULTS_PATH}, export it with scripts/modeling/export_r_results.py",
+        )
+
+        with open(R_RESULTS_PATH) as f:
+            r_results = json.load(f)
+
+        for curve_name, data in GROWTH_CURVES.items():
+            time, values = zip(*data)
+
+            for modeling_type in ('easy_linear', 'logistic', 'baranyi_roberts'):
+                with self.subTest(curve=curve_name, modeling_type=modeling_type):
+                    r_result = r_results[curve_name][modeling_type]
+                    result   = fit_model(modeling_type, time, values, {'pointCount': PARITY_POINT_COUNT})
+
+                    self._assert_close(result['coefficients'], r_result['coefficients'])
+
+                    # Python fits only include the parts of the fit that match R:
+                    r_fit = {key: r_result['fit'][key] for key in result['fit']}
+                    self._assert_close(result['fit'], r_fit)
+
+    def _assert_close(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+
+        for key, value in expected.items():
+            self.assertTrue(
+                np.isclose(actual[key], value, rtol=1e-3, atol=1e-3),
+                f"{key}: {actual[key]} != {value}",
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import tests.init  # noqa: F401
+
+import unittest
+
+from app.model.lib.name_index import NameIndex
+from app.model.orm import Metabolite, Taxon
+from tests.database_test import DatabaseTest
+
+
+class TestNameIndex(unittest.TestCase):
+    def test_anchored_search(self):
+        index = NameIndex([
+            (1, "Vibrio pelagius"),
+            (2, "Anaerovibrio"),
+            (3, "Salmonella enterica serovar Infantis"),
+            (4, "Salmonella enterica serovar Moscow"),
+            (4, "Salmonella enterica serovar Moscow"),
+        ], anchored=True)
+
+        self.assertEqual(len(index), 4)
+
+        self.assertEqual(index.search("vibrio"), ([(1, "Vibrio pelagius")], False))
+        self.assertEqual(index.search("VI"), ([(1, "Vibrio pelagius")], False))
+
+        self.assertEqual(
+            index.search("salmonella ser"),
+            ([(3, "Salmonella enterica serovar Infantis"), (4, "Salmonella enterica serovar Moscow")], False),
+        )
+        self.assertEqual(index.search("salm mos"), ([(4, "Salmonella enterica serovar Moscow")], False))
+        self.assertEqual(index.search("moscow salmonella"), ([], False))
+
+        self.assertEqual(index.search(" "), ([], False))
+        self.assertEqual(index.search("%"), ([], False))
+
+    def test_unanchored_search(self):
+        index = NameIndex([
+            ('CHEBI:1', "D-glucose"),
+            ('CHEBI:2', "glucose 6-phosphate"),
+            ('CHEBI:3', "acetate"),
+        ])
+
+        # Ordered by the position of the first word:
+        self.assertEqual(
+            index.search("gluc"),
+            ([('CHEBI:2', "glucose 6-phosphate"), ('CHEBI:1', "D-glucose")], False),
+        )
+        self.assertEqual(index.search("d- cose"), ([('CHEBI:1', "D-glucose")], False))
+        self.assertEqual(index.search("ate"), ([('CHEBI:3', "acetate"), ('CHEBI:2', "glucose 6-phosphate")], False))
+
+    def test_pagination(self):
+        index = NameIndex([(i, f"Test {i}") for i in range(1, 6)], anchored=True)
+
+        self.assertEqual(index.search("test", page=1, per_page=2), ([(1, "Test 1"), (2, "Test 2")], True))
+        self.assertEqual(index.search("test", page=3, per_page=2), ([(5, "Test 5")], False))
+        self.assertEqual(index.search("test", page=2, per_page=3), ([(4, "Test 4"), (5, "Test 5")], False))
+        self.assertEqual(index.search("test", page=10, per_page=3), ([], False))
+
+
+class TestNameIndexConsistency(DatabaseTest):
+    def test_consistency_with_database(self):
+        for name in ("Vibrio pelagius", "Anaerovibrio", "Brevibacterium linens", "Vibrio cholerae"):
+            self.create_taxon(name=name)
+
+        for name in ("D-glucose", "glucose 6-phosphate", "acetate", "acetyl-CoA"):
+            self.create_metabolite(name=name)
+
+        taxa_index = Taxon.build_name_index(self.db_session)
+
+        for term in ("vibrio", "vib chol", "brevi lin", "bacterium", "xyz"):
+            expected, _ = Taxon.search_by_name(self.db_session, term, per_page=100)
+            results, _  = taxa_index.search(term, per_page=100)
+
+            self.assertEqual([r['id'] for r in expected], [ncbi_id for (ncbi_id, _) in results])
+
+        metabolites_index = Metabolite.build_name_index(self.db_session)
+
+        for term in ("glucose", "ace", "co", "6 phos", "xyz"):
+            expected, _ = Metabolite.search_by_name(self.db_session, term, per_page=100)
+            results, _  = metabolites_index.search(term, per_page=100)
+
+            self.assertEqual([r['id'] for r in expected], [chebi_id for (chebi_id, _) in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import tests.init  # noqa: F401
+
+import unittest
+import tempfile
+import textwrap
+import shutil
+import time
+import sys
+from pathlib import Path
+
+from app.model.lib.r_script import RScript
+from app.model.lib.r_worker_pool import RWorkerPool
+
+
+class TestRWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.root_dir  = tempfile.TemporaryDirectory()
+        self.root_path = Path(self.root_dir.name)
+
+        # A stand-in for `worker.R` that speaks the same protocol. "Scripts"
+        # are text files whose contents are returned as output, unless they
+        # ask for the worker to crash or to hang in the middle of a response:
+        self.fake_worker = self._create_file('fake_worker.py', """
+            import os, sys, json, time
+            from pathlib import Path
+
+            for line in sys.stdin:
+                request = json.loads(line)
+
+                if request['type'] == 'ping':
+                    response = {'ok': True}
+                else:
+                    contents = Path(request['script']).read_text().strip()
+                    if contents == 'crash':
+                        os._exit(1)
+                    elif contents == 'hang':
+                        print('{"ok": tr', end='', flush=True)
+                        time.sleep(30)
+
+                    response = {'ok': True, 'output': f"{os.getpid()}: {contents}", 'messages': []}
+
+                print(json.dumps(response), flush=True)
+        """)
+
+    def tearDown(self):
+        self.root_dir.cleanup()
+
+    def test_process_reuse(self):
+        pool   = self._create_pool(max_jobs=3)
+        script = self._create_file('script.txt', "test")
+
+        outputs = [pool.run(script, cwd=self.root_path)['output'] for _ in range(5)]
+        pids    = [output.split(':')[0] for output in outputs]
+
+        self.assertEqual(outputs[0].split(': ')[1], "test")
+
+        # The worker is recycled after 3 jobs:
+        self.assertEqual(len(set(pids[0:3])), 1)
+        self.assertEqual(len(set(pids[3:5])), 1)
+        self.assertNotEqual(pids[0], pids[3])
+
+        pool.shutdown()
+
+    def test_restart_on_crash(self):
+        pool   = self._create_pool()
+        script = self._create_file('script.txt', "test")
+        crash  = self._create_file('crash.txt', "crash")
+
+        first_pid = pool.run(script, cwd=self.root_path)['output'].split(':')[0]
+
+        with self.assertRaises(ValueError):
+            pool.run(crash, cwd=self.root_path)
+
+        second_pid = pool.run(script, cwd=self.root_path)['output'].split(':')[0]
+        self.assertNotEqual(first_pid, second_pid)
+
+        # A worker that dies while idle is replaced after its health check:
+        pool.idle_workers[0].process.kill()
+        pool.idle_workers[0].process.wait()
+
+        third_pid = pool.run(script, cwd=self.root_path)['output'].split(':')[0]
+        self.assertNotEqual(second_pid, third_pid)
+
+        pool.shutdown()
+
+    def test_timeout_during_response(self):
+        pool = self._create_pool(timeout=1)
+        hang = self._create_file('hang.txt', "hang")
+
+        start_time = time.monotonic()
+        with self.assertRaisesRegex(ValueError, "did not respond in 1 seconds"):
+            pool.run(hang, cwd=self.root_path)
+
+        self.assertLess(time.monotonic() - start_time, 5)
+
+        pool.shutdown()
+
+    def test_startup_errors(self):
+        broken_worker = self._create_file('broken_worker.py', """
+            import sys
+
+            print("Error in library(growthrates): there is no package called 'growthrates'", file=sys.stderr)
+            sys.exit(1)
+        """)
+        pool   = RWorkerPool(sys.executable, worker_script=broken_worker)
+        script = self._create_file('script.txt', "test")
+
+        with self.assertRaisesRegex(ValueError, "there is no package called 'growthrates'"):
+            pool.run(script, cwd=self.root_path)
+
+        pool.shutdown()
+
+    @unittest.skipUnless(shutil.which('Rscript'), "Rscript is not installed")
+    def test_r_script_in_pool(self):
+        script_path = self._create_file('simple.R', """
+            data <- read.table('input.csv', header=T, sep=',')
+            print(data$value)
+            message('A message')
+        """)
+        (self.root_path / 'input.csv').write_text("time,value\n1,10\n2,20\n")
+
+        script = RScript(self.root_path)
+        pool   = RWorkerPool(script.rscript_exe)
+        script = RScript(self.root_path, pool=pool)
+
+        self.assertEqual(script.run(script_path).strip(), "[1] 10 20")
+        self.assertEqual(script.run(script_path).strip(), "[1] 10 20")
+        self.assertEqual(len(pool.idle_workers), 1)
+
+        error_script_path = self._create_file('error.R', "stop('Failure')")
+        with self.assertRaises(ValueError):
+            script.run(error_script_path)
+
+        pool.shutdown()
+
+    def _create_pool(self, **params):
+        return RWorkerPool(sys.executable, worker_script=self.fake_worker, **params)
+
+    def _create_file(self, name, contents):
+        path = self.root_path / name
+        path.write_text(textwrap.dedent(contents).strip() + "\n")
+
+        return path
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import tests.init  # noqa: F401
+
+import unittest
+from datetime import datetime, UTC
+
+import sqlalchemy as sql
+
+from app.model.lib.search_facets import (
+    fetch_facet_counts,
+    fetch_study_facet_ids,
+    rebuild_search_facets,
+    refresh_study_facets,
+)
+from app.model.lib.study_search import StudySearch
+from app.model.orm import SearchFacet, StudyMetabolite, StudyStrain
+from tests.database_test import DatabaseTest
+
+
+class TestSearchFacets(DatabaseTest):
+    def setUp(self):
+        super().setUp()
+
+        self.roseburia = self.create_taxon(ncbiId=841, name="Roseburia")
+        self.blautia   = self.create_taxon(ncbiId=572511, name="Blautia")
+        self.glucose   = self.create_metabolite(name="glucose")
+
+        self.s1 = self.create_study(publishedAt=datetime.now(UTC))
+        self.s2 = self.create_study(publishedAt=None)
+
+        for study in (self.s1, self.s2):
+            self.create_study_strain(studyId=study.publicId, ncbiId=self.roseburia.ncbiId)
+            self.create_study_metabolite(studyId=study.publicId, chebiId=self.glucose.chebiId)
+
+        # Two strains of the same taxon are counted once:
+        self.create_study_strain(studyId=self.s1.publicId, ncbiId=self.roseburia.ncbiId, name="Other")
+
+    def _fetch_all_counts(self, **kwargs):
+        facet_ids = {
+            'strain':     [self.roseburia.ncbiId, self.blautia.ncbiId],
+            'metabolite': [self.glucose.chebiId],
+        }
+        return fetch_facet_counts(self.db_session, facet_ids, **kwargs)
+
+    def test_rebuilding_facets(self):
+        rebuild_search_facets(self.db_session)
+
+        self.assertEqual(self._fetch_all_counts(), {
+            'strain':     {self.roseburia.ncbiId: 1},
+            'metabolite': {self.glucose.chebiId: 1},
+        })
+        self.assertEqual(self._fetch_all_counts(include_unpublished=True), {
+            'strain':     {self.roseburia.ncbiId: 2},
+            'metabolite': {self.glucose.chebiId: 2},
+        })
+
+        # Rebuilding again doesn't duplicate anything:
+        rebuild_search_facets(self.db_session)
+        facet_count = self.db_session.scalars(sql.select(sql.func.count(SearchFacet.id))).one()
+        self.assertEqual(facet_count, 2)
+
+    def test_refreshing_a_study(self):
+        rebuild_search_facets(self.db_session)
+
+        # The unpublished study replaces its metabolite with a strain:
+        previous_facet_ids = fetch_study_facet_ids(self.db_session, self.s2.publicId)
+        self.assertEqual(previous_facet_ids, {
+            'strain':     {self.roseburia.ncbiId},
+            'metabolite': {self.glucose.chebiId},
+        })
+
+        self.db_session.execute(
+            sql.delete(StudyMetabolite)
+            .where(StudyMetabolite.studyId == self.s2.publicId)
+        )
+        self.create_study_strain(studyId=self.s2.publicId, ncbiId=self.blautia.ncbiId)
+
+        refresh_study_facets(self.db_session, self.s2.publicId, previous_facet_ids)
+
+        self.assertEqual(self._fetch_all_counts(include_unpublished=True), {
+            'strain':     {self.roseburia.ncbiId: 2, self.blautia.ncbiId: 1},
+            'metabolite': {self.glucose.chebiId: 1},
+        })
+        self.assertEqual(self._fetch_all_counts(), {
+            'strain':     {self.roseburia.ncbiId: 1},
+            'metabolite': {self.glucose.chebiId: 1},
+        })
+
+        # The study is published:
+        self.s2.publishedAt = datetime.now(UTC)
+        self.db_session.flush()
+
+        refresh_study_facets(self.db_session, self.s2.publicId)
+
+        self.assertEqual(self._fetch_all_counts(), {
+            'strain':     {self.roseburia.ncbiId: 2, self.blautia.ncbiId: 1},
+            'metabolite': {self.glucose.chebiId: 1},
+        })
+
+        # The study no longer includes Blautia:
+        previous_facet_ids = fetch_study_facet_ids(self.db_session, self.s2.publicId)
+
+        self.db_session.execute(
+            sql.delete(StudyStrain)
+            .where(StudyStrain.studyId == self.s2.publicId, StudyStrain.ncbiId == self.blautia.ncbiId)
+        )
+        refresh_study_facets(self.db_session, self.s2.publicId, previous_facet_ids)
+
+        self.assertEqual(self._fetch_all_counts(include_unpublished=True), {
+            'strain':     {self.roseburia.ncbiId: 2},
+            'metabolite': {self.glucose.chebiId: 1},
+        })
+
+    def test_counts_in_search_results(self):
+        rebuild_search_facets(self.db_session)
+
+        search  = StudySearch(self.db_session, ncbiIds=[self.roseburia.ncbiId])
+        studies = search.fetch_results()
+
+        self.assertEqual([s.publicId for s in studies], [self.s1.publicId])
+        self.assertEqual(search.fetch_facet_counts(studies), {
+            'strain':     {self.roseburia.ncbiId: 1},
+            'metabolite': {self.glucose.chebiId: 1},
+        })
+
+        admin   = self.create_user(isAdmin=True)
+        search  = StudySearch(self.db_session, user=admin, ncbiIds=[self.roseburia.ncbiId])
+        studies = search.fetch_results()
+
+        self.assertEqual(search.fetch_facet_counts(studies), {
+            'strain':     {self.roseburia.ncbiId: 2},
+            'metabolite': {self.glucose.chebiId: 2},
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,68 +1,112 @@
 import tests.init  # noqa: F401
 
 import unittest
-import re
 
-from app.model.lib.search_queries import dynamical_query
+from app.model.lib.search_queries import build_advanced_search_query
+from app.model.lib.study_search_index import rebuild_study_search_index
+from tests.database_test import DatabaseTest
 
 
-class TestSearch(unittest.TestCase):
-    def assertSqlQuery(self, actual, expected):
-        actual   = ' '.join(re.split(r'\s+', actual.strip(), flags=re.MULTILINE))
-        expected = ' '.join(re.split(r'\s+', expected.strip(), flags=re.MULTILINE))
+class TestSearchQueries(DatabaseTest):
+    def setUp(self):
+        super().setUp()
 
-        actual   = re.sub(r'\s*;$', '', actual, flags=re.MULTILINE)
-        expected = re.sub(r'\s*;$', '', expected, flags=re.MULTILINE)
+        project = self.create_project(name="Gut Project")
 
-        self.assertEqual(actual, expected)
+        self.s1 = self.create_study(name="Human gut communities", projectUuid=project.uuid)
+        self.s2 = self.create_study(name="Acetate in the human colon")
+        self.s3 = self.create_study(name="Soil bacteria", description="Not human")
 
-    def test_dynamical_query_with_simple_arguments(self):
-        query, values = dynamical_query([
-            {'option': 'Study Name', 'value': 'Example'}
-        ])
-        self.assertSqlQuery(query, """
-            SELECT DISTINCT publicId
-            FROM Studies
-            WHERE LOWER(name) LIKE :value_0
-        """)
-        self.assertEqual(values, ['%example%'])
-
-        query, values = dynamical_query([
-            {'option': 'Microbial Strain', 'value': 'Rhodospirillum'}
-        ])
-        self.assertSqlQuery(query, """
-            SELECT DISTINCT publicId
-            FROM (
-                SELECT studyId as publicId, name, ncbiId
-                FROM StudyStrains
-            ) as Strains_Alias
-            WHERE LOWER(name) LIKE :value_0
-        """)
-        self.assertEqual(values, ['%rhodospirillum%'])
-
-    def test_dynamical_query_with_logic_operators(self):
-        query, values = dynamical_query([
-            {'option': 'Study Name', 'value': 'human'},
-            {'option': 'Metabolites', 'value': 'acetyl', 'logic_operator': 'AND'}
+        taxon1 = self.create_taxon(ncbiId=562, name="Escherichia coli")
+        taxon2 = self.create_taxon(ncbiId=1079, name="Rhodospirillum rubrum")
+
+        self.create_study_strain(studyId=self.s1.publicId, ncbiId=taxon1.ncbiId, name="E. coli K-12")
+        self.create_study_strain(studyId=self.s3.publicId, ncbiId=taxon2.ncbiId, name="Rhodospirillum rubrum")
+
+        metabolite = self.create_metabolite(chebiId='CHEBI:30089', name="acetate")
+        self.create_study_metabolite(studyId=self.s2.publicId, chebiId=metabolite.chebiId)
+        self.create_study_metabolite(studyId=self.s3.publicId, chebiId=metabolite.chebiId)
+
+        rebuild_study_search_index(self.db_session)
+
+    def _search(self, clauses):
+        query = build_advanced_search_query(clauses)
+        return sorted(self.db_session.scalars(query).all())
+
+    def _ids(self, *studies):
+        return sorted(s.publicId for s in studies)
+
+    def test_single_clauses(self):
+        self.assertEqual(self._search([{'option': 'Study Name', 'value': 'HUMAN'}]), self._ids(self.s1, self.s2))
+        self.assertEqual(self._search([{'option': 'Study Name', 'value': 'hum col'}]), self._ids(self.s2))
+        self.assertEqual(self._search([{'option': '', 'value': 'soil'}]), self._ids(self.s3))
+        self.assertEqual(self._search([{'option': 'Study ID', 'value': self.s2.publicId}]), self._ids(self.s2))
+
+        self.assertEqual(self._search([{'option': 'Project Name', 'value': 'gut'}]), self._ids(self.s1))
+        self.assertEqual(self._search([{'option': 'Microbial Strain', 'value': 'rhodo'}]), self._ids(self.s3))
+        self.assertEqual(self._search([{'option': 'NCBI ID', 'value': '562'}]), self._ids(self.s1))
+        self.assertEqual(self._search([{'option': 'NCBI ID', 'value': 'coli'}]), [])
+        self.assertEqual(self._search([{'option': 'Metabolites', 'value': 'Acet'}]), self._ids(self.s2, self.s3))
+        self.assertEqual(self._search([{'option': 'chEBI ID', 'value': '30089'}]), self._ids(self.s2, self.s3))
+
+        # Nothing to search for:
+        self.assertEqual(self._search([{'option': 'Study Name', 'value': '  '}]), [])
+
+        with self.assertRaises(ValueError):
+            self._search([{'option': 'Unknown', 'value': 'test'}])
+
+    def test_logic_operators(self):
+        self.assertEqual(
+            self._search([
+                {'option': 'Study Name',  'value': 'human'},
+                {'option': 'Metabolites', 'value': 'acetate', 'logic_operator': 'AND'},
+            ]),
+            self._ids(self.s2),
+        )
+        self.assertEqual(
+            self._search([
+                {'option': 'Metabolites', 'value': 'acetate'},
+                {'option': 'Study Name',  'value': 'soil', 'logic_operator': 'NOT'},
+            ]),
+            self._ids(self.s2),
+        )
+
+        # AND binds tighter than OR:
+        self.assertEqual(
+            self._search([
+                {'option': 'NCBI ID',     'value': '562'},
+                {'option': 'Metabolites', 'value': 'acetate', 'logic_operator': 'AND'},
+                {'option': 'Study Name',  'value': 'soil', 'logic_operator': 'OR'},
+            ]),
+            self._ids(self.s3),
+        )
+        self.assertEqual(
+            self._search([
+                {'option': 'NCBI ID',     'value': '562'},
+                {'option': 'Study Name',  'value': 'soil', 'logic_operator': 'OR'},
+                {'option': 'Metabolites', 'value': 'acetate', 'logic_operator': 'NOT'},
+            ]),
+            self._ids(self.s1),
+        )
+
+        # The operator of the first clause is ignored, blank clauses are skipped:
+        self.assertEqual(
+            self._search([
+                {'option': 'Study Name',  'value': 'human', 'logic_operator': 'NOT'},
+                {'option': 'Metabolites', 'value': '',      'logic_operator': 'AND'},
+            ]),
+            self._ids(self.s1, self.s2),
+        )
+
+    def test_clauses_are_ordered_by_cost(self):
+        query = build_advanced_search_query([
+            {'option': 'Metabolites', 'value': 'acetate'},
+            {'option': 'chEBI ID',    'value': '30089', 'logic_operator': 'AND'},
         ])
-        self.assertSqlQuery(query, """
-            SELECT DISTINCT publicId
-            FROM Studies
-            WHERE LOWER(name) LIKE :value_0
-            AND publicId IN (
-                SELECT DISTINCT publicId
-                FROM (
-                    SELECT
-                        studyId as publicId,
-                        Metabolites.name as name,
-                        Metabolites.chebiId
-                    FROM StudyMetabolites
-                    INNER JOIN Metabolites ON Metabolites.chebiId = StudyMetabolites.chebiId
-                ) as StudyMetabolites_Alias
-                WHERE LOWER(name) LIKE :value_1
-            )
-        """)
-        self.assertEqual(values, ['%human%', '%acetyl%'])
+        sql_text = str(query)
+
+        # The lookup by id comes first, before the scan of metabolite names:
+        self.assertLess(sql_text.index(':chebiId_1'), sql_text.index('LIKE'))
 
 
 if __name__ == '__main__':
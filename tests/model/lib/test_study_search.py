@@ -3,7 +3,12 @@ import tests.init  # noqa: F401
 import unittest
 from datetime import datetime, UTC
 
+from app.model.lib.errors import ClientError
 from app.model.lib.study_search import StudySearch
+from app.model.lib.study_search_index import (
+    rebuild_study_search_index,
+    update_study_search_index,
+)
 from tests.database_test import DatabaseTest
 
 class TestStudySearch(DatabaseTest):
@@ -46,11 +51,14 @@ class TestStudySearch(DatabaseTest):
         s4 = self.create_study(name="Test", description="Bar")
         s5 = self.create_study(name="Test", authorCache="foo, faust")
 
+        rebuild_study_search_index(self.db_session)
+
+        # Exact matches in the name rank first, prefix matches last:
         search = StudySearch(self.db_session, user=admin, query="foo")
-        self._assertEqualPublicIds(search.fetch_results(), [s5, s3, s1])
+        self._assertEqualPublicIds(search.fetch_results(), [s1, s5, s3])
 
         search = StudySearch(self.db_session, user=admin, query="BAR")
-        self._assertEqualPublicIds(search.fetch_results(), [s4, s3, s2])
+        self._assertEqualPublicIds(search.fetch_results(), [s2, s4])
 
         search = StudySearch(self.db_session, user=admin, query="foobar")
         self._assertEqualPublicIds(search.fetch_results(), [s3])
@@ -59,14 +67,70 @@ class TestStudySearch(DatabaseTest):
         self._assertEqualPublicIds(search.fetch_results(), [s5])
 
         # Pagination
-        search = StudySearch(self.db_session, user=admin, query="bar", per_page=2)
-        self._assertEqualPublicIds(search.fetch_results(), [s4, s3])
+        search = StudySearch(self.db_session, user=admin, query="foo", per_page=2)
+        self._assertEqualPublicIds(search.fetch_results(), [s1, s5])
         self.assertTrue(search.has_more)
 
-        search = StudySearch(self.db_session, user=admin, query="bar", per_page=2, offset=1)
-        self._assertEqualPublicIds(search.fetch_results(), [s3, s2])
+        search = StudySearch(self.db_session, user=admin, query="foo", per_page=2, after=search.next_after)
+        self._assertEqualPublicIds(search.fetch_results(), [s3])
         self.assertFalse(search.has_more)
 
+    def test_text_query_across_fields(self):
+        admin = self.create_user(isAdmin=True)
+
+        s1 = self.create_study(name="Batch cultures", authorCache="garza")
+        s2 = self.create_study(name="Garza batch", description="Chemostat")
+        s3 = self.create_study(name="Chemostat", description="Bifidobacterium growth on trehalose")
+
+        roseburia = self.create_taxon(name="Roseburia intestinalis")
+        self.create_study_strain(studyId=s3.publicId, ncbiId=roseburia.ncbiId, name="Roseburia intestinalis")
+
+        trehalose = self.create_metabolite(name="trehalose")
+        self.create_study_metabolite(studyId=s1.publicId, chebiId=trehalose.chebiId)
+
+        rebuild_study_search_index(self.db_session)
+
+        # Words in different fields:
+        search = StudySearch(self.db_session, user=admin, query="Garza batch")
+        self._assertEqualPublicIds(search.fetch_results(), [s2, s1])
+
+        search = StudySearch(self.db_session, user=admin, query="garza chemostat")
+        self._assertEqualPublicIds(search.fetch_results(), [s2])
+
+        # Strain and metabolite names:
+        search = StudySearch(self.db_session, user=admin, query="roseb chemo")
+        self._assertEqualPublicIds(search.fetch_results(), [s3])
+
+        search = StudySearch(self.db_session, user=admin, query="trehalose")
+        self._assertEqualPublicIds(search.fetch_results(), [s1, s3])
+
+        # Public ids are matched regardless of the other words:
+        search = StudySearch(self.db_session, user=admin, query=f"{s1.publicId} chemostat")
+        self._assertEqualPublicIds(search.fetch_results(), [s3, s2, s1])
+
+        # Special characters are not patterns:
+        search = StudySearch(self.db_session, user=admin, query="%atch")
+        self._assertEqualPublicIds(search.fetch_results(), [])
+
+    def test_updating_the_search_index(self):
+        admin = self.create_user(isAdmin=True)
+        study = self.create_study(name="Chemostat")
+
+        update_study_search_index(self.db_session, study.publicId)
+
+        search = StudySearch(self.db_session, user=admin, query="chemostat")
+        self._assertEqualPublicIds(search.fetch_results(), [study])
+
+        study.name = "Batch culture"
+        self.db_session.flush()
+        update_study_search_index(self.db_session, study.publicId)
+
+        search = StudySearch(self.db_session, user=admin, query="chemostat")
+        self._assertEqualPublicIds(search.fetch_results(), [])
+
+        search = StudySearch(self.db_session, user=admin, query="batch")
+        self._assertEqualPublicIds(search.fetch_results(), [study])
+
     def test_public_id_query(self):
         admin = self.create_user(isAdmin=True)
 
@@ -120,7 +184,7 @@ class TestStudySearch(DatabaseTest):
         self._assertEqualPublicIds(search.fetch_results(), [s2])
         self.assertTrue(search.has_more)
 
-        search = StudySearch(self.db_session, user=admin, ncbiIds=[roseburia.ncbiId], per_page=1, offset=1)
+        search = StudySearch(self.db_session, user=admin, ncbiIds=[roseburia.ncbiId], per_page=1, after=search.next_after)
         self._assertEqualPublicIds(search.fetch_results(), [s1])
         self.assertFalse(search.has_more)
 
@@ -158,7 +222,7 @@ class TestStudySearch(DatabaseTest):
         self._assertEqualPublicIds(search.fetch_results(), [s3])
         self.assertTrue(search.has_more)
 
-        search = StudySearch(self.db_session, user=admin, chebiIds=[trehalose.chebiId], per_page=1, offset=1)
+        search = StudySearch(self.db_session, user=admin, chebiIds=[trehalose.chebiId], per_page=1, after=search.next_after)
         self._assertEqualPublicIds(search.fetch_results(), [s1])
         self.assertFalse(search.has_more)
 
@@ -182,27 +246,74 @@ class TestStudySearch(DatabaseTest):
         self._assertEqualPublicIds(search.fetch_results(), [s4, s3, s2, s1])
         self.assertFalse(search.has_more)
 
-        search = StudySearch(self.db_session, user=admin, per_page=2, offset=1)
-        self._assertEqualPublicIds(search.fetch_results(), [s3, s2])
-        self.assertTrue(search.has_more)
+        search = StudySearch(self.db_session, user=admin, per_page=2)
+        self._assertEqualPublicIds(search.fetch_results(), [s4, s3])
 
-        search = StudySearch(self.db_session, user=admin, per_page=2, offset=2)
+        search = StudySearch(self.db_session, user=admin, per_page=2, after=search.next_after)
         self._assertEqualPublicIds(search.fetch_results(), [s2, s1])
         self.assertFalse(search.has_more)
 
-        search = StudySearch(self.db_session, user=admin, per_page=2, offset=2)
-        self._assertEqualPublicIds(search.fetch_results(), [s2, s1])
-        self.assertFalse(search.has_more)
+        # With text query
+        rebuild_study_search_index(self.db_session)
 
-        # With strain query
-        search = StudySearch(self.db_session, user=admin, query="bar", per_page=2)
-        self._assertEqualPublicIds(search.fetch_results(), [s4, s3])
+        search = StudySearch(self.db_session, user=admin, query="bar", per_page=1)
+        self._assertEqualPublicIds(search.fetch_results(), [s2])
         self.assertTrue(search.has_more)
 
-        search = StudySearch(self.db_session, user=admin, query="bar", per_page=2, offset=1)
-        self._assertEqualPublicIds(search.fetch_results(), [s3, s2])
+        search = StudySearch(self.db_session, user=admin, query="bar", per_page=1, after=search.next_after)
+        self._assertEqualPublicIds(search.fetch_results(), [s4])
         self.assertFalse(search.has_more)
 
+    def test_keyset_pagination(self):
+        admin = self.create_user(isAdmin=True)
+
+        s1 = self.create_study(name="Foo")
+        s2 = self.create_study(name="Foo bar")
+        s3 = self.create_study(name="FooBar")
+        s4 = self.create_study(name="Test", authorCache="foo")
+        s5 = self.create_study(name="Test", description="Foo")
+
+        roseburia = self.create_taxon(name="Roseburia")
+        blautia   = self.create_taxon(name="Blautia")
+
+        for study in (s1, s2, s3):
+            self.create_study_strain(studyId=study.publicId, ncbiId=roseburia.ncbiId)
+        self.create_study_strain(studyId=s2.publicId, ncbiId=blautia.ncbiId)
+
+        rebuild_study_search_index(self.db_session)
+
+        for params in (
+            {},
+            {'query': 'foo'},
+            {'ncbiIds': [roseburia.ncbiId, blautia.ncbiId]},
+            {'query': 'foo', 'ncbiIds': [roseburia.ncbiId, blautia.ncbiId]},
+        ):
+            expected_results = StudySearch(self.db_session, user=admin, **params).fetch_results()
+
+            results = []
+            after   = None
+
+            while True:
+                search = StudySearch(self.db_session, user=admin, per_page=2, after=after, **params)
+
+                with self._count_queries() as queries:
+                    results += search.fetch_results()
+                self.assertEqual(len(queries), 1)
+
+                if not search.has_more:
+                    self.assertIsNone(search.next_after)
+                    break
+
+                after = search.next_after
+
+            self._assertEqualPublicIds(results, expected_results)
+            self.assertEqual(search.fetch_total_count(), len(expected_results))
+
+        # The cursor needs to have the same keys as the search:
+        search = StudySearch(self.db_session, user=admin, query='foo', after=s1.publicId)
+        with self.assertRaises(ClientError):
+            search.fetch_results()
+
     def _assertEqualPublicIds(self, list1, list2):
         get_public_id = lambda s: s.publicId
         self.assertEqual(
@@ -4,6 +4,7 @@ import unittest
 from datetime import datetime, timedelta, UTC
 
 from freezegun import freeze_time
+import pandas as pd
 import sqlalchemy as sql
 
 from app.model.orm import (
@@ -24,6 +25,7 @@ from app.model.lib.submission_process import (
     _save_experiments,
     _save_study_techniques,
     _create_average_measurements,
+    _validate_sheet_values,
 )
 from tests.database_test import DatabaseTest
 
@@ -520,6 +522,80 @@ class TestSubmissionProcess(DatabaseTest):
         self.db_session.refresh(experiment)
         self.assertEqual({b.name for b in experiment.bioreplicates}, {"b1", "b2", "b3"})
 
+    def test_average_measurement_creation_per_subject(self):
+        experiment = self.create_experiment(name="e1")
+        study = experiment.study
+
+        c1 = self.create_compartment()
+        self.create_experiment_compartment(compartmentId=c1.id, experimentId=experiment.publicId)
+
+        mt = self.create_measurement_technique(subjectType='strain', study_technique={'studyId': study.publicId})
+
+        s1 = self.create_study_strain(name="s1", studyId=study.publicId)
+        s2 = self.create_study_strain(name="s2", studyId=study.publicId)
+
+        b1 = self.create_bioreplicate(name="b1", experimentId=experiment.publicId)
+        b2 = self.create_bioreplicate(name="b2", experimentId=experiment.publicId)
+
+        strain_values = {
+            (b1, s1): [1.0, 2.0],
+            (b1, s2): [10.0, None],
+            (b2, s1): [3.0, 4.5],
+            (b2, s2): [20.0, None],
+        }
+        for (bioreplicate, strain), values in strain_values.items():
+            mc = self.create_measurement_context(
+                subjectId=strain.id,
+                subjectType='strain',
+                subjectName=strain.name,
+                bioreplicateId=bioreplicate.id,
+                techniqueId=mt.id,
+                compartmentId=c1.id,
+            )
+            for i, value in enumerate(values):
+                self.create_measurement(timeInSeconds=i, value=value, contextId=mc.id)
+
+        _create_average_measurements(self.db_session, study, experiment)
+        self.db_session.refresh(experiment)
+
+        average_bioreplicate = next(b for b in experiment.bioreplicates if b.name == "Average(e1)")
+        average_contexts = sorted(average_bioreplicate.measurementContexts, key=lambda mc: mc.subjectName)
+
+        self.assertEqual([mc.subjectId for mc in average_contexts], [s1.id, s2.id])
+        self.assertEqual({mc.calculationType for mc in average_contexts}, {'average'})
+
+        (s1_context, s2_context) = average_contexts
+        s1_measurements = sorted(s1_context.measurements, key=lambda m: m.timeInSeconds)
+        s2_measurements = sorted(s2_context.measurements, key=lambda m: m.timeInSeconds)
+
+        self.assertEqual([float(m.value) for m in s1_measurements], [2.0, 3.25])
+        self.assertEqual([float(m.std) for m in s1_measurements], [1.0, 1.25])
+
+        # Time points with no values get an empty average:
+        self.assertEqual([m.value and float(m.value) for m in s2_measurements], [15.0, None])
+
+    def test_sheet_value_validation(self):
+        df = pd.DataFrame({
+            'Biological Replicate': ['b1', 'b1', 'b1', 'b1', 'b1'],
+            'Time':                 [0, 1, None, -3, 4],
+            'Community FC':         [1.0, 2.0, None, 4.0, 5.0],
+            'Strain 1 FC':          ['1', 'nan', 'n/a', '', -1],
+            'Glucose':              [-1, -2, -3, -4, 5],
+        })
+        value_columns = {'Community FC', 'Strain 1 FC', 'Glucose'}
+
+        errors, warnings = _validate_sheet_values('Sheet', df, value_columns)
+
+        self.assertEqual(warnings, ["Sheet: Missing or invalid time values on row(s) 3, 4"])
+        self.assertEqual(errors, [
+            'Sheet: Invalid values in column "Strain 1 FC" on row(s) 3, 4, 5',
+            'Sheet: Invalid values in column "Glucose" on row(s) 1, 2, 3, and 1 more',
+        ])
+
+        # Columns that are not expected are not checked:
+        errors, _ = _validate_sheet_values('Sheet', df, {'Community FC'})
+        self.assertEqual(errors, [])
+
     def _get_by_uuid(self, model_class, uuid):
         return self.db_session.scalars(
             sql.select(model_class)
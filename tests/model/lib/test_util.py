@@ -4,6 +4,7 @@ import unittest
 from types import SimpleNamespace
 
 import app.model.lib.util as util
+from app.model.lib.errors import ClientError
 
 
 class TestUtil(unittest.TestCase):
@@ -24,6 +25,19 @@ class TestUtil(unittest.TestCase):
         with self.assertRaises(ValueError):
             util.group_by_unique_name([foo, bar, bar, baz])
 
+    def test_get_int_arg(self):
+        args = {'limit': '10', 'after': '-1', 'page': 'two'}
+
+        self.assertEqual(util.get_int_arg(args, 'limit'), 10)
+        self.assertEqual(util.get_int_arg(args, 'limit', minimum=10), 10)
+        self.assertIsNone(util.get_int_arg(args, 'missing'))
+
+        with self.assertRaisesRegex(ClientError, 'at least 0'):
+            util.get_int_arg(args, 'after')
+
+        with self.assertRaisesRegex(ClientError, 'Expected an integer'):
+            util.get_int_arg(args, 'page')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,8 @@ import tests.init  # noqa: F401
 import unittest
 from decimal import Decimal
 
+import pandas as pd
+
 from app.model.orm import Measurement
 
 from tests.database_test import DatabaseTest
@@ -238,6 +240,44 @@ class TestMeasurement(DatabaseTest):
             ]
         )
 
+    def test_import_df(self):
+        study = self.create_study(timeUnits='h')
+        experiment = self.create_experiment(studyId=study.publicId)
+
+        b1 = self.create_bioreplicate(name='b1', experimentId=experiment.publicId)
+        b2 = self.create_bioreplicate(name='b2', experimentId=experiment.publicId)
+        self.create_compartment(studyId=study.publicId, name='c1')
+
+        self.create_measurement_technique(
+            subjectType='bioreplicate',
+            type='od',
+            study_technique={'studyId': study.publicId, 'includeStd': True},
+        )
+
+        df = pd.DataFrame({
+            'Biological Replicate': ['b1', 'b1', 'b1', 'b2', 'b2'],
+            'Compartment':          ['c1', 'c1', 'c1', 'c1', 'c1'],
+            'Time':                 [1, 2, None, 1, 2],
+            'Community OD':         [0.1, 0.2, 0.3, None, None],
+            'Community OD STD':     [0.01, None, 0.03, 0.01, 0.02],
+        })
+
+        contexts = Measurement.insert_from_df(self.db_session, study, df)
+
+        # The b2 context only has empty values, so it's skipped:
+        self.assertEqual([c.bioreplicateId for c in contexts], [b1.id])
+        self.assertEqual([c.subjectId for c in contexts], [b1.id])
+
+        # The row without a time is skipped:
+        self.db_session.refresh(contexts[0])
+        self.assertEqual(
+            [(m.timeInHours, m.value, m.std) for m in contexts[0].measurements],
+            [
+                (1.0, Decimal('0.100'), Decimal('0.010')),
+                (2.0, Decimal('0.200'), None),
+            ]
+        )
+
     def test_import_mixed_csv(self):
         study = self.create_study(timeUnits='m')
         experiment = self.create_experiment(studyId=study.publicId)
@@ -1,8 +1,13 @@
 import tests.init  # noqa: F401
 
 import unittest
+from unittest.mock import patch
 
-from app.model.tasks.modeling import _process_modeling_request
+from app.model.tasks.modeling import (
+    _process_modeling_request,
+    _process_modeling_batch,
+    _split_job_output,
+)
 from tests.database_test import DatabaseTest
 
 
@@ -46,6 +51,148 @@ class TestModeling(DatabaseTest):
         self.assertEqual(len(modeling_result.params['fit']), 2)
         self.assertEqual(set(modeling_result.params['fit'].keys()), {'r2', 'rss'})
 
+    def test_python_backend_calculation(self):
+        strain = self.create_study_strain()
+
+        modeling_requests = []
+        for modeling_type in ('easy_linear', 'logistic', 'baranyi_roberts'):
+            measurement_context = self.create_measurement_context(subjectId=strain.id, subjectType='strain')
+            modeling_result     = self.create_modeling_result(type=modeling_type, measurementContextId=measurement_context.id)
+
+            for (hours, value) in [(0, 2146.0), (4, 23640.0), (8, 400810.0), (12, 1139840.0), (16, 1418960.0), (20, 1422060.0)]:
+                self.create_measurement(contextId=measurement_context.id, timeInSeconds=(hours * 3600), value=value)
+
+            modeling_requests.append((modeling_result.id, measurement_context.id, {'backend': 'python'}))
+
+        (modeling_result_id, measurement_context_id, args) = modeling_requests[0]
+        modeling_result = _process_modeling_request(self.db_session, modeling_result_id, measurement_context_id, args)
+
+        self.assertEqual(modeling_result.state, 'ready')
+        self.assertEqual(modeling_result.params['backend'], 'python')
+        self.assertEqual(modeling_result.params['inputs'], {'pointCount': 5})
+        self.assertIsNone(modeling_result.rSummary)
+
+        # Batches don't need R when all requests use the Python backend:
+        modeling_results = _process_modeling_batch(self.db_session, modeling_requests)
+
+        self.assertEqual([mr.state for mr in modeling_results], ['ready', 'ready', 'ready'])
+        self.assertEqual(
+            [set(mr.params['coefficients'].keys()) for mr in modeling_results],
+            [{'y0', 'y0_lm', 'mumax', 'lag'}, {'y0', 'mumax', 'K'}, {'y0', 'h0', 'K', 'mumax'}],
+        )
+
+    def test_python_backend_failure(self):
+        strain              = self.create_study_strain()
+        measurement_context = self.create_measurement_context(subjectId=strain.id, subjectType='strain')
+        modeling_result     = self.create_modeling_result(type='logistic', measurementContextId=measurement_context.id)
+
+        for (hours, value) in [(0, 2146.0), (4, 23640.0), (8, 400810.0), (12, 1139840.0)]:
+            self.create_measurement(contextId=measurement_context.id, timeInSeconds=(hours * 3600), value=value)
+
+        # Unexpected errors are recorded rather than propagated:
+        with self.assertLogs('app.model.tasks.modeling', level='ERROR'):
+            with patch('app.model.tasks.modeling.fit_model', side_effect=ZeroDivisionError):
+                modeling_result = _process_modeling_request(
+                    self.db_session,
+                    modeling_result.id,
+                    measurement_context.id,
+                    {'backend': 'python'},
+                )
+
+        self.assertEqual(modeling_result.state, 'error')
+        self.assertEqual(modeling_result.error, 'Fitting error')
+
+    def test_reusing_results_with_the_same_fingerprint(self):
+        strain = self.create_study_strain()
+        args   = {'backend': 'python', 'pointCount': '3'}
+
+        contexts = []
+        for _ in range(2):
+            measurement_context = self.create_measurement_context(subjectId=strain.id, subjectType='strain')
+            contexts.append(measurement_context)
+
+            for (hours, value) in [(0, 2146.0), (4, 23640.0), (8, 400810.0), (12, 1139840.0), (16, 1418960.0), (20, 1422060.0)]:
+                self.create_measurement(contextId=measurement_context.id, timeInSeconds=(hours * 3600), value=value)
+
+        modeling_result = self.create_modeling_result(type='easy_linear', measurementContextId=contexts[0].id)
+        modeling_result = _process_modeling_request(self.db_session, modeling_result.id, contexts[0].id, args)
+
+        self.assertEqual(modeling_result.state, 'ready')
+        self.assertIsNotNone(modeling_result.inputFingerprint)
+
+        # Mark the result so we can tell if it was recalculated:
+        modeling_result.params = {**modeling_result.params, 'marker': True}
+        modeling_result.state  = 'pending'
+        self.db_session.commit()
+
+        modeling_result = _process_modeling_request(self.db_session, modeling_result.id, contexts[0].id, args)
+        self.assertEqual(modeling_result.state, 'ready')
+        self.assertTrue(modeling_result.params['marker'])
+
+        # Identical data in a different context reuses the result:
+        other_result = self.create_modeling_result(type='easy_linear', measurementContextId=contexts[1].id)
+        other_result = _process_modeling_request(self.db_session, other_result.id, contexts[1].id, args)
+        self.assertTrue(other_result.params['marker'])
+        self.assertEqual(other_result.inputFingerprint, modeling_result.inputFingerprint)
+
+        # Different inputs are recalculated:
+        modeling_result = _process_modeling_request(self.db_session, modeling_result.id, contexts[0].id, {**args, 'pointCount': '4'})
+        self.assertNotIn('marker', modeling_result.params)
+        self.assertEqual(modeling_result.params['inputs'], {'pointCount': 4})
+
+        # Changed measurements are recalculated:
+        other_result.params = {**other_result.params, 'marker': True}
+        self.db_session.commit()
+
+        self.create_measurement(contextId=contexts[1].id, timeInSeconds=(24 * 3600), value=1422060.0)
+
+        other_result = _process_modeling_request(self.db_session, other_result.id, contexts[1].id, args)
+        self.assertNotIn('marker', other_result.params)
+
+    def test_batch_calculation(self):
+        strain = self.create_study_strain()
+
+        modeling_requests = []
+        for modeling_type in ('easy_linear', 'logistic', 'baranyi_roberts'):
+            measurement_context = self.create_measurement_context(subjectId=strain.id, subjectType='strain')
+            modeling_result     = self.create_modeling_result(type=modeling_type, measurementContextId=measurement_context.id)
+
+            for (hours, value) in [(0, 2146.0), (4, 23640.0), (8, 400810.0), (12, 1139840.0), (16, 1418960.0), (20, 1422060.0)]:
+                self.create_measurement(contextId=measurement_context.id, timeInSeconds=(hours * 3600), value=value)
+
+            modeling_requests.append((modeling_result.id, measurement_context.id, {}))
+
+        modeling_results = _process_modeling_batch(self.db_session, modeling_requests)
+
+        self.assertEqual([mr.state for mr in modeling_results], ['ready', 'ready', 'ready'])
+        self.assertEqual(
+            [set(mr.params['coefficients'].keys()) for mr in modeling_results],
+            [{'y0', 'y0_lm', 'mumax', 'lag'}, {'y0', 'mumax', 'K'}, {'y0', 'h0', 'K', 'mumax'}],
+        )
+
+        for modeling_result in modeling_results:
+            self.assertEqual(set(modeling_result.params['fit'].keys()), {'r2', 'rss'})
+            self.assertIsNotNone(modeling_result.params['r_version'])
+            self.assertIsNotNone(modeling_result.rSummary)
+
+    def test_batch_output_splitting(self):
+        output = "\n".join([
+            '[1] "## JOB job0 START"',
+            '[1] "## SUMMARY START"',
+            'Summary 0',
+            '[1] "## SUMMARY END"',
+            '[1] "## JOB job0 END"',
+            '[1] "## JOB job1 START"',
+            'Error in fitting',
+            '[1] "## JOB job1 END"',
+        ])
+
+        job_outputs = _split_job_output(output)
+
+        self.assertEqual(set(job_outputs.keys()), {'job0', 'job1'})
+        self.assertIn('Summary 0', job_outputs['job0'])
+        self.assertEqual(job_outputs['job1'], 'Error in fitting')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import tests.init  # noqa: F401
+
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta, UTC
+
+import simplejson as json
+from openpyxl import Workbook
+
+from db import get_connection
+from app.model.orm import ExcelFile, Submission
+from app.model.lib.db import named_lock
+from app.model.lib.excel import export_to_xlsx
+from app.model.tasks.submission import _process_submission
+from tests.database_test import DatabaseTest
+from tests.page_test import TAXON_NAMES
+
+
+class TestSubmission(DatabaseTest):
+    def test_missing_data_file(self):
+        submission = self.create_submission()
+
+        submission = _process_submission(self.db_session, submission.id, submission.userUniqueID)
+
+        self.assertEqual(submission.processingState, 'error')
+        self.assertEqual(submission.processingErrors, ["No data file uploaded"])
+        self.assertFalse(submission.is_processing)
+
+    def test_invalid_data_file(self):
+        workbook = Workbook()
+        workbook.active.append(['Time', 'Community OD'])
+        workbook.active.append([1, 0.1])
+
+        content = export_to_xlsx(workbook)
+        data_file = ExcelFile(filename='data.xlsx', content=content, size=len(content))
+
+        submission = self.create_submission()
+        submission.dataFile = data_file
+        self.db_session.add(submission)
+        self.db_session.commit()
+
+        submission = _process_submission(self.db_session, submission.id, submission.userUniqueID)
+
+        self.assertEqual(submission.processingState, 'error')
+        self.assertIn("Missing column: Biological Replicate", submission.processingErrors)
+        self.assertIsNone(submission.study)
+
+    def test_successful_processing(self):
+        for ncbi_id, name in TAXON_NAMES.items():
+            self.create_taxon(ncbiId=ncbi_id, name=name)
+
+        with open('scripts/bootstrap/submission_data/synthetic_gut.json') as f:
+            study_design = json.load(f, use_decimal=True)
+
+        # Only community counts are measured:
+        study_design['techniques'] = study_design['techniques'][:1]
+
+        workbook = Workbook()
+        workbook.active.append(['Biological Replicate', 'Compartment', 'Time', 'Community FC'])
+        for bioreplicate in study_design['experiments'][0]['bioreplicates']:
+            for time in range(3):
+                workbook.active.append([bioreplicate['name'], 'WC', time, 1000 * (time + 1)])
+
+        content = export_to_xlsx(workbook)
+
+        submission = self.create_submission(studyDesign=study_design)
+        submission.dataFile = ExcelFile(filename='data.xlsx', content=content, size=len(content))
+        self.db_session.add(submission)
+        self.db_session.commit()
+
+        submission = _process_submission(self.db_session, submission.id, submission.userUniqueID)
+
+        self.assertEqual(submission.processingState, 'ready')
+        self.assertIsNone(submission.processingErrors)
+        self.assertFalse(submission.is_processing)
+
+        self.assertEqual(submission.study.name, study_design['study']['name'])
+        self.assertTrue(len(submission.study.measurementContexts) > 0)
+
+    @patch('app.model.tasks.submission.PROCESSING_LOCK_TIMEOUT', 0)
+    def test_previous_job_still_running(self):
+        submission = self.create_submission()
+
+        # A previous job is processing the same submission:
+        with get_connection() as conn, named_lock(conn, f"submission-{submission.id}", timeout=0):
+            submission = _process_submission(self.db_session, submission.id, submission.userUniqueID)
+
+        self.assertEqual(submission.processingState, 'error')
+        self.assertIn("still being processed", submission.processingErrors[0])
+
+    def test_stale_processing(self):
+        submission = Submission(processingState='saving', updatedAt=datetime.now(UTC))
+
+        self.assertTrue(submission.is_processing)
+        self.assertFalse(submission.is_processing_stale)
+
+        # The job died a while ago:
+        submission.updatedAt -= Submission.PROCESSING_TIMEOUT + timedelta(minutes=1)
+
+        self.assertFalse(submission.is_processing)
+        self.assertTrue(submission.is_processing_stale)
+
+        # Finished submissions are never stale:
+        submission.processingState = 'ready'
+        self.assertFalse(submission.is_processing_stale)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,9 @@ import tests.init  # noqa: F401
 
 from datetime import datetime, UTC
 
+import simplejson as json
+
+import app.pages.api as api_pages
 from tests.page_test import PageTest
 
 
@@ -433,6 +436,76 @@ class TestApiPages(PageTest):
         self.assertEqual(response.status, '400 BAD REQUEST')
         self.assertTrue('error' in self._get_json(response))
 
+    def test_search_pagination(self):
+        study      = self.create_study(publishedAt=datetime.now(UTC))
+        taxon      = self.create_taxon()
+        strain     = self.create_study_strain(studyId=study.publicId, ncbiId=taxon.ncbiId)
+        metabolite = self.create_metabolite(averageMass=180)
+
+        context_ids = []
+        for i in range(5):
+            context = self.create_measurement_context(
+                studyId=study.publicId,
+                subjectId=strain.id,
+                subjectType='strain',
+            )
+            context_ids.append(context.id)
+
+        metabolite_context = self.create_measurement_context(
+            studyId=study.publicId,
+            subjectId=metabolite.id,
+            subjectType='metabolite',
+        )
+        context_ids.append(metabolite_context.id)
+
+        self.db_session.commit()
+
+        query = f"strainNcbiIds={taxon.ncbiId}&metaboliteChebiIds={metabolite.chebiId.removeprefix('CHEBI:')}"
+
+        # Walking through the pages:
+        found_ids = []
+        after     = None
+
+        for _ in range(3):
+            url = f"/api/v1/search.json?{query}&limit=2"
+            if after is not None:
+                url += f"&after={after}"
+
+            response_json = self._get_json(self.client.get(url))
+            self.assertEqual(len(response_json['measurementContexts']), 2)
+
+            found_ids += [mc['id'] for mc in response_json['measurementContexts']]
+            after = response_json['nextAfter']
+
+        self.assertEqual(found_ids, context_ids)
+        self.assertIsNone(after)
+
+        # Without a limit, there's no cursor:
+        response_json = self._get_json(self.client.get(f"/api/v1/search.json?{query}"))
+        self.assertEqual(len(response_json['measurementContexts']), 6)
+        self.assertNotIn('nextAfter', response_json)
+
+        # Invalid cursor:
+        response = self.client.get(f"/api/v1/search.json?{query}&after=first")
+        self.assertEqual(response.status, '400 BAD REQUEST')
+
+        # Empty pages:
+        for response_format in ('json', 'ndjson'):
+            response = self.client.get(f"/api/v1/search.json?{query}&format={response_format}&limit=0")
+            self.assertEqual(response.status, '400 BAD REQUEST')
+
+        # Streaming:
+        response = self.client.get(f"/api/v1/search.json?{query}&format=ndjson&after={context_ids[0]}")
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], context_ids[1:])
+        self.assertEqual(json.loads(lines[-1])['subject']['type'], 'metabolite')
+
+        response = self.client.get(f"/api/v1/search.json?{query}&format=ndjson&limit=3")
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], context_ids[:3])
+
     def test_csv_unit_conversion(self):
         study        = self.create_study(publishedAt=datetime.now(UTC))
         experiment   = self.create_experiment(studyId=study.publicId)
@@ -566,6 +639,108 @@ class TestApiPages(PageTest):
         mc_s2_df = response_df[response_df['measurementContextId'] == mc_s2.id]
         self.assertEqual(mc_s2_df['value'].tolist(), [1, 2, 3])
 
+    def test_multiple_measurement_contexts_csv(self):
+        published_study   = self.create_study(publishedAt=datetime.now(UTC))
+        unpublished_study = self.create_study(publishedAt=None)
+
+        strain = self.create_study_strain(studyId=published_study.publicId)
+
+        mc1 = self.create_measurement_context(
+            studyId=published_study.publicId,
+            techniqueId=self.create_measurement_technique(units='Cells/μL', subjectType='strain').id,
+            subjectId=strain.id,
+            subjectType='strain',
+        )
+        mc2 = self.create_measurement_context(
+            studyId=published_study.publicId,
+            techniqueId=self.create_measurement_technique(units='', subjectType='bioreplicate').id,
+            subjectType='bioreplicate',
+        )
+        mc3 = self.create_measurement_context(studyId=unpublished_study.publicId)
+
+        for mc in (mc1, mc2, mc3):
+            for i in range(1, 3):
+                self.create_measurement(contextId=mc.id, timeInSeconds=(i * 3600), value=(i * 10))
+
+        self.db_session.commit()
+
+        response = self.client.get(f"/api/v1/measurement-contexts.csv?ids={mc2.id},{mc1.id}")
+        self.assertEqual(response.status, '200 OK')
+
+        response_df = self._get_csv(response)
+        self.assertEqual(response_df.columns.tolist(), ['measurementContextId', 'time', 'value', 'std'])
+        self.assertEqual(response_df['measurementContextId'].tolist(), [mc1.id, mc1.id, mc2.id, mc2.id])
+        self.assertEqual(response_df['time'].tolist(), [1, 2, 1, 2])
+        self.assertEqual(response_df['value'].tolist(), [10_000, 20_000, 10, 20])
+
+        # Units are converted per context:
+        response = self.client.get(f"/api/v1/measurement-contexts.csv?ids={mc1.id},{mc2.id}&cellCountUnits=Cells/μL")
+        response_df = self._get_csv(response)
+        self.assertEqual(response_df['value'].tolist(), [10, 20, 10, 20])
+
+        # Searching for contexts, unpublished ones are skipped:
+        response = self.client.get(f"/api/v1/measurement-contexts.csv?strainNcbiIds={strain.ncbiId}")
+        response_df = self._get_csv(response)
+        self.assertEqual(response_df['measurementContextId'].tolist(), [mc1.id, mc1.id])
+
+        # Unpublished or missing contexts:
+        response = self.client.get(f"/api/v1/measurement-contexts.csv?ids={mc1.id},{mc3.id}")
+        self.assertEqual(response.status, '404 NOT FOUND')
+
+        # Invalid parameters:
+        for query in ('ids=1,a', 'ids=', f"ids={mc1.id}&limit=10", 'limit=10'):
+            response = self.client.get(f"/api/v1/measurement-contexts.csv?{query}")
+            self.assertEqual(response.status, '400 BAD REQUEST')
+
+    def test_csv_streaming_in_chunks(self):
+        study        = self.create_study(publishedAt=datetime.now(UTC))
+        experiment   = self.create_experiment(studyId=study.publicId)
+        bioreplicate = self.create_bioreplicate(experimentId=experiment.publicId)
+        strain       = self.create_study_strain(studyId=study.publicId)
+
+        for units in ('Cells/μL', 'CFUs/mL'):
+            measurement_context = self.create_measurement_context(
+                studyId=study.publicId,
+                bioreplicateId=bioreplicate.id,
+                techniqueId=self.create_measurement_technique(units=units, subjectType='strain').id,
+                subjectId=strain.id,
+                subjectType='strain',
+            )
+            for i in range(1, 4):
+                self.create_measurement(
+                    contextId=measurement_context.id,
+                    timeInSeconds=(i * 3600),
+                    value=(i * 1000),
+                    std=(i * 10 if i > 1 else None),
+                )
+
+        self.db_session.commit()
+
+        urls = [
+            f"/api/v1/bioreplicate/{bioreplicate.id}.csv?cfuCountUnits=CFUs/μL",
+            f"/api/v1/experiment/{experiment.publicId}.csv",
+            f"/api/v1/measurement-context/{measurement_context.id}.csv?cfuCountUnits=CFUs/μL",
+        ]
+        single_chunk_responses = [self.client.get(url).text for url in urls]
+
+        chunk_size = api_pages.CSV_STREAM_CHUNK_SIZE
+        self.addCleanup(setattr, api_pages, 'CSV_STREAM_CHUNK_SIZE', chunk_size)
+        api_pages.CSV_STREAM_CHUNK_SIZE = 2
+
+        for url, expected_text in zip(urls, single_chunk_responses):
+            response = self.client.get(url)
+            self.assertEqual(response.status, '200 OK')
+            self.assertEqual(response.mimetype, 'text/csv')
+            self.assertEqual(response.text, expected_text)
+
+        # Each context converted separately, even when split between chunks:
+        response_df = self._get_csv(self.client.get(urls[0]))
+        self.assertEqual(response_df['value'].tolist(), [1e6, 2e6, 3e6, 1, 2, 3])
+        self.assertEqual(response_df['std'].fillna(0).tolist(), [0, 2e4, 3e4, 0, 0.02, 0.03])
+
+        response_df = self._get_csv(self.client.get(urls[1]))
+        self.assertEqual(response_df['techniqueType'].tolist(), ['fc'] * 6)
+
     def test_metabolite_unit_conversion_without_mass(self):
         study        = self.create_study(publishedAt=datetime.now(UTC))
         experiment   = self.create_experiment(studyId=study.publicId)
@@ -607,3 +782,70 @@ class TestApiPages(PageTest):
         mc_json = [entry for entry in response_json['measurementContexts'] if entry['id'] == mc.id][0]
         self.assertEqual(mc_json['techniqueOriginalUnits'], 'mM')
         self.assertEqual(mc_json['techniqueUnits'], 'mM')
+
+    def test_query_count(self):
+        technique = self.create_measurement_technique(units='mM')
+        taxon     = self.create_taxon()
+
+        def create_experiment_data(bioreplicate_count, context_count):
+            study      = self.create_study(publishedAt=datetime.now(UTC))
+            experiment = self.create_experiment(studyId=study.publicId)
+            strain     = self.create_study_strain(studyId=study.publicId, ncbiId=taxon.ncbiId)
+
+            for _ in range(bioreplicate_count):
+                bioreplicate = self.create_bioreplicate(experimentId=experiment.publicId)
+                metabolite   = self.create_metabolite(averageMass=180)
+
+                self.create_measurement_context(
+                    studyId=study.publicId,
+                    bioreplicateId=bioreplicate.id,
+                    techniqueId=technique.id,
+                    subjectId=strain.id,
+                    subjectType='strain',
+                )
+                self.create_measurement_context(
+                    studyId=study.publicId,
+                    bioreplicateId=bioreplicate.id,
+                    techniqueId=technique.id,
+                    subjectId=metabolite.id,
+                    subjectType='metabolite',
+                )
+
+            # The last bioreplicate has additional metabolite contexts:
+            for _ in range(context_count - 2):
+                self.create_measurement_context(
+                    studyId=study.publicId,
+                    bioreplicateId=bioreplicate.id,
+                    techniqueId=technique.id,
+                    subjectId=self.create_metabolite(averageMass=180).id,
+                    subjectType='metabolite',
+                )
+
+            self.db_session.commit()
+
+            return experiment.publicId, bioreplicate.id
+
+        def count_queries(url):
+            with self._count_queries() as queries:
+                response = self.client.get(url)
+                self.assertEqual(response.status, '200 OK')
+
+            return len(queries)
+
+        small_experiment_id, small_bioreplicate_id = create_experiment_data(1, context_count=2)
+        large_experiment_id, large_bioreplicate_id = create_experiment_data(10, context_count=12)
+
+        self.assertEqual(
+            count_queries(f"/api/v1/experiment/{small_experiment_id}.json"),
+            count_queries(f"/api/v1/experiment/{large_experiment_id}.json"),
+        )
+        self.assertEqual(
+            count_queries(f"/api/v1/bioreplicate/{small_bioreplicate_id}.json"),
+            count_queries(f"/api/v1/bioreplicate/{large_bioreplicate_id}.json"),
+        )
+
+        # All strain and metabolite contexts are found in a fixed number of queries:
+        search_url = f"/api/v1/search.json?strainNcbiIds={taxon.ncbiId}&metaboliteChebiIds=1,2,3,4,5"
+        response_json = self._get_json(self.client.get(search_url))
+        self.assertEqual(len(response_json['measurementContexts']), 16)
+        self.assertLessEqual(count_queries(search_url), 10)
@@ -1,9 +1,11 @@
 import tests.init  # noqa: F401
 
 import unittest
+from datetime import datetime, UTC
 
 from tests.page_test import PageTest
 from app.model.lib.dev import bootstrap_study
+from app.model.lib.search_facets import rebuild_search_facets
 
 
 class TestSearch(PageTest):
@@ -17,11 +19,11 @@ class TestSearch(PageTest):
         s1 = bootstrap_study(self.db_session, 'synthetic_gut', 'test_user')
         s2 = bootstrap_study(self.db_session, 'ri_bt_bh_in_chemostat_controls', 'test_user')
 
-        response = self.client.get('/search/', query_string={'q': 'thet'})
+        response = self.client.get('/search/', query_string={'q': 'synth'})
         response_text = self._get_text(response)
 
         self.assertEqual(response.status_code, 200)
-        self.assertIn("Syn thet ic human gut bacterial community", response_text)
+        self.assertIn("Synth etic human gut bacterial community", response_text)
         self.assertNotIn("RI, BT and BH in chemostat: Controls", response_text)
 
         # By ncbiId:
@@ -29,7 +31,7 @@ class TestSearch(PageTest):
         response_text = self._get_text(response)
 
         self.assertEqual(response.status_code, 200)
-        self.assertNotIn("Syn thet ic human gut bacterial community", response_text)
+        self.assertNotIn("Synth etic human gut bacterial community", response_text)
         self.assertIn("RI, BT and BH in chemostat: Controls", response_text)
 
         # By metabolite (valeric acid):
@@ -52,6 +54,29 @@ class TestSearch(PageTest):
         self.assertNotIn("Synthetic human gut bacterial community", response_text)
         self.assertIn("RI, BT and BH in chemostat: Controls", response_text)
 
+    def test_facet_counts_in_results(self):
+        taxon = self.create_taxon(ncbiId=841, name="Roseburia")
+
+        s1 = self.create_study(name="Study 1", publishedAt=datetime.now(UTC))
+        s2 = self.create_study(name="Study 2", publishedAt=datetime.now(UTC))
+        s3 = self.create_study(name="Study 3", publishedAt=None)
+
+        for study in (s1, s2, s3):
+            self.create_study_strain(studyId=study.publicId, ncbiId=taxon.ncbiId, name="Roseburia")
+
+        rebuild_search_facets(self.db_session)
+        self.db_session.commit()
+
+        response = self.client.get('/search/', query_string={'ncbiIds': taxon.ncbiId})
+        response_text = self._get_text(response)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Study 2", response_text)
+        self.assertNotIn("Study 3", response_text)
+
+        # Unpublished studies are not counted:
+        self.assertIn("Roseburia (2 studies)", response_text)
+
     def test_advanced_search_basic_query(self):
         s1 = bootstrap_study(self.db_session, 'synthetic_gut', 'test_user')
         s2 = bootstrap_study(self.db_session, 'ri_bt_bh_in_chemostat_controls', 'test_user')
@@ -0,0 +1,83 @@
+import tests.init  # noqa: F401
+
+import unittest
+from datetime import datetime, UTC
+
+from tests.page_test import PageTest
+
+
+class TestStudyChart(PageTest):
+    def setUp(self):
+        super().setUp()
+
+        self.study     = self.create_study(publishedAt=datetime.now(UTC))
+        self.technique = self.create_measurement_technique(studyId=self.study.publicId, units='Cells/mL')
+        self.context   = self.create_measurement_context(
+            studyId=self.study.publicId,
+            techniqueId=self.technique.id,
+        )
+
+        for i in range(100):
+            self.create_measurement(
+                studyId=self.study.publicId,
+                contextId=self.context.id,
+                timeInSeconds=i * 3600,
+                value=(i + 0.1),
+                std=(0.5 if i % 2 else None),
+            )
+
+        self.db_session.commit()
+
+    def test_chart_json(self):
+        response = self.client.post(
+            f"/study/{self.study.publicId}/visualize/chart.json?width=600",
+            data={f"measurementContext|{self.context.id}": 'on', 'showStd': 'on'},
+        )
+        self.assertEqual(response.content_type, 'application/json')
+
+        chart_data = self._get_json(response)
+        self.assertEqual(set(chart_data.keys()), {'data', 'layout', 'config'})
+        self.assertEqual(chart_data['layout']['width'], 600)
+
+        (trace,) = chart_data['data']
+        self.assertEqual(trace['x'], [float(i) for i in range(100)])
+        self.assertEqual(trace['y'][:2], [0.1, 1.1])
+        self.assertEqual(trace['error_y']['array'][:2], [None, 0.5])
+
+    def test_compact_chart_json(self):
+        response = self.client.post(
+            f"/study/{self.study.publicId}/visualize/chart.json?float32=1&maxPoints=10",
+            data={f"measurementContext|{self.context.id}": 'on'},
+        )
+        chart_data = self._get_json(response)
+
+        (trace,) = chart_data['data']
+        self.assertEqual(len(trace['x']), 10)
+        self.assertEqual(trace['x'][0], 0.0)
+        self.assertEqual(trace['x'][-1], 99.0)
+        self.assertNotIn('width', chart_data['layout'])
+        self.assertTrue(chart_data['config']['responsive'])
+
+    def test_invalid_chart_json_params(self):
+        for query in ('width=wide', 'width=0', 'maxPoints=ten', 'maxPoints=-1'):
+            with self.subTest(query=query):
+                response = self.client.post(
+                    f"/study/{self.study.publicId}/visualize/chart.json?{query}",
+                    data={f"measurementContext|{self.context.id}": 'on'},
+                )
+                self.assertEqual(response.status, '400 BAD REQUEST')
+
+    def test_chart_controls(self):
+        response = self.client.post(
+            f"/study/{self.study.publicId}/visualize/chart",
+            data={f"measurementContext|{self.context.id}": 'on'},
+        )
+        html = response.data.decode('utf-8')
+
+        self.assertIn('js-chart-plot', html)
+        self.assertIn(f'data-context-id="{self.context.id}"', html)
+        self.assertNotIn('Plotly.newPlot', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -67,6 +67,84 @@ class TestExperimentExportForm(DatabaseTest):
             f"l={mc2.id}&lm={mr1.id}&selectedExperimentId={e2.publicId}&selectedTechniqueId={t.id}",
         )
 
+    def test_constant_query_count(self):
+        study_id = self.create_study().publicId
+
+        def build_chart_with_traces(count):
+            experiment = self.create_experiment(studyId=study_id)
+            technique  = self.create_measurement_technique(studyId=study_id, units='Cells/mL')
+            metabolite_technique = self.create_measurement_technique(
+                studyId=study_id,
+                subjectType='metabolite',
+                units='mM',
+            )
+            self.create_perturbation(experimentId=experiment.publicId, description='Perturbation')
+
+            context_ids = []
+            model_ids   = []
+
+            for i in range(count):
+                bioreplicate = self.create_bioreplicate(experimentId=experiment.publicId)
+                metabolite   = self.create_metabolite(averageMass=180)
+
+                context = self.create_measurement_context(
+                    studyId=study_id,
+                    bioreplicateId=bioreplicate.id,
+                    techniqueId=technique.id,
+                )
+                metabolite_context = self.create_measurement_context(
+                    studyId=study_id,
+                    bioreplicateId=bioreplicate.id,
+                    techniqueId=metabolite_technique.id,
+                    subjectType='metabolite',
+                    subjectId=metabolite.id,
+                )
+                # The model's context is not on the chart:
+                model_context = self.create_measurement_context(
+                    studyId=study_id,
+                    bioreplicateId=bioreplicate.id,
+                    techniqueId=technique.id,
+                )
+                modeling_result = self.create_modeling_result(
+                    type='logistic',
+                    measurementContextId=model_context.id,
+                    params={'coefficients': {'y0': 1, 'mumax': 0.5, 'K': 100}},
+                )
+
+                for context_id in (context.id, metabolite_context.id, model_context.id):
+                    for t in range(3):
+                        self.create_measurement(
+                            studyId=study_id,
+                            contextId=context_id,
+                            timeInSeconds=(t * 3600),
+                            value=(t + 1),
+                        )
+
+                context_ids += [context.id, metabolite_context.id]
+                model_ids.append(modeling_result.id)
+
+            self.db_session.commit()
+            self.db_session.expunge_all()
+
+            form = ComparativeChartForm(
+                self.db_session,
+                left_axis_ids=context_ids,
+                left_axis_model_ids=model_ids,
+            )
+
+            with self._count_queries() as queries:
+                chart = form.build_chart()
+                chart.to_html()
+                [mc.get_chart_label() for mc in form.measurement_contexts]
+                [mr.get_chart_label() for mr in form.modeling_results]
+
+            self.assertEqual(len(chart.data_left), 3 * count)
+            self.assertEqual(len(chart.regions), 1)
+
+            return len(queries)
+
+        self.assertEqual(build_chart_with_traces(1), build_chart_with_traces(5))
+
 
 if __name__ == '__main__':
     unittest.main()